@@ -1,6 +1,13 @@
 """Local Windows speech-to-text dictation package."""
 
-from .app import main
-
 __all__ = ["main"]
 
+
+def __getattr__(name):
+    # Resolved lazily so `python -m flow_stt --profile-startup` can time the app's own imports.
+    if name == "main":
+        from .app import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
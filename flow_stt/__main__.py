@@ -1,4 +1,10 @@
-from .app import main
+import sys
+
+from .startup import StartupProfiler
 
 if __name__ == "__main__":
-    main()
+    profiler = StartupProfiler(enabled="--profile-startup" in sys.argv[1:])
+    profiler.install_import_hook()
+    from .app import main
+
+    main(profiler=profiler)
@@ -1,16 +1,36 @@
+import argparse
 import logging
+import platform
 import threading
 import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from queue import Queue
+from typing import Optional, Sequence, Set
 
 import numpy as np
-import sounddevice as sd
 
+from . import metrics
+from .archive import RecordingArchive, default_archive_dir
 from .audio_capture import AudioCapture
-from .config import ConfigManager
+from .commands import TEXT_PREFIX, CommandMatch, KeywordSpotter
+from .config import ConfigManager, changed_fields, default_vocabulary_path
+from .devices import get_registry
+from .features import FeatureStream
+from .history import TranscriptHistory, default_history_path
+from .pipeline import StageWorker
+from .profiling import ProfileSession
 from .postprocess import TextPostProcessor
-from .stt_engine import SpeechToTextEngine
+from .speculative import SpeculativeTranscriber
+from .scheduling import ThreadPolicy
+from .startup import StartupProfiler
+from .stt_engine import AUTO_LANGUAGE, SpeechToTextEngine
 from .integration import get_integration
-from .ui import StatusUI
+from .metrics import MetricsServer, TextfileWriter
+from .models import ModelRegistry, prewarm_in_background
+from .vocabulary import load_in_background
+from .watcher import ConfigWatcher
 
 
 logging.basicConfig(
@@ -20,30 +40,187 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Which settings each component depends on; a reload rebuilds only the affected ones.
+ENGINE_FIELDS = {"model_size", "model_cache_dir", "prefer_gpu", "inference_threads", "inference_cpus"}
+# CPU placement of the decoding threads; CTranslate2's pool only picks up new CPUs on a reload.
+POLICY_FIELDS = {"inference_cpus", "inference_nice"}
+INTEGRATION_FIELDS = {"output_mode", "auto_paste_clipboard", "restore_clipboard"}
+CAPTURE_FIELDS = {
+    "mic_device",
+    "silence_timeout_secs",
+    "capture_memory_limit_mb",
+    "capture_native_rate",
+    "capture_block_size",
+    "capture_latency",
+    "device_refresh_secs",
+}
+ARCHIVE_FIELDS = {"archive_enabled", "archive_dir", "archive_max_mb"}
+HISTORY_FIELDS = {"history_enabled", "history_file", "history_max_entries"}
+SPECULATIVE_FIELDS = {"speculative_transcription", "speculative_pause_ms"}
+COMMAND_FIELDS = {"command_mode", "commands", "command_threshold", "command_max_secs"}
+METRICS_FILE_FIELDS = {"metrics_textfile", "metrics_interval_secs"}
+HOTKEY_FIELDS = {"hotkey", "mode", "replay_hotkey", "history_hotkey", "history_enabled", "profile_hotkey"}
+RESTART_FIELDS = {"enable_ui", "prewarm_model", "watch_config"}
+
+
+@dataclass
+class Utterance:
+    """One recording on its way through the transcribe and output stages."""
+
+    audio: np.ndarray
+    last_voiced: Optional[int] = None
+    features: Optional[Queue] = None  # pending FeatureStream result
+    speculative_ticket: Optional[int] = None
+
+
 class DictationApp:
-    def __init__(self):
-        self.cfg_manager = ConfigManager()
-        self.cfg = self.cfg_manager.config
+    # Event.wait() without a timeout is not interruptible by Ctrl+C on Windows.
+    _MAIN_WAIT_SECS = 2.0 if platform.system().lower() == "windows" else None
+    _REINSERT_DELAY_SECS = 0.15
+
+    def __init__(self, profiler: Optional[StartupProfiler] = None, cfg_manager: Optional[ConfigManager] = None):
+        self._startup = profiler or StartupProfiler(enabled=False)
+        with self._startup.phase("config"):
+            self.cfg_manager = cfg_manager or ConfigManager()
+            self.cfg = self.cfg_manager.config
+        if self.cfg.prewarm_model:
+            # Start reading the weights while Python is still importing faster-whisper.
+            prewarm_in_background(ModelRegistry().pinned_files(self.cfg.model_size, self.cfg.model_cache_dir))
 
         self._listening = False
         self._lock = threading.Lock()
         self._last_audio: np.ndarray | None = None
+        self._last_output = ""
+        self._shutdown = threading.Event()
+        self._main_wakeups = 0
+        # Set when a config change arrives mid-recording; applied once it stops.
+        self._reload_pending = False
+        # Bumped by each engine rebuild; only the newest one is swapped in.
+        self._engine_generation = 0
+        # The latest on-demand profile; None until one is requested.
+        self._profile: ProfileSession | None = None
+        # Decoding and text injection run as separate ordered stages, so typing a long
+        # dictation overlaps with decoding the next one.
+        # The status goes back to Idle only once the last queued decode has finished.
+        # Utterances are submitted from the keyboard hook, which must never block, so
+        # the transcribe queue is unbounded; back-pressure applies between the stages.
+        self._transcriber = StageWorker("transcribe", maxsize=0, on_idle=self._set_idle)
+        self._output = StageWorker("output")
 
         self.postprocessor = TextPostProcessor(enable_spoken_punctuation=self.cfg.spoken_punctuation)
-        self.stt_engine = SpeechToTextEngine(
-            model_size=self.cfg.model_size,
-            language=self.cfg.language,
-            prefer_gpu=self.cfg.prefer_gpu,
+        self._load_vocabulary()
+        with self._startup.phase("engine"):
+            self.stt_engine = self._build_engine()
+        with self._startup.phase("integration"):
+            self.integration = self._build_integration()
+        self.audio = self._build_audio()
+
+        self.archive = self._build_archive()
+        self.history = self._build_history()
+        self.speculative: SpeculativeTranscriber | None = None
+        self._configure_speculative()
+        self.feature_stream: FeatureStream | None = None
+        self._configure_features()
+        self.commands = self._build_commands()
+        self._metrics_server = self._build_metrics_server()
+        self._metrics_file = self._build_metrics_file()
+        self._config_watcher = (
+            ConfigWatcher(self.cfg_manager.path, self.request_reload) if self.cfg.watch_config else None
         )
-        self.integration = get_integration(self.cfg.output_mode, self.cfg.auto_paste_clipboard)
-        self.audio = AudioCapture(
+
+        self.ui = None
+        if self.cfg.enable_ui:
+            with self._startup.phase("ui"):
+                from .ui import StatusUI
+
+                self.ui = StatusUI(
+                    on_settings_saved=self.request_reload,
+                    on_close=self.shutdown,
+                    level_source=self.audio.levels,
+                    history_source=lambda: self.history,
+                    on_reinsert=self.reinsert,
+                )
+
+    def _load_vocabulary(self):
+        path = Path(self.cfg.vocabulary_file) if self.cfg.vocabulary_file else default_vocabulary_path()
+        if not path.exists():
+            if self.cfg.vocabulary_file:
+                logger.warning("Vocabulary file %s not found.", path)
+            self.postprocessor.vocabulary = None
+            return
+
+        def ready(index):
+            index.fix_case = self.cfg.vocabulary_fix_case
+            self.postprocessor.vocabulary = index
+            logger.info("Vocabulary ready: %d terms from %s", len(index), path)
+
+        # Corrections start once the index is mapped; startup doesn't wait for a (re)build.
+        load_in_background(path, ready)
+
+    # Factories for the parts that touch hardware or the OS; soak.py swaps in fakes.
+    def _build_integration(self):
+        return get_integration(self.cfg.output_mode, self.cfg.auto_paste_clipboard, self.cfg.restore_clipboard)
+
+    def _build_audio(self) -> AudioCapture:
+        return AudioCapture(
             device=self.cfg.mic_device,
             sample_rate=16000,
             silence_timeout=self.cfg.silence_timeout_secs,
             on_silence=self._on_silence_timeout,
+            max_memory_mb=self.cfg.capture_memory_limit_mb,
+            native_rate=self.cfg.capture_native_rate,
+            block_size=self.cfg.capture_block_size,
+            latency=self.cfg.capture_latency,
         )
 
-        self.ui = StatusUI(on_settings_saved=self._reload_config) if self.cfg.enable_ui else None
+    def _build_engine(self) -> SpeechToTextEngine:
+        return SpeechToTextEngine(
+            model_size=self.cfg.model_size,
+            language=self.cfg.language,
+            prefer_gpu=self.cfg.prefer_gpu,
+            max_fallbacks=self.cfg.max_temperature_fallbacks,
+            deadline_secs=self.cfg.decode_deadline_secs or None,
+            cpu_threads=self.cfg.inference_threads,
+            policy=ThreadPolicy(self.cfg.inference_cpus, self.cfg.inference_nice),
+            model_cache_dir=self.cfg.model_cache_dir,
+        )
+
+    def _build_history(self) -> TranscriptHistory | None:
+        if not self.cfg.history_enabled:
+            return None
+        path = Path(self.cfg.history_file) if self.cfg.history_file else default_history_path()
+        return TranscriptHistory(path, max_entries=self.cfg.history_max_entries)
+
+    def _build_archive(self) -> RecordingArchive | None:
+        if not self.cfg.archive_enabled:
+            return None
+        directory = Path(self.cfg.archive_dir) if self.cfg.archive_dir else default_archive_dir()
+        logger.info("Archiving recordings to %s", directory)
+        return RecordingArchive(directory, int(self.cfg.archive_max_mb * 1024 * 1024))
+
+    def _build_metrics_server(self) -> MetricsServer | None:
+        if not self.cfg.metrics_port:
+            return None
+        server = MetricsServer(self.cfg.metrics_port)
+        server.start()
+        return server
+
+    def _build_metrics_file(self) -> TextfileWriter | None:
+        if not self.cfg.metrics_textfile:
+            return None
+        writer = TextfileWriter(Path(self.cfg.metrics_textfile), self.cfg.metrics_interval_secs)
+        writer.start()
+        return writer
+
+    def _build_commands(self) -> KeywordSpotter | None:
+        if not self.cfg.command_mode:
+            return None
+        spotter = KeywordSpotter(
+            self.cfg.commands, threshold=self.cfg.command_threshold, max_secs=self.cfg.command_max_secs
+        )
+        if not spotter.ready:
+            logger.warning("Command mode is on but no commands are enrolled; see `python -m flow_stt.commands`.")
+        return spotter
 
     def _set_status(self, status: str):
         if self.ui:
@@ -51,6 +228,36 @@ class DictationApp:
         else:
             logger.info("Status: %s", status)
 
+    def _configure_speculative(self):
+        enabled = self.cfg.speculative_transcription
+        if enabled and self.speculative is None:
+            self.speculative = SpeculativeTranscriber(
+                self._transcribe_text,
+                sample_rate=self.audio.sample_rate,
+                on_result=self._set_partial_text,
+            )
+        elif not enabled and self.speculative is not None:
+            self.speculative.close()
+            self.speculative = None
+        self.audio.pause_secs = self.cfg.speculative_pause_ms / 1000.0 if enabled else None
+        self.audio.on_pause = self.speculative.on_pause if self.speculative else None
+
+    def _configure_features(self):
+        if self.cfg.precompute_features and self.feature_stream is None:
+            self.feature_stream = FeatureStream(self.stt_engine.n_mels)
+        elif not self.cfg.precompute_features and self.feature_stream is not None:
+            self.feature_stream.close()
+            self.feature_stream = None
+        if self.feature_stream is not None:
+            self.feature_stream.n_mels = self.stt_engine.n_mels
+
+    def _transcribe_text(self, audio: np.ndarray) -> str:
+        return self.stt_engine.transcribe(audio, sample_rate=self.audio.sample_rate).final_text
+
+    def _set_partial_text(self, text: str):
+        if self.ui:
+            self.ui.set_partial_text(text)
+
     def _register_hotkeys(self):
         # Clear both to be safe when switching platforms/configs.
         try:
@@ -67,26 +274,136 @@ class DictationApp:
                 self.integration.register_hotkey_action(self.cfg.replay_hotkey, self.replay_last_recording)  # type: ignore[attr-defined]
             except AttributeError:
                 self.integration.register_hotkey_toggle(self.cfg.replay_hotkey, self.replay_last_recording)
+        if self.cfg.history_hotkey and self.history and self.ui:
+            try:
+                self.integration.register_hotkey_action(self.cfg.history_hotkey, self.ui.open_history)  # type: ignore[attr-defined]
+            except AttributeError:
+                self.integration.register_hotkey_toggle(self.cfg.history_hotkey, self.ui.open_history)
+        if self.cfg.profile_hotkey:
+            try:
+                self.integration.register_hotkey_action(self.cfg.profile_hotkey, self.start_profile)  # type: ignore[attr-defined]
+            except AttributeError:
+                self.integration.register_hotkey_toggle(self.cfg.profile_hotkey, self.start_profile)
 
-    def _reload_config(self):
-        logger.info("Reloading config from disk.")
-        self.cfg = self.cfg_manager.load()
-        self.postprocessor.enable_spoken_punctuation = self.cfg.spoken_punctuation
-        self.integration.output_mode = self.cfg.output_mode
-        self.integration.auto_paste_clipboard = self.cfg.auto_paste_clipboard
-        self.audio.device = self.cfg.mic_device
-        self.audio.silence_timeout = self.cfg.silence_timeout_secs
-        if (
-            self.stt_engine.model_size != self.cfg.model_size
-            or self.stt_engine.language != self.cfg.language
-            or self.stt_engine.prefer_gpu != self.cfg.prefer_gpu
-        ):
-            self.stt_engine = SpeechToTextEngine(
-                model_size=self.cfg.model_size,
-                language=self.cfg.language,
-                prefer_gpu=self.cfg.prefer_gpu,
-            )
-        self._register_hotkeys()
+    def request_reload(self):
+        """Apply config file changes between utterances, off the caller's thread."""
+        self._transcriber.submit(self._reload_stage)
+
+    def _reload_stage(self, waited: float):
+        self._reload_config()
+
+    def _reload_config(self) -> Set[str]:
+        """Re-read the config and rebuild only what the changed settings affect.
+
+        Nothing that a running recording depends on is touched: while listening
+        the reload is deferred, and ``stop_listening`` queues it again behind the
+        utterance. Returns the names of the settings that were applied.
+        """
+        with self._lock:
+            if self._listening:
+                self._reload_pending = True
+                return set()
+            new = self.cfg_manager.reload()
+            if new is None:
+                return set()
+            changed = changed_fields(self.cfg, new)
+            if not changed:
+                return changed
+            logger.info("Config changed: %s", ", ".join(sorted(changed)))
+            self.cfg = new
+            # Cheap updates under the lock, so a recording can't start halfway through them.
+            retired = self._apply_config(changed)
+        for component in retired:
+            component.close()
+        if changed & ENGINE_FIELDS:
+            self._rebuild_engine()
+        if changed & HOTKEY_FIELDS:
+            self._register_hotkeys()
+        if changed & RESTART_FIELDS:
+            logger.info("Restart to apply: %s", ", ".join(sorted(changed & RESTART_FIELDS)))
+        return changed
+
+    def _rebuild_engine(self):
+        """Load the new model on its own thread; the old engine keeps decoding until the swap."""
+        with self._lock:
+            self._engine_generation += 1
+            generation = self._engine_generation
+
+        def build():
+            try:
+                engine = self._build_engine()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Could not load the new model; keeping the current one: %s", exc)
+                return
+            with self._lock:
+                if generation != self._engine_generation:
+                    return  # A later reload is loading a newer model.
+                # Settings reloaded while the model was loading went to the old engine only.
+                cfg = self.cfg
+                engine.max_fallbacks = cfg.max_temperature_fallbacks
+                engine.deadline_secs = cfg.decode_deadline_secs or None
+                engine.policy = ThreadPolicy(cfg.inference_cpus, cfg.inference_nice)
+                if engine.language != (cfg.language or AUTO_LANGUAGE):
+                    engine.language = cfg.language
+                self.stt_engine = engine
+                if self.feature_stream is not None:
+                    self.feature_stream.n_mels = engine.n_mels
+            logger.info("Switched to model %s.", engine.model_size)
+
+        threading.Thread(target=build, name="flow-stt-engine-load", daemon=True).start()
+
+    def _apply_config(self, changed: Set[str]) -> list:
+        """Swap in the new settings; returns replaced workers for the caller to close."""
+        cfg = self.cfg
+        retired = []
+        if "spoken_punctuation" in changed:
+            self.postprocessor.enable_spoken_punctuation = cfg.spoken_punctuation
+        if "vocabulary_file" in changed:
+            self._load_vocabulary()
+        elif "vocabulary_fix_case" in changed and self.postprocessor.vocabulary is not None:
+            self.postprocessor.vocabulary.fix_case = cfg.vocabulary_fix_case
+        if changed & INTEGRATION_FIELDS:
+            self.integration.output_mode = cfg.output_mode
+            self.integration.auto_paste_clipboard = cfg.auto_paste_clipboard
+            self.integration.restore_clipboard = cfg.restore_clipboard
+        if changed & CAPTURE_FIELDS:
+            # Read when the next recording opens its stream.
+            self.audio.device = cfg.mic_device
+            self.audio.silence_timeout = cfg.silence_timeout_secs
+            self.audio.max_memory_mb = cfg.capture_memory_limit_mb
+            self.audio.native_rate = cfg.capture_native_rate
+            self.audio.block_size = cfg.capture_block_size
+            self.audio.latency = cfg.capture_latency
+            self.audio.registry.set_refresh_interval(cfg.device_refresh_secs)
+        if changed & ARCHIVE_FIELDS:
+            # Closing flushes queued writes, which can take a while; done outside the lock.
+            retired.append(self.archive)
+            self.archive = self._build_archive()
+        if changed & HISTORY_FIELDS:
+            retired.append(self.history)
+            self.history = self._build_history()
+        if "metrics_port" in changed:
+            retired.append(self._metrics_server)
+            self._metrics_server = self._build_metrics_server()
+        if changed & METRICS_FILE_FIELDS:
+            retired.append(self._metrics_file)
+            self._metrics_file = self._build_metrics_file()
+        if changed & SPECULATIVE_FIELDS:
+            self._configure_speculative()
+        if changed & COMMAND_FIELDS:
+            self.commands = self._build_commands()
+        if "precompute_features" in changed:
+            self._configure_features()
+        if changed & POLICY_FIELDS:
+            # Applies from the next decode, including on an engine about to be replaced.
+            self.stt_engine.policy = ThreadPolicy(cfg.inference_cpus, cfg.inference_nice)
+        if not changed & ENGINE_FIELDS:
+            engine = self.stt_engine
+            engine.max_fallbacks = cfg.max_temperature_fallbacks
+            engine.deadline_secs = cfg.decode_deadline_secs or None
+            if "language" in changed and engine.language != (cfg.language or AUTO_LANGUAGE):
+                engine.language = cfg.language
+        return [component for component in retired if component is not None]
 
     def _toggle_listening(self):
         if self._listening:
@@ -99,6 +416,12 @@ class DictationApp:
             if self._listening:
                 return
             self._listening = True
+        self._set_partial_text("")
+        if self.speculative:
+            self.speculative.reset()
+        if self.feature_stream:
+            self.feature_stream.begin()
+            self.audio.block_sink = self.feature_stream.push
         self._set_status("Listening...")
         self.audio.start()
 
@@ -108,56 +431,266 @@ class DictationApp:
                 return
             self._listening = False
         self.audio.stop()
+        feeding = self.audio.block_sink is not None
+        self.audio.block_sink = None
+        last_voiced = self.audio.last_voiced_frame
         audio = self.audio.get_audio()
+        # Close out per-utterance state now, before the next recording can start.
+        feature_stream = self.feature_stream
+        features = feature_stream.request(audio.shape[0]) if feeding and feature_stream else None
+        speculative = self.speculative
+        ticket = speculative.seal() if speculative else None
         if audio.size == 0:
-            self._set_status("Idle")
+            if ticket is not None:
+                speculative.discard(ticket)
+            self._set_idle()
+            self._resume_reload()
             return
-        self._last_audio = audio.copy()
-        threading.Thread(target=self._transcribe_and_output, args=(audio,), daemon=True).start()
+        # Capture hands over a fresh int16 buffer each time, so no defensive copy is needed.
+        self._last_audio = audio
+        utterance = Utterance(audio, last_voiced, features, ticket)
+        self._transcriber.submit(partial(self._transcribe_stage, utterance))
+        self._resume_reload()
+
+    def _resume_reload(self):
+        # A config change that arrived mid-recording goes in right behind this utterance.
+        with self._lock:
+            pending, self._reload_pending = self._reload_pending, False
+        if pending:
+            self.request_reload()
 
     def _on_silence_timeout(self):
         if self._listening:
             self.stop_listening()
 
-    def _transcribe_and_output(self, audio):
-        self._set_status("Transcribing...")
+    def _set_idle(self):
+        # A newer recording owns the status while it is listening or queued for decoding.
+        if not self._listening and self._transcriber.idle:
+            self._set_status("Idle")
+
+    def _transcribe_stage(self, utterance: Utterance, waited: float):
+        if not self._listening:
+            self._set_status("Transcribing...")
         started = time.perf_counter()
+        audio = utterance.audio
+        speculative = self.speculative
         try:
-            result = self.stt_engine.transcribe(audio, sample_rate=self.audio.sample_rate)
-            processed = self.postprocessor.process(result.final_text)
-            self.integration.output_text(processed.final_text)
-            elapsed = time.perf_counter() - started
-            logger.info("Transcription took %.2fs", elapsed)
-            if self.cfg.log_transcripts:
-                logger.info("Transcript: %s", processed.final_text)
+            match = self.commands.match(audio, self.audio.sample_rate) if self.commands else None
+            if match:
+                logger.info(
+                    "Command %r -> %s (distance %.3f, %.0f ms)",
+                    match.phrase,
+                    match.action,
+                    match.distance,
+                    (time.perf_counter() - started) * 1000,
+                )
+                if speculative and utterance.speculative_ticket is not None:
+                    speculative.discard(utterance.speculative_ticket)
+                self._output.submit(partial(self._command_stage, match))
+                return
+            engine = self.stt_engine
+            decode = {}
+            text = None
+            if speculative and utterance.speculative_ticket is not None and utterance.last_voiced is not None:
+                text = speculative.finish(audio, utterance.last_voiced, utterance.speculative_ticket)
+            if text is None:
+                precomputed = FeatureStream.wait(utterance.features) if utterance.features is not None else None
+                result = engine.transcribe(audio, sample_rate=self.audio.sample_rate, features=precomputed)
+                text = result.final_text
+                decode = {
+                    "fallbacks": result.fallbacks,
+                    "deadline_hit": result.deadline_hit,
+                    "language": result.language or engine.language,
+                }
+            timings = {"transcribe_wait": waited, "inference": time.perf_counter() - started}
+            processed = self.postprocessor.process(text)
+            timings["postprocess"] = time.perf_counter() - started - timings["inference"]
+            meta = {"model_size": engine.model_size, "language": engine.language, "raw_text": text, **decode}
+            self._output.submit(partial(self._output_stage, audio, processed.final_text, timings, meta, started))
         except Exception as exc:  # noqa: BLE001
             logger.error("Transcription failed: %s", exc)
-        finally:
-            self._set_status("Idle")
+
+    def _output_stage(self, audio, text: str, timings: dict, meta: dict, started: float, waited: float):
+        output_started = time.perf_counter()
+        self.integration.output_text(text)
+        self._last_output = text
+        timings["output_wait"] = waited
+        timings["output"] = time.perf_counter() - output_started
+        timings["total"] = time.perf_counter() - started
+        metrics.UTTERANCES.inc()
+        metrics.LATENCY.observe(timings["total"])
+        logger.info(
+            "Transcription took %.2fs (queued %.2fs before decoding, %.2fs before output)",
+            timings["total"],
+            timings["transcribe_wait"],
+            waited,
+        )
+        if self.cfg.log_transcripts:
+            logger.info("Transcript: %s", text)
+        history = self.history
+        if history:
+            history.submit(text, timings, meta)
+        archive = self.archive
+        if archive:
+            archive.submit(audio, self.audio.sample_rate, text, timings, meta)
+        self._profile_utterance(timings, chars=len(text), audio_secs=len(audio) / self.audio.sample_rate)
+
+    def _command_stage(self, match: CommandMatch, waited: float):
+        self._run_command(match)
+        metrics.COMMANDS.inc()
+        self._profile_utterance({"output_wait": waited}, command=match.action)
+
+    def start_profile(self, utterances: Optional[int] = None):
+        """Sample stacks and allocations until ``utterances`` more dictations have been output."""
+        with self._lock:
+            if self._profile is not None and not self._profile.done.is_set():
+                logger.info("A profile is already being collected.")
+                return
+            directory = Path(self.cfg.profile_dir) if self.cfg.profile_dir else None
+            self._profile = ProfileSession(utterances or self.cfg.profile_utterances, directory)
+            self._profile.start()
+
+    def _profile_utterance(self, timings: dict, **extra):
+        profile = self._profile
+        if profile is not None and not profile.done.is_set():
+            profile.record(timings, **extra)
+
+    def _run_command(self, match: CommandMatch):
+        if match.action.startswith(TEXT_PREFIX):
+            text = match.action[len(TEXT_PREFIX) :]
+            self.integration.output_text(text)
+            self._last_output = text
+        elif match.action == "delete_last":
+            # Clipboard mode never typed anything into the window, so there is nothing to remove.
+            if self._last_output and self.integration.output_mode != "clipboard":
+                self.integration.delete_text(len(self._last_output))
+            self._last_output = ""
+        elif match.action == "undo":
+            self.integration.send_undo()
+            self._last_output = ""
+
+    def reinsert(self, text: str):
+        """Type a past dictation again, in order with anything still being output."""
+        self._output.submit(partial(self._reinsert_stage, text))
+
+    def _reinsert_stage(self, text: str, waited: float):
+        # The history window has just closed; let the target window take focus back first.
+        time.sleep(self._REINSERT_DELAY_SECS)
+        self.integration.output_text(text)
+        self._last_output = text
 
     def replay_last_recording(self):
         if self._last_audio is None or self._last_audio.size == 0:
             logger.info("No recording to replay yet.")
             return
         logger.info("Replaying last recording.")
-        sd.play(self._last_audio, samplerate=self.audio.sample_rate)
-        sd.wait()
+        import sounddevice as sd
+
+        registry = get_registry()
+        registry.stream_opened()
+        try:
+            sd.play(self._last_audio, samplerate=self.audio.sample_rate)
+            sd.wait()
+        finally:
+            registry.stream_closed()
 
     def run(self):
         logger.info("Starting Flow STT. Hotkey=%s, mode=%s", self.cfg.hotkey, self.cfg.mode)
         if self.ui:
-            self.ui.start()
-        self._register_hotkeys()
+            with self._startup.phase("ui_start"):
+                self.ui.start()
+        with self._startup.phase("hotkeys"):
+            self._register_hotkeys()
+        # Enumerate devices off the main thread so the settings dialog opens instantly.
+        self.audio.registry.refresh_interval = self.cfg.device_refresh_secs
+        self.audio.registry.start_background_refresh()
+        if self._config_watcher:
+            self._config_watcher.start()
         self._set_status("Idle")
+        self._startup.ready()
+        started = time.monotonic()
         try:
-            while True:
-                time.sleep(0.5)
+            while not self._shutdown.wait(self._MAIN_WAIT_SECS):
+                self._main_wakeups += 1
         except KeyboardInterrupt:
-            logger.info("Exiting.")
+            pass
+        logger.info("Exiting.")
+        self.audio.registry.stop_background_refresh()
+        self._log_wakeups(time.monotonic() - started)
+        self.close()
+
+    def close(self):
+        """Drain the pipeline and release workers; the app can't be used afterwards."""
+        if self._config_watcher:
+            self._config_watcher.stop()
+        # Let an in-flight dictation finish typing rather than cutting it off mid-word.
+        self._transcriber.close(timeout=30.0)
+        self._output.close(timeout=30.0)
+        self.integration.clear_hotkeys()
+        if self.speculative:
+            self.speculative.close()
+        if self.feature_stream:
+            self.feature_stream.close()
+        if self.archive:
+            self.archive.close()
+        if self.history:
+            self.history.close()
+        profile = self._profile
+        if profile is not None:
+            profile.close()
+        for exporter in (self._metrics_server, self._metrics_file):
+            if exporter is not None:
+                exporter.close()
+
+    def shutdown(self):
+        self._shutdown.set()
+
+    def _log_wakeups(self, elapsed: float):
+        ui_wakeups = self.ui.wakeups if self.ui else 0
+        watcher_wakeups = self._config_watcher.wakeups if self._config_watcher else 0
+        metrics_wakeups = self._metrics_file.wakeups if self._metrics_file else 0
+        total = ui_wakeups + self.audio.wakeups + self._main_wakeups + watcher_wakeups + metrics_wakeups
+        logger.info(
+            "Background wakeups: %.3f/s over %.0fs (ui=%d, silence watchdog=%d, main=%d, config watch=%d, metrics=%d)",
+            total / elapsed if elapsed > 0 else 0.0,
+            elapsed,
+            ui_wakeups,
+            self.audio.wakeups,
+            self._main_wakeups,
+            watcher_wakeups,
+            metrics_wakeups,
+        )
 
 
-def main():
-    app = DictationApp()
+def main(argv: Optional[Sequence[str]] = None, profiler: Optional[StartupProfiler] = None):
+    parser = argparse.ArgumentParser(prog="flow_stt", description="Local push-to-talk dictation.")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Log time spent per import and per init phase until the app is ready.",
+    )
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        default=None,
+        metavar="SECS",
+        help="With --profile-startup, warn when start-to-ready exceeds this many seconds.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Sample stacks and allocations over the first N dictations (see profile_dir).",
+    )
+    args = parser.parse_args(argv)
+    if profiler is None:
+        profiler = StartupProfiler(enabled=args.profile_startup)
+        profiler.install_import_hook()
+    profiler.budget_secs = args.startup_budget
+    app = DictationApp(profiler=profiler)
+    if args.profile > 0:
+        app.start_profile(args.profile)
     app.run()
 
 
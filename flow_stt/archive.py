@@ -0,0 +1,252 @@
+"""Opt-in recording archive used to build a local regression corpus.
+
+Each utterance is written as ``<stem>.wav`` (int16 PCM) plus ``<stem>.json``
+holding the transcript, per-stage timings and model settings. Writes happen on a
+background thread fed by a bounded queue; when the queue is full the utterance is
+dropped rather than stalling capture or transcription.
+
+Run ``python -m flow_stt.archive [DIR]`` to re-transcribe an archive with the
+current model and compare latency and text against what was recorded.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from queue import Full, Queue
+from threading import Thread
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_capture import float_to_int16
+from .config import default_data_dir
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_archive_dir() -> Path:
+    return default_data_dir() / "archive"
+
+
+@dataclass
+class ArchiveEntry:
+    stem: str
+    audio_path: Path
+    sample_rate: int
+    transcript: str
+    timings: Dict[str, float] = field(default_factory=dict)
+    meta: dict = field(default_factory=dict)
+
+    @property
+    def reference(self) -> str:
+        """Hand-corrected text if someone added one, otherwise the recorded transcript."""
+        return self.meta.get("reference") or self.transcript
+
+    def load_audio(self) -> np.ndarray:
+        with wave.open(str(self.audio_path), "rb") as wav:
+            channels = wav.getnchannels()
+            data = wav.readframes(wav.getnframes())
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+
+
+class RecordingArchive:
+    def __init__(self, directory: Path, max_bytes: int, queue_size: int = 16):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._queue: "Queue[Optional[tuple]]" = Queue(maxsize=queue_size)
+        self._entries: List[Tuple[str, int]] = []
+        self._total_bytes = 0
+        self._thread = Thread(target=self._run, name="flow-stt-archive", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        audio: np.ndarray,
+        sample_rate: int,
+        transcript: str,
+        timings: Dict[str, float],
+        meta: Optional[dict] = None,
+    ) -> bool:
+        """Queue an utterance for writing; never blocks the caller."""
+        try:
+            self._queue.put_nowait((time.time(), audio, sample_rate, transcript, dict(timings), dict(meta or {})))
+        except Full:
+            logger.warning("Recording archive is behind; dropping this utterance.")
+            return False
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._scan_existing()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+                self._enforce_retention()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Failed to archive recording: %s", exc)
+
+    def _scan_existing(self) -> None:
+        for entry in iter_entries(self.directory):
+            self._entries.append((entry.stem, self._entry_size(entry.stem)))
+        self._total_bytes = sum(size for _stem, size in self._entries)
+
+    def _write(self, timestamp, audio, sample_rate, transcript, timings, meta) -> None:
+        if audio.dtype != np.int16:
+            audio = float_to_int16(audio)
+        if audio.ndim == 1:
+            audio = audio.reshape(-1, 1)
+        stem = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)) + f"-{int(timestamp * 1000) % 1000:03d}"
+        wav_path = self.directory / f"{stem}.wav"
+        tmp_path = wav_path.with_suffix(".wav.tmp")
+        with wave.open(str(tmp_path), "wb") as wav:
+            wav.setnchannels(audio.shape[1])
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(np.ascontiguousarray(audio).tobytes())
+        os.replace(tmp_path, wav_path)
+        record = {
+            "audio": wav_path.name,
+            "sample_rate": sample_rate,
+            "duration_secs": round(audio.shape[0] / sample_rate, 3),
+            "transcript": transcript,
+            "timings": timings,
+            "created": timestamp,
+            **meta,
+        }
+        # The JSON file marks the entry as complete, so it is written last.
+        meta_path = self.directory / f"{stem}.json"
+        meta_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+        size = self._entry_size(stem)
+        self._entries.append((stem, size))
+        self._total_bytes += size
+
+    def _enforce_retention(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            stem, size = self._entries.pop(0)
+            for suffix in (".json", ".wav"):
+                try:
+                    (self.directory / f"{stem}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+            self._total_bytes -= size
+
+    def _entry_size(self, stem: str) -> int:
+        total = 0
+        for suffix in (".wav", ".json"):
+            try:
+                total += (self.directory / f"{stem}{suffix}").stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+def iter_entries(directory: Path) -> Iterator[ArchiveEntry]:
+    """Yield complete archive entries, oldest first."""
+    for meta_path in sorted(Path(directory).glob("*.json")):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Skipping unreadable archive entry %s: %s", meta_path.name, exc)
+            continue
+        audio_path = meta_path.with_name(meta.get("audio", f"{meta_path.stem}.wav"))
+        if not audio_path.exists():
+            continue
+        yield ArchiveEntry(
+            stem=meta_path.stem,
+            audio_path=audio_path,
+            sample_rate=int(meta.get("sample_rate", 16000)),
+            transcript=meta.get("transcript", ""),
+            timings=meta.get("timings", {}),
+            meta=meta,
+        )
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_benchmark(directory: Path, limit: Optional[int] = None) -> None:
+    """Re-transcribe archived utterances and report latency and accuracy drift."""
+    from .config import ConfigManager
+    from .scheduling import ThreadPolicy
+    from .stt_engine import SpeechToTextEngine
+
+    cfg = ConfigManager().config
+    engine = SpeechToTextEngine(
+        model_size=cfg.model_size,
+        language=cfg.language,
+        prefer_gpu=cfg.prefer_gpu,
+        max_fallbacks=cfg.max_temperature_fallbacks,
+        deadline_secs=cfg.decode_deadline_secs or None,
+        cpu_threads=cfg.inference_threads,
+        policy=ThreadPolicy(cfg.inference_cpus, cfg.inference_nice),
+        model_cache_dir=cfg.model_cache_dir,
+    )
+    latencies: List[float] = []
+    errors: List[float] = []
+    for count, entry in enumerate(iter_entries(directory)):
+        if limit is not None and count >= limit:
+            break
+        audio = entry.load_audio()
+        started = time.perf_counter()
+        result = engine.transcribe(audio, sample_rate=entry.sample_rate)
+        elapsed = time.perf_counter() - started
+        wer = word_error_rate(entry.reference, result.final_text)
+        latencies.append(elapsed)
+        errors.append(wer)
+        print(
+            f"{entry.stem}  audio={audio.shape[0] / entry.sample_rate:6.2f}s  "
+            f"recorded={entry.timings.get('inference', float('nan')):6.2f}s  now={elapsed:6.2f}s  wer={wer:.2f}  "
+            f"fallbacks={result.fallbacks}{'  deadline' if result.deadline_hit else ''}"
+        )
+    if not latencies:
+        print(f"No archived recordings found in {directory}")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(
+        f"{len(latencies)} utterances  mean={sum(latencies) / len(latencies):.2f}s  "
+        f"p95={p95:.2f}s  mean_wer={sum(errors) / len(errors):.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-run archived recordings through the current model.")
+    parser.add_argument("directory", nargs="?", type=Path, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    run_benchmark(args.directory or default_archive_dir(), args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,184 @@
 import logging
+import tempfile
 import time
-from queue import Queue
-from threading import Event, Thread
-from typing import Callable, List, Optional
+from threading import Condition, Event, Lock, Thread
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Union
 
 import numpy as np
-import sounddevice as sd
+
+from . import metrics
+from .devices import DeviceRegistry, get_registry
+from .resample import StreamingResampler
+from .scheduling import raise_thread_priority
+
+if TYPE_CHECKING:
+    import sounddevice as sd
 
 
 logger = logging.getLogger(__name__)
 
 
 def list_input_devices() -> List[str]:
-    devices = []
-    for idx, device in enumerate(sd.query_devices()):
-        if device.get("max_input_channels", 0) > 0:
-            devices.append(f"{idx}: {device['name']}")
-    return devices
+    return [device.label for device in get_registry().devices()]
+
+
+def float_to_int16(block: np.ndarray) -> np.ndarray:
+    """Quantize float samples in [-1, 1] to int16, clipping anything outside."""
+    return (np.clip(block, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+class SampleBuffer:
+    """Append-only int16 sample store that spills to a temp file past a memory cap.
+
+    Blocks are kept in memory until ``max_memory_bytes`` is reached. Past that,
+    ``append`` only queues each block; a writer thread copies the in-memory head
+    to the front of an anonymous temp file and appends the queued blocks after
+    it, so a stalled disk never holds up the audio callback. ``to_array`` returns
+    a read-only memmap over the whole recording so long dictations never need one
+    big contiguous allocation.
+    """
+
+    def __init__(self, channels: int = 1, max_memory_bytes: int = 64 * 1024 * 1024):
+        self.channels = channels
+        self.max_memory_bytes = max_memory_bytes
+        self._blocks: List[np.ndarray] = []
+        self._memory_bytes = 0
+        self._frames = 0
+        self._spilling = False
+        self._queued: List[np.ndarray] = []  # spilled blocks the writer hasn't stored yet
+        self._written = 0  # bytes of spilled blocks in the file, after the head
+        self._spill = None  # created by the writer thread
+        self._writer: Optional[Thread] = None
+        self._closed = False
+        self._lock = Lock()
+        self._wake = Condition(self._lock)
+        # The file position is shared by the writer and peek(); the callback never takes this.
+        self._io_lock = Lock()
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    @property
+    def spilled(self) -> bool:
+        return self._spilling
+
+    def append(self, block: np.ndarray) -> np.ndarray:
+        samples = float_to_int16(block).reshape(-1, self.channels)
+        with self._lock:
+            if not self._spilling and self._memory_bytes + samples.nbytes > self.max_memory_bytes:
+                self._spilling = True
+                self._writer = Thread(target=self._write_spill, name="flow-stt-spill", daemon=True)
+                self._writer.start()
+            if self._spilling:
+                self._queued.append(samples)
+                self._wake.notify()
+            else:
+                self._blocks.append(samples)
+                self._memory_bytes += samples.nbytes
+            self._frames += samples.shape[0]
+        return samples
+
+    def peek(self, frames: int) -> np.ndarray:
+        """Copy out the first ``frames`` samples while capture keeps appending."""
+        with self._lock:
+            frames = min(frames, self._frames)
+            blocks = list(self._blocks)
+            # The file holds the first ``written`` spilled bytes, the queue everything after.
+            written = self._written
+            queued = list(self._queued)
+            spill = self._spill
+            head_bytes = self._memory_bytes
+        tail_bytes = min(written, frames * self.channels * 2 - head_bytes)
+        if tail_bytes > 0:
+            with self._io_lock:
+                if spill.closed:
+                    # to_array() finished meanwhile and left the whole recording in _blocks.
+                    return self.peek(frames)
+                spill.flush()
+                spill.seek(head_bytes)
+                spilled = spill.read(tail_bytes)
+            blocks.append(np.frombuffer(spilled, dtype=np.int16).reshape(-1, self.channels))
+        if tail_bytes == written:
+            blocks.extend(queued)
+        # Blocks are never mutated after append, so joining them outside the lock is safe.
+        head = np.concatenate(blocks, axis=0) if blocks else np.zeros((0, self.channels), dtype=np.int16)
+        return head[:frames]
+
+    def to_array(self) -> np.ndarray:
+        """Return all samples as one ``(frames, channels)`` int16 array."""
+        with self._lock:
+            if self._frames == 0:
+                return np.zeros((0, self.channels), dtype=np.int16)
+            if not self._spilling:
+                if len(self._blocks) == 1:
+                    return self._blocks[0]
+                return np.concatenate(self._blocks, axis=0)
+        self._stop_writer()
+        spill = self._spill
+        if spill is None or self._queued:
+            # The disk failed; whatever it holds plus the queue still adds up to everything.
+            audio = self.peek(self._frames)
+        else:
+            spill.flush()
+            # The memmap keeps its own handle, so the temp file disappears once
+            # the last reference to the audio goes away.
+            audio = np.memmap(spill, dtype=np.int16, mode="r", shape=(self._frames, self.channels))
+        with self._lock:
+            # A speculative decode of this recording may still peek() after it ended.
+            self._blocks = [audio]
+            self._memory_bytes = audio.nbytes
+            self._spilling = False
+            self._queued = []
+            self._written = 0
+            self._spill = None
+        self._close_spill(spill)
+        return audio
+
+    def close(self) -> None:
+        """Drop a recording that will never be read, stopping its writer."""
+        if self._writer is not None:
+            self._stop_writer()
+            spill, self._spill = self._spill, None
+            self._close_spill(spill)
+
+    def _close_spill(self, spill) -> None:
+        if spill is not None:
+            with self._io_lock:
+                spill.close()
+
+    def _stop_writer(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._writer.join()
+
+    def _write_spill(self) -> None:
+        try:
+            spill = tempfile.TemporaryFile(prefix="flow_stt_", suffix=".pcm")
+            # The in-memory head no longer changes once spilling has started.
+            for block in self._blocks:
+                spill.write(block.tobytes())
+            self._spill = spill
+            while True:
+                with self._lock:
+                    self._wake.wait_for(lambda: self._queued or self._closed)
+                    blocks = list(self._queued)
+                if not blocks:
+                    return
+                with self._io_lock:
+                    spill.seek(self._memory_bytes + self._written)
+                    for block in blocks:
+                        spill.write(block.tobytes())
+                with self._lock:
+                    del self._queued[: len(blocks)]
+                    self._written += sum(block.nbytes for block in blocks)
+        except OSError as exc:
+            logger.error("Could not spill audio to disk; keeping the rest in memory: %s", exc)
 
 
 class AudioCapture:
@@ -29,36 +191,72 @@ class AudioCapture:
         silence_timeout: Optional[float] = 60.0,
         silence_threshold: float = 0.015,
         on_silence: Optional[Callable[[], None]] = None,
+        max_memory_mb: float = 64.0,
+        native_rate: bool = True,
+        registry: Optional[DeviceRegistry] = None,
+        pause_secs: Optional[float] = None,
+        on_pause: Optional[Callable[[int, int, Callable[[int], np.ndarray]], None]] = None,
+        latency: Union[str, float, None] = None,
     ):
         self.device = device
+        # Rate of the audio handed out by get_audio(); the device may run at another
+        # rate (``stream_rate``), in which case blocks are resampled as they arrive.
         self.sample_rate = sample_rate
         self.channels = channels
         self.block_size = block_size
+        # PortAudio input latency: "low", "high" or seconds; None keeps the driver default.
+        self.latency = latency
+        self.native_rate = native_rate
+        self.stream_rate = sample_rate
+        self.registry = registry or get_registry()
+        # on_pause(covered_frames, last_voiced_frame, peek) fires once per pause of
+        # pause_secs after speech; it runs on the audio thread and must not block.
+        # ``peek(frames)`` copies from that recording's buffer, even after get_audio().
+        self.pause_secs = pause_secs
+        self.on_pause = on_pause
+        # Optional consumer of every stored int16 block (e.g. incremental features).
+        self.block_sink: Optional[Callable[[np.ndarray], None]] = None
         self.silence_timeout = silence_timeout
         self.silence_threshold = silence_threshold
         self.on_silence = on_silence
+        self.max_memory_mb = max_memory_mb
 
-        self._stream: Optional[sd.InputStream] = None
-        self._queue: Queue[np.ndarray] = Queue()
+        self._stream: Optional["sd.InputStream"] = None
+        self._resampler: Optional[StreamingResampler] = None
+        self._buffer = self._new_buffer()
         self._stop_event = Event()
         self._listening = False
         self._last_voice_time = time.time()
+        # Latest (rms, peak) of the most recent block. The callback swaps in a new
+        # tuple and readers take whatever is there, so the UI polls it at its own
+        # frame rate without a queue or lock.
+        self._levels: Tuple[float, float] = (0.0, 0.0)
+        self._last_voiced_frame = 0
+        self._pause_reported = True
+        self._callback_boosted = False
+        # Blocks PortAudio flagged as input overflow (samples lost) in the current recording.
+        self.overflows = 0
+        self.wakeups = 0
 
     def start(self) -> None:
         if self._listening:
             return
-        self._queue = Queue()
+        import sounddevice as sd
+
+        stale, self._buffer = self._buffer, self._new_buffer()
+        stale.close()
         self._stop_event.clear()
         self._last_voice_time = time.time()
-        self._stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=self.channels,
-            blocksize=self.block_size,
-            dtype="float32",
-            device=self._resolve_device(),
-            callback=self._callback,
-        )
-        self._stream.start()
+        self._last_voiced_frame = 0
+        self._pause_reported = True
+        self.overflows = 0
+        try:
+            self._open(sd)
+        except sd.PortAudioError as exc:
+            # Usually a stale device list after an unplug; re-enumerate and try once more.
+            logger.warning("Opening the input stream failed (%s); refreshing devices.", exc)
+            self.registry.refresh(reinitialize=True)
+            self._open(sd)
         self._listening = True
         if self.silence_timeout:
             Thread(target=self._silence_watchdog, daemon=True).start()
@@ -67,25 +265,38 @@ class AudioCapture:
         if not self._listening:
             return
         self._stop_event.set()
-        if self._stream:
-            try:
-                self._stream.stop()
-                self._stream.close()
-            except Exception as exc:  # noqa: BLE001
-                logger.warning("Failed to close audio stream: %s", exc)
-        self._stream = None
+        self._close_stream()
+        if self._resampler is not None:
+            self._append(self._resampler.flush())
+            self._resampler = None
         self._listening = False
+        self._levels = (0.0, 0.0)
+        if self.overflows:
+            logger.warning("Capture lost samples: %d input overflow(s) in this recording.", self.overflows)
+
+    def levels(self) -> Tuple[float, float]:
+        """Return the latest block's (rms, peak) amplitude in [0, 1]."""
+        return self._levels
+
+    @property
+    def last_voiced_frame(self) -> int:
+        """Output frame index just past the most recent block above the silence threshold."""
+        return self._last_voiced_frame
 
     def is_listening(self) -> bool:
         return self._listening
 
     def get_audio(self) -> np.ndarray:
-        frames = []
-        while not self._queue.empty():
-            frames.append(self._queue.get())
-        if not frames:
-            return np.zeros((0, self.channels), dtype=np.float32)
-        return np.concatenate(frames, axis=0)
+        """Return the captured int16 samples and reset the buffer."""
+        buffer, self._buffer = self._buffer, self._new_buffer()
+        if buffer.frames:
+            logger.debug(
+                "Captured %.1fs of audio (%.1f MiB in memory, spilled=%s)",
+                buffer.frames / self.sample_rate,
+                buffer.memory_bytes / (1024 * 1024),
+                buffer.spilled,
+            )
+        return buffer.to_array()
 
     def record_blocking(self, seconds: float) -> np.ndarray:
         self.start()
@@ -93,31 +304,146 @@ class AudioCapture:
         self.stop()
         return self.get_audio()
 
-    def _resolve_device(self):
-        if self.device in (None, "", "Default"):
-            return None
-        if isinstance(self.device, str) and ":" in self.device:
-            idx, _name = self.device.split(":", 1)
-            if idx.strip().isdigit():
-                return int(idx.strip())
-        return self.device
+    def _new_buffer(self) -> SampleBuffer:
+        # Capture always stores mono at ``sample_rate``; channels are mixed down per block.
+        return SampleBuffer(1, int(self.max_memory_mb * 1024 * 1024))
+
+    def _device_rate(self, sd, device) -> int:
+        try:
+            return int(sd.query_devices(device, "input")["default_samplerate"])
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Could not query device sample rate: %s", exc)
+            return self.sample_rate
+
+    def _open_stream(self, sd, device, rate: int) -> None:
+        self.stream_rate = rate
+        self._callback_boosted = False
+        self._resampler = StreamingResampler(rate, self.sample_rate) if rate != self.sample_rate else None
+        # block_size is expressed in output frames so latency stays the same at any device rate.
+        blocksize = max(1, round(self.block_size * rate / self.sample_rate))
+        # Registered before construction: a device refresh must not re-initialize PortAudio mid-open.
+        self.registry.stream_opened()
+        try:
+            self._stream = sd.InputStream(
+                samplerate=rate,
+                channels=self.channels,
+                blocksize=blocksize,
+                dtype="float32",
+                device=device,
+                latency=self.latency,
+                callback=self._callback,
+                finished_callback=self._on_stream_finished,
+            )
+        except Exception:
+            self.registry.stream_closed()
+            raise
+        try:
+            self._stream.start()
+        except Exception:
+            self._close_stream()
+            raise
+        if self._resampler is not None:
+            logger.info("Capturing at %d Hz, resampling to %d Hz.", rate, self.sample_rate)
+
+    def _open(self, sd) -> None:
+        device = self.registry.resolve(self.device)
+        rates = [self.sample_rate]
+        if self.native_rate:
+            rates = list(dict.fromkeys([self._device_rate(sd, device), self.sample_rate]))
+        for rate in rates:
+            try:
+                self._open_stream(sd, device, rate)
+                return
+            except sd.PortAudioError as exc:
+                if rate == rates[-1]:
+                    raise
+                logger.warning("Could not open input at %d Hz (%s); retrying at %d Hz.", rate, exc, self.sample_rate)
+
+    def _append(self, samples: np.ndarray) -> SampleBuffer:
+        buffer = self._buffer
+        stored = buffer.append(samples)
+        sink = self.block_sink
+        if sink is not None:
+            sink(stored)
+        return buffer
+
+    def _close_stream(self) -> None:
+        stream, self._stream = self._stream, None
+        if stream is None:
+            return
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to close audio stream: %s", exc)
+        finally:
+            self.registry.stream_closed()
+
+    def _on_stream_finished(self) -> None:
+        # PortAudio also calls this after a normal stop(); only a stream that ends
+        # while we are still listening means the device went away.
+        if self._listening and not self._stop_event.is_set():
+            Thread(target=self._recover, name="flow-stt-capture-recover", daemon=True).start()
+
+    def _recover(self) -> None:
+        import sounddevice as sd
+
+        logger.warning("Input stream ended unexpectedly; reopening.")
+        self._close_stream()
+        if self._resampler is not None:
+            self._append(self._resampler.flush())
+        self.registry.refresh(reinitialize=True)
+        if self._stop_event.is_set():
+            return
+        try:
+            self._open(sd)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Could not reopen the input stream: %s", exc)
 
     def _callback(self, indata, frames, time_info, status):
+        if not self._callback_boosted:
+            # PortAudio owns this thread; the first callback is our only chance to raise it.
+            self._callback_boosted = True
+            raise_thread_priority()
+        metrics.AUDIO_CAPTURED.inc(frames / self.stream_rate)
         if status:
+            if status.input_overflow:
+                self.overflows += 1
+                metrics.INPUT_OVERFLOWS.inc()
             logger.debug("Audio stream status: %s", status)
-        self._queue.put(indata.copy())
-        rms = float(np.sqrt(np.mean(np.square(indata))))
+        mono = indata[:, 0] if indata.shape[1] == 1 else indata.mean(axis=1)
+        resampler = self._resampler
+        if resampler is not None:
+            mono = resampler.process(mono)
+        buffer = self._append(mono)
+        # vdot and max/min reduce in place, so the stats cost no block-sized temporaries.
+        rms = float(np.sqrt(np.vdot(indata, indata) / indata.size)) if indata.size else 0.0
+        peak = float(max(indata.max(), -indata.min())) if indata.size else 0.0
+        self._levels = (rms, peak)
         if rms > self.silence_threshold:
             self._last_voice_time = time.time()
+            self._last_voiced_frame = buffer.frames
+            self._pause_reported = False
+        elif (
+            not self._pause_reported
+            and self.on_pause is not None
+            and self.pause_secs
+            and buffer.frames - self._last_voiced_frame >= self.pause_secs * self.sample_rate
+        ):
+            self._pause_reported = True
+            self.on_pause(buffer.frames, self._last_voiced_frame, buffer.peek)
 
     def _silence_watchdog(self):
-        while not self._stop_event.is_set():
-            if self.silence_timeout is None:
-                return
-            if time.time() - self._last_voice_time > self.silence_timeout:
+        # Sleep until the earliest moment the timeout could fire rather than polling;
+        # voice activity only ever pushes that deadline later.
+        while self.silence_timeout is not None:
+            remaining = self._last_voice_time + self.silence_timeout - time.time()
+            if remaining <= 0:
                 logger.debug("Silence timeout reached; stopping capture.")
                 self.stop()
                 if self.on_silence:
                     self.on_silence()
                 return
-            time.sleep(0.1)
+            if self._stop_event.wait(remaining):
+                return
+            self.wakeups += 1
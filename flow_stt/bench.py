@@ -0,0 +1,307 @@
+"""Microbenchmarks for the hot paths around the model.
+
+Covers the capture callback, ``get_audio``, text post-processing and the
+integrations' chunked typing, all on seeded synthetic input (10 minutes of
+audio blocks, a 50 KB transcript) with fake keyboard backends, so no device,
+model or display is needed. Each benchmark reports time per call and the peak
+transient allocation per call.
+
+``--memory`` instead measures peak traced memory for a whole 10-minute capture
+handed to the engine: the old float32 block queue against the int16
+``SampleBuffer``, in memory and spilled.
+
+    python -m flow_stt.bench --save baseline.json     # record a baseline
+    python -m flow_stt.bench --compare baseline.json  # exit 1 on regressions
+    python -m flow_stt.bench --memory                 # capture peak memory
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+AUDIO_SECS = 600
+BLOCK_FRAMES = 2048
+TRANSCRIPT_BYTES = 50_000
+SEED = 1234
+
+# setup() -> (call, calls): ``call`` runs one operation and is invoked ``calls`` times.
+Setup = Callable[[], Tuple[Callable[[], object], int]]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    calls: int
+    secs_per_call: float
+    alloc_bytes_per_call: float
+
+
+class FakeController:
+    """Records what would be typed; stands in for pynput's Controller."""
+
+    def __init__(self):
+        self.typed = 0
+
+    def type(self, text: str) -> None:
+        self.typed += len(text)
+
+    def press(self, key) -> None:
+        pass
+
+    def release(self, key) -> None:
+        pass
+
+    @contextmanager
+    def pressed(self, *keys):
+        yield
+
+
+class FakeKeyboard:
+    """Stands in for the ``keyboard`` module used by the Windows integration."""
+
+    def __init__(self):
+        self.typed = 0
+
+    def write(self, text: str, delay: float = 0) -> None:
+        self.typed += len(text)
+
+    def send(self, keys: str) -> None:
+        pass
+
+
+def _audio_blocks(channels: int = 1) -> List[np.ndarray]:
+    rng = np.random.default_rng(SEED)
+    count = AUDIO_SECS * 16000 // BLOCK_FRAMES
+    base = (0.1 * rng.standard_normal((BLOCK_FRAMES * 8, channels))).astype(np.float32)
+    # Rotate through a few distinct blocks instead of holding 10 minutes of float32.
+    return [base[(i % 8) * BLOCK_FRAMES : (i % 8 + 1) * BLOCK_FRAMES] for i in range(count)]
+
+
+def _transcript() -> str:
+    rng = np.random.default_rng(SEED)
+    vocabulary = (
+        "the quick brown fox jumps over a lazy dog while we dictate notes about "
+        "latency budgets and audio buffers comma period new line question mark"
+    ).split()
+    words: List[str] = []
+    size = 0
+    while size < TRANSCRIPT_BYTES:
+        word = vocabulary[int(rng.integers(len(vocabulary)))]
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def _capture(**kwargs):
+    from .audio_capture import AudioCapture
+    from .devices import DeviceRegistry
+
+    return AudioCapture(silence_timeout=None, registry=DeviceRegistry(refresh_interval=0), **kwargs)
+
+
+def setup_callback() -> Tuple[Callable[[], object], int]:
+    capture = _capture()
+    blocks = iter(_audio_blocks())
+    return (lambda: capture._callback(next(blocks), BLOCK_FRAMES, None, None)), AUDIO_SECS * 16000 // BLOCK_FRAMES
+
+
+def setup_callback_resampled() -> Tuple[Callable[[], object], int]:
+    from .resample import StreamingResampler
+
+    capture = _capture()
+    capture._resampler = StreamingResampler(48000, 16000)
+    blocks = iter(_audio_blocks())
+    # 48 kHz blocks of the same size cover a third of the time, so run a third as many.
+    return (lambda: capture._callback(next(blocks), BLOCK_FRAMES, None, None)), AUDIO_SECS * 16000 // BLOCK_FRAMES // 3
+
+
+def _filled(max_memory_mb: float):
+    capture = _capture(max_memory_mb=max_memory_mb)
+    for block in _audio_blocks():
+        capture._callback(block, BLOCK_FRAMES, None, None)
+    return capture
+
+
+def setup_get_audio() -> Tuple[Callable[[], object], int]:
+    return _filled(64.0).get_audio, 1
+
+
+def setup_get_audio_spilled() -> Tuple[Callable[[], object], int]:
+    return _filled(4.0).get_audio, 1
+
+
+def setup_postprocess() -> Tuple[Callable[[], object], int]:
+    from .postprocess import TextPostProcessor
+
+    processor = TextPostProcessor(enable_spoken_punctuation=True)
+    text = _transcript()
+    return (lambda: processor.process(text)), 5
+
+
+def setup_type_text_pynput() -> Tuple[Callable[[], object], int]:
+    from .pynput_integration import PynputIntegration
+
+    integration = PynputIntegration(controller=FakeController(), chunk_delay=0)
+    text = _transcript()
+    return (lambda: integration.type_text(text)), 20
+
+
+def setup_type_text_windows() -> Tuple[Callable[[], object], int]:
+    from .windows_integration import WindowsIntegration
+
+    integration = WindowsIntegration(controller=FakeKeyboard(), chunk_delay=0)
+    text = _transcript()
+    return (lambda: integration.type_text(text)), 20
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "capture_callback": setup_callback,
+    "capture_callback_48k": setup_callback_resampled,
+    "get_audio": setup_get_audio,
+    "get_audio_spilled": setup_get_audio_spilled,
+    "postprocess_50kb": setup_postprocess,
+    "type_text_pynput": setup_type_text_pynput,
+    "type_text_windows": setup_type_text_windows,
+}
+
+
+def run_benchmark(name: str, setup: Setup, repeats: int = 3, alloc_samples: int = 50) -> BenchResult:
+    best = float("inf")
+    calls = 0
+    for _ in range(repeats):
+        call, calls = setup()
+        started = time.perf_counter()
+        for _ in range(calls):
+            call()
+        best = min(best, (time.perf_counter() - started) / calls)
+    # Allocations are measured on a fresh setup; tracing would skew the timings above.
+    call, calls = setup()
+    samples = min(calls, alloc_samples)
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before, _peak = tracemalloc.get_traced_memory()
+            call()
+            _current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, calls, best, sum(peaks) / len(peaks))
+
+
+def _legacy_capture(blocks: List[np.ndarray]) -> np.ndarray:
+    # The pre-SampleBuffer path: a float32 copy per block, concatenated on stop, copied
+    # again to keep for replay, and once more by the engine's astype.
+    queued = [block.copy() for block in blocks]
+    audio = np.concatenate(queued, axis=0)
+    del queued
+    last_audio = audio.copy()
+    widened = audio.astype(np.float32)
+    return widened[:1] + last_audio[:1]
+
+
+def _buffered_capture(blocks: List[np.ndarray], max_memory_mb: float) -> np.ndarray:
+    from .stt_engine import prepare_audio
+
+    capture = _capture(max_memory_mb=max_memory_mb)
+    for block in blocks:
+        capture._callback(block, BLOCK_FRAMES, None, None)
+    # The app keeps the int16 buffer for replay; the engine widens it once.
+    audio = capture.get_audio()
+    return prepare_audio(audio)[:1]
+
+
+def capture_memory() -> Dict[str, float]:
+    """Peak traced bytes from the first captured block until the engine has its float32 input."""
+    blocks = _audio_blocks()
+    paths = {
+        "float32 queue (before)": _legacy_capture,
+        "int16 buffer": lambda b: _buffered_capture(b, 256.0),
+        "int16 buffer, spilled": lambda b: _buffered_capture(b, 4.0),
+    }
+    peaks = {}
+    for name, run in paths.items():
+        tracemalloc.start()
+        try:
+            run(blocks)
+            _current, peaks[name] = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return peaks
+
+
+def compare(results: List[BenchResult], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Names of benchmarks that got slower or allocate more than ``tolerance`` times the baseline."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if not base:
+            continue
+        slower = result.secs_per_call > base["secs_per_call"] * tolerance
+        # Ignore allocation noise in the low kilobytes.
+        heavier = result.alloc_bytes_per_call > max(base["alloc_bytes_per_call"] * tolerance, 4096)
+        if slower or heavier:
+            regressions.append(result.name)
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)}).")
+    parser.add_argument("--save", type=Path, help="Write results to this JSON baseline.")
+    parser.add_argument("--compare", type=Path, help="Compare against this JSON baseline; exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown factor (default 1.25).")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--memory", action="store_true", help="Measure peak memory of a long capture instead.")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        audio_mb = AUDIO_SECS * 16000 * 4 / (1024 * 1024)
+        print(f"Peak traced memory for {AUDIO_SECS // 60} min of 16 kHz mono ({audio_mb:.1f} MiB as float32):")
+        for name, peak in capture_memory().items():
+            print(f"  {name:24} {peak / (1024 * 1024):8.1f} MiB")
+        return
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else {}
+    results: List[BenchResult] = []
+    for name in args.names or list(BENCHMARKS):
+        try:
+            result = run_benchmark(name, BENCHMARKS[name], repeats=args.repeats)
+        except ImportError as exc:
+            print(f"{name:22} skipped ({exc})")
+            continue
+        results.append(result)
+        line = f"{name:22} {result.secs_per_call * 1e6:12.1f} us/call {result.alloc_bytes_per_call / 1024:10.1f} KiB/call"
+        base = baseline.get(name)
+        if base:
+            line += (
+                f"   x{result.secs_per_call / base['secs_per_call']:.2f} time"
+                f"  x{result.alloc_bytes_per_call / max(base['alloc_bytes_per_call'], 1.0):.2f} alloc"
+            )
+        print(line)
+    if args.save:
+        args.save.write_text(json.dumps({r.name: asdict(r) for r in results}, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond x{args.tolerance:.2f}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
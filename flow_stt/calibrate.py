@@ -0,0 +1,307 @@
+"""Find the smallest capture block size and latency the current input device handles cleanly.
+
+Smaller blocks let silence detection, pause detection and speculative decoding
+react sooner. But each callback then has less time to run, and the driver gets
+less slack before it overruns. For each candidate, the real capture callback
+runs against the configured microphone for a few seconds while the calibrator
+records:
+
+- how far callback arrivals stray from the block period (jitter),
+- how many blocks the driver flagged as input overflow or never delivered,
+- how long the callback itself takes.
+
+The smallest stable setting is written to ``capture_block_size`` and
+``capture_latency``.
+
+    python -m flow_stt.calibrate              # measure and save
+    python -m flow_stt.calibrate --fake       # simulated stream, nothing saved
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .audio_capture import AudioCapture
+from .devices import DeviceRegistry
+
+
+logger = logging.getLogger(__name__)
+
+Latency = Union[str, float, None]
+
+BLOCK_SIZES = (256, 512, 1024, 2048)  # output frames at 16 kHz: 16, 32, 64, 128 ms
+LATENCIES: Tuple[Latency, ...] = ("low", "high")
+SAMPLE_RATE = 16000
+SEED = 99
+
+# A setting is stable when, over the whole run:
+MAX_JITTER_FRACTION = 0.5  # p99 arrival jitter stays under half a block period,
+MAX_COST_FRACTION = 0.2  # the callback uses under a fifth of its period on average,
+MIN_DELIVERED = 0.95  # and nearly every expected block arrives, none flagged as overflow.
+WARMUP_CALLBACKS = 3  # stream start-up is always bumpy; ignore the first few arrivals
+
+
+@dataclass
+class Trial:
+    block_size: int
+    latency: Latency
+    seconds: float
+    callbacks: int
+    expected: int
+    overflows: int
+    jitter_p99_ms: float
+    cost_mean_ms: float
+    cost_max_ms: float
+
+    @property
+    def period_ms(self) -> float:
+        return 1000.0 * self.block_size / SAMPLE_RATE
+
+    @property
+    def stable(self) -> bool:
+        return (
+            self.overflows == 0
+            and self.callbacks >= MIN_DELIVERED * self.expected
+            and self.jitter_p99_ms <= MAX_JITTER_FRACTION * self.period_ms
+            and self.cost_mean_ms <= MAX_COST_FRACTION * self.period_ms
+        )
+
+
+class FakeStatus:
+    """Mimics sounddevice's CallbackFlags for the one flag capture looks at."""
+
+    def __init__(self, input_overflow: bool = False):
+        self.input_overflow = input_overflow
+
+    def __bool__(self) -> bool:
+        return self.input_overflow
+
+    def __str__(self) -> str:
+        return "input overflow" if self.input_overflow else ""
+
+
+class FakeInputStream:
+    """Stands in for ``sounddevice.InputStream``: noise blocks from a thread, with scheduling jitter.
+
+    Each block is ready one period after the previous one and is delivered after
+    a random, exponentially distributed delay of mean ``jitter_secs``. If a block
+    is delivered later than the stream's latency allows, the blocks the host
+    buffer could not hold are dropped. The next callback is then flagged as an
+    input overflow, as a real driver does.
+    """
+
+    LATENCY_SECS = {"low": 0.01, "high": 0.1}
+
+    def __init__(
+        self,
+        samplerate: float,
+        channels: int,
+        blocksize: int,
+        dtype: str = "float32",
+        device=None,
+        latency: Latency = None,
+        callback: Optional[Callable] = None,
+        finished_callback: Optional[Callable[[], None]] = None,
+        jitter_secs: float = 0.002,
+        seed: int = SEED,
+    ):
+        self.samplerate = float(samplerate)
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.jitter_secs = jitter_secs
+        if isinstance(latency, (int, float)):
+            self.latency = float(latency)
+        else:
+            self.latency = self.LATENCY_SECS.get(latency or "high", self.LATENCY_SECS["high"])
+        self._rng = np.random.default_rng(seed)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fake-input-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+    def close(self) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        period = self.blocksize / self.samplerate
+        noise = (0.01 * self._rng.standard_normal((self.blocksize * 4, self.channels))).astype(np.float32)
+        started = time.perf_counter()
+        block = 0
+        overflow = False
+        while not self._stop.is_set():
+            ready = started + (block + 1) * period
+            due = ready + self._rng.exponential(self.jitter_secs)
+            delay = due - time.perf_counter()
+            if delay > 0 and self._stop.wait(delay):
+                return
+            late = time.perf_counter() - ready
+            if late > self.latency:
+                # The host buffer overran: skip what it could not hold and flag the next block.
+                block += max(1, int(late // period))
+                overflow = True
+                continue
+            offset = (block % 4) * self.blocksize
+            self.callback(noise[offset : offset + self.blocksize], self.blocksize, None, FakeStatus(overflow))
+            overflow = False
+            block += 1
+
+
+class FakeSoundDevice:
+    """Just enough of the ``sounddevice`` module for ``AudioCapture`` to open a ``FakeInputStream``."""
+
+    class PortAudioError(Exception):
+        pass
+
+    def __init__(self, jitter_secs: float = 0.002, samplerate: float = SAMPLE_RATE):
+        self.jitter_secs = jitter_secs
+        self.samplerate = samplerate
+
+    def InputStream(self, **kwargs) -> FakeInputStream:  # noqa: N802 - mirrors sounddevice
+        return FakeInputStream(jitter_secs=self.jitter_secs, **kwargs)
+
+    def query_devices(self, device=None, kind=None) -> dict:
+        return {"name": "fake", "default_samplerate": self.samplerate, "max_input_channels": 1}
+
+
+def measure(
+    sd,
+    block_size: int,
+    latency: Latency,
+    seconds: float = 3.0,
+    device: Optional[str] = None,
+    native_rate: bool = True,
+    registry: Optional[DeviceRegistry] = None,
+) -> Trial:
+    """Run the real capture callback on ``sd``'s input stream with one setting."""
+    capture = AudioCapture(
+        device=device,
+        sample_rate=SAMPLE_RATE,
+        block_size=block_size,
+        latency=latency,
+        silence_timeout=None,
+        native_rate=native_rate,
+        registry=registry,
+    )
+    arrivals: List[float] = []
+    costs: List[float] = []
+    callback = capture._callback
+
+    def timed(indata, frames, time_info, status):
+        arrived = time.perf_counter()
+        callback(indata, frames, time_info, status)
+        costs.append(time.perf_counter() - arrived)
+        arrivals.append(arrived)
+
+    # _open_stream hands PortAudio whatever _callback is at that moment.
+    capture._callback = timed
+    capture._open(sd)
+    try:
+        time.sleep(seconds)
+    finally:
+        capture._close_stream()
+
+    period = block_size / SAMPLE_RATE
+    intervals = np.diff(np.asarray(arrivals[WARMUP_CALLBACKS:]))
+    jitter = float(np.percentile(np.abs(intervals - period), 99)) if intervals.size else float("inf")
+    cost = np.asarray(costs[WARMUP_CALLBACKS:] or [float("inf")])
+    return Trial(
+        block_size=block_size,
+        latency=latency,
+        seconds=seconds,
+        callbacks=len(arrivals),
+        expected=int(seconds / period),
+        overflows=capture.overflows,
+        jitter_p99_ms=1000.0 * jitter,
+        cost_mean_ms=1000.0 * float(cost.mean()),
+        cost_max_ms=1000.0 * float(cost.max()),
+    )
+
+
+def calibrate(
+    sd,
+    block_sizes: Sequence[int] = BLOCK_SIZES,
+    latencies: Sequence[Latency] = LATENCIES,
+    seconds: float = 3.0,
+    exhaustive: bool = False,
+    on_trial: Optional[Callable[[Trial], None]] = None,
+    **measure_kwargs,
+) -> Tuple[List[Trial], Optional[Trial]]:
+    """Try settings from the smallest block up; return all trials and the first stable one."""
+    trials: List[Trial] = []
+    best: Optional[Trial] = None
+    for block_size in sorted(block_sizes):
+        for latency in latencies:
+            trial = measure(sd, block_size, latency, seconds, **measure_kwargs)
+            trials.append(trial)
+            if on_trial is not None:
+                on_trial(trial)
+            if trial.stable and best is None:
+                best = trial
+                if not exhaustive:
+                    return trials, best
+    return trials, best
+
+
+def _print_trial(trial: Trial) -> None:
+    print(
+        f"block {trial.block_size:5} ({trial.period_ms:5.1f} ms)  latency {str(trial.latency):5}  "
+        f"blocks {trial.callbacks:4}/{trial.expected:<4} overflows {trial.overflows:3}  "
+        f"jitter p99 {trial.jitter_p99_ms:6.2f} ms  callback {trial.cost_mean_ms:5.2f}/{trial.cost_max_ms:5.2f} ms"
+        f"  {'stable' if trial.stable else 'unstable'}"
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .config import ConfigManager
+
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.calibrate", description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="Capture time per setting (default 3).")
+    parser.add_argument("--all", action="store_true", help="Measure every setting, not just up to the first stable one.")
+    parser.add_argument("--dry-run", action="store_true", help="Report only; don't update the config.")
+    parser.add_argument("--fake", action="store_true", help="Use a simulated stream instead of the microphone.")
+    parser.add_argument("--fake-jitter-ms", type=float, default=2.0, help="Mean scheduling delay of the simulated stream.")
+    args = parser.parse_args(argv)
+
+    cfg_manager = ConfigManager()
+    cfg = cfg_manager.config
+    if args.fake:
+        sd = FakeSoundDevice(jitter_secs=args.fake_jitter_ms / 1000.0)
+        measure_kwargs = {"registry": DeviceRegistry(refresh_interval=0)}
+    else:
+        import sounddevice as sd
+
+        measure_kwargs = {"device": cfg.mic_device, "native_rate": cfg.capture_native_rate}
+
+    _trials, best = calibrate(sd, seconds=args.seconds, exhaustive=args.all, on_trial=_print_trial, **measure_kwargs)
+    if best is None:
+        print(f"No stable setting found; keeping block {cfg.capture_block_size}, latency {cfg.capture_latency}.")
+        sys.exit(1)
+    print(f"Smallest stable setting: block {best.block_size} ({best.period_ms:.0f} ms), latency {best.latency}.")
+    if args.fake or args.dry_run:
+        return
+    cfg_manager.update(capture_block_size=best.block_size, capture_latency=best.latency)
+    print(f"Saved to {cfg_manager.path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Clipboard backends for copy and paste output.
+
+On Linux, ``pyperclip`` forks ``xclip``/``xsel``/``wl-copy`` for every copy, and
+the pasted text then has to be given a fixed moment to land. ``TkClipboard``
+instead owns the X11 CLIPBOARD selection from a hidden Tk window on its own
+thread and serves paste requests in-process. ``copy`` returns once ownership is
+confirmed, and the previous contents can be put back after the target app has
+actually fetched the pasted text.
+
+Run ``python -m flow_stt.clipboard`` (under a real or virtual X server such as
+Xvfb) to measure, for each available backend, copy latency and copy-to-paste
+latency: the time until a separate client process has fetched the text, as the
+target app does on Ctrl+V.
+"""
+
+import logging
+import platform
+import subprocess
+import sys
+import threading
+import time
+from queue import Empty, Queue
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class PyperclipClipboard:
+    """Fallback backend; copies are synchronous but not confirmed, so pastes wait a moment."""
+
+    settle_secs = 0.05
+    restore_delay_secs = 0.3
+
+    def copy(self, text: str) -> None:
+        import pyperclip
+
+        pyperclip.copy(text)
+
+    def read(self) -> Optional[str]:
+        import pyperclip
+
+        try:
+            return pyperclip.paste()
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Could not read clipboard: %s", exc)
+            return None
+
+    def expect_paste(self) -> None:
+        # Give the clipboard a moment to update before pasting; plain copies skip it.
+        time.sleep(self.settle_secs)
+
+    def restore(self, text: str) -> None:
+        import pyperclip
+
+        copied = self.read()
+
+        def restore_if_unchanged():
+            if self.read() == copied:
+                pyperclip.copy(text)
+
+        # No way to know when the target app has read the selection; give it a head start.
+        timer = threading.Timer(self.restore_delay_secs, restore_if_unchanged)
+        timer.daemon = True
+        timer.start()
+
+    def close(self) -> None:
+        pass
+
+
+class TkClipboard:
+    """Owns the X11 CLIPBOARD selection and serves it from a dedicated Tk thread."""
+
+    served_timeout_secs = 1.0
+
+    def __init__(self, start_timeout: float = 2.0):
+        self._calls: "Queue[tuple]" = Queue()
+        self._ready = threading.Event()
+        # Completed selection requests, and their count when the paste keystroke was sent.
+        self._served = threading.Condition()
+        self._serves = 0
+        self._paste_mark = 0
+        self._root = None
+        self._text = ""
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="flow-stt-clipboard", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(start_timeout) or self._error is not None:
+            raise RuntimeError(f"Tk clipboard unavailable: {self._error or 'timed out'}")
+
+    def copy(self, text: str) -> None:
+        """Take ownership of CLIPBOARD with ``text``; returns once ownership is confirmed."""
+        with self._generation_lock:
+            self._generation += 1
+        if not self._call(self._own, text):
+            raise RuntimeError("Could not take ownership of the clipboard.")
+
+    def read(self) -> Optional[str]:
+        return self._call(self._read)
+
+    def expect_paste(self) -> None:
+        """Call just before sending the paste keystroke.
+
+        Clipboard managers fetch the selection as soon as ownership changes. Only
+        requests served after this point count as the target app's paste.
+        """
+        with self._served:
+            self._paste_mark = self._serves
+
+    def restore(self, text: str) -> None:
+        """Put ``text`` back once the pending paste has been served (or after a timeout)."""
+        with self._generation_lock:
+            generation = self._generation
+        with self._served:
+            mark = self._paste_mark
+
+        def restore_when_served():
+            with self._served:
+                served = self._served.wait_for(lambda: self._serves > mark, self.served_timeout_secs)
+            if not served:
+                logger.debug("Paste was not served within %.1fs; restoring anyway.", self.served_timeout_secs)
+            try:
+                self._call(self._restore, text, generation)
+            except RuntimeError as exc:
+                logger.debug("Could not restore clipboard: %s", exc)
+
+        threading.Thread(target=restore_when_served, name="flow-stt-clipboard-restore", daemon=True).start()
+
+    def close(self) -> None:
+        root = self._root
+        if root is not None:
+            self._submit(root.quit, None)
+
+    def _call(self, fn: Callable, *args, timeout: float = 2.0):
+        result: "Queue[tuple]" = Queue(maxsize=1)
+        self._submit(fn, result, *args)
+        try:
+            ok, value = result.get(timeout=timeout)
+        except Empty:
+            raise RuntimeError("Clipboard thread did not respond.") from None
+        if not ok:
+            raise RuntimeError(f"Clipboard operation failed: {value}")
+        return value
+
+    def _submit(self, fn: Callable, result: Optional[Queue], *args) -> None:
+        self._calls.put((fn, args, result))
+        root = self._root
+        if root is not None:
+            try:
+                # Same wake-up as the overlay: no polling while idle.
+                root.event_generate("<<ClipboardCall>>", when="tail")
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Could not wake clipboard thread: %s", exc)
+
+    def _run(self) -> None:
+        try:
+            import tkinter as tk
+
+            root = tk.Tk()
+            root.withdraw()
+            root.selection_handle(self._serve, selection="CLIPBOARD")
+            root.bind("<<ClipboardCall>>", lambda _event: self._drain())
+        except Exception as exc:  # noqa: BLE001
+            self._error = exc
+            self._ready.set()
+            return
+        self._root = root
+        self._ready.set()
+        self._drain()
+        root.mainloop()
+        self._root = None
+        root.destroy()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                fn, args, result = self._calls.get_nowait()
+            except Empty:
+                return
+            try:
+                value = (True, fn(*args))
+            except Exception as exc:  # noqa: BLE001
+                value = (False, exc)
+            if result is not None:
+                result.put(value)
+
+    def _own(self, text: str) -> bool:
+        self._text = text
+        self._root.selection_own(selection="CLIPBOARD", command=self._lost)
+        # Ownership is granted synchronously by the X server; confirm it before pasting.
+        return self._root.selection_own_get(selection="CLIPBOARD") is not None
+
+    def _restore(self, text: str, generation: int) -> bool:
+        # Runs on the Tk thread, so no copy() can take ownership between the check and _own.
+        with self._generation_lock:
+            if generation != self._generation:
+                return False  # Something newer was copied meanwhile; leave it.
+        return self._own(text)
+
+    def _read(self) -> Optional[str]:
+        import tkinter as tk
+
+        try:
+            return self._root.selection_get(selection="CLIPBOARD")
+        except tk.TclError:
+            return None  # Empty, or not text.
+
+    def _serve(self, offset, length) -> str:
+        offset, length = int(offset), int(length)
+        if offset + length >= len(self._text):
+            with self._served:
+                self._serves += 1
+                self._served.notify_all()
+        return self._text[offset : offset + length]
+
+    def _lost(self) -> None:
+        self._text = ""
+
+
+_clipboard = None
+_clipboard_lock = threading.Lock()
+
+
+def get_clipboard():
+    """Shared clipboard backend: ``TkClipboard`` on Linux/X11, ``pyperclip`` elsewhere."""
+    global _clipboard
+    with _clipboard_lock:
+        if _clipboard is None:
+            if platform.system().lower() == "linux":
+                try:
+                    _clipboard = TkClipboard()
+                except RuntimeError as exc:
+                    logger.info("Using pyperclip for the clipboard: %s", exc)
+            if _clipboard is None:
+                _clipboard = PyperclipClipboard()
+        return _clipboard
+
+
+# A separate X client standing in for the paste target: fetches CLIPBOARD per request line.
+_PASTE_TARGET = """
+import sys, tkinter
+root = tkinter.Tk()
+root.withdraw()
+print("ready", flush=True)
+for _ in sys.stdin:
+    try:
+        text = root.selection_get(selection="CLIPBOARD")
+    except tkinter.TclError:
+        text = ""
+    print(text.replace("\\n", " "), flush=True)
+"""
+
+
+class PasteTarget:
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, "-c", _PASTE_TARGET],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        if self._proc.stdout.readline().strip() != "ready":
+            self.close()
+            raise RuntimeError("paste target could not open the display")
+
+    def fetch(self) -> str:
+        self._proc.stdin.write("\n")
+        self._proc.stdin.flush()
+        return self._proc.stdout.readline().rstrip("\n")
+
+    def close(self) -> None:
+        self._proc.stdin.close()
+        self._proc.wait(5.0)
+
+
+def _ms(values) -> str:
+    values = sorted(values)
+    return f"median {values[len(values) // 2] * 1000:.2f} ms, max {values[-1] * 1000:.2f} ms"
+
+
+def measure(backend, rounds: int = 20, target: Optional[PasteTarget] = None) -> None:
+    previous = backend.read()
+    copies = []
+    pastes = []
+    mismatches = 0
+    for idx in range(rounds):
+        text = f"flow-stt clipboard check {idx}"
+        started = time.perf_counter()
+        backend.copy(text)
+        copies.append(time.perf_counter() - started)
+        if target is not None:
+            # Copy-to-paste: until another client holds the text, as the target app would on Ctrl+V.
+            mismatches += target.fetch() != text
+            pastes.append(time.perf_counter() - started)
+    if previous is not None:
+        backend.copy(previous)
+    line = f"{type(backend).__name__}: copy {_ms(copies)}"
+    if pastes:
+        line += f"; copy-to-paste {_ms(pastes)}; {'ok' if not mismatches else f'{mismatches} MISMATCH(ES)'}"
+    print(line)
+
+
+def main() -> None:
+    backends = []
+    try:
+        backends.append(TkClipboard())
+    except RuntimeError as exc:
+        print(f"TkClipboard: unavailable ({exc})")
+    try:
+        import pyperclip  # noqa: F401
+
+        backends.append(PyperclipClipboard())
+    except ImportError:
+        print("PyperclipClipboard: pyperclip not installed")
+    try:
+        target: Optional[PasteTarget] = PasteTarget()
+    except (OSError, RuntimeError) as exc:
+        print(f"Copy-to-paste not measured: {exc}")
+        target = None
+    for backend in backends:
+        measure(backend, target=target)
+        backend.close()
+    if target is not None:
+        target.close()
+    sys.exit(0 if backends else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Keyword spotting for short voice commands ("scratch that", "undo that").
+
+Each command phrase is enrolled from a few spoken takes. Short utterances are
+compared against those takes with DTW over log-mel frames before Whisper runs,
+so a recognized command costs a few milliseconds instead of a full decode.
+Anything that doesn't match closely enough falls through to transcription.
+
+Enroll phrases with ``python -m flow_stt.commands enroll "scratch that"``, and
+use ``python -m flow_stt.commands test`` to see match distances when tuning
+``command_threshold``.
+"""
+
+import argparse
+import logging
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import default_data_dir
+from .features import IncrementalLogMel
+from .resample import resample
+from .stt_engine import WHISPER_SAMPLE_RATE, prepare_audio
+
+
+logger = logging.getLogger(__name__)
+
+# Actions a phrase can map to; "text:<literal>" types the literal instead.
+ACTIONS = ("delete_last", "undo")
+TEXT_PREFIX = "text:"
+
+N_MELS = 40
+FRAME_STEP = 2  # keep every other 10 ms mel frame
+TRIM_BELOW = 3.0  # log10 units (30 dB) under the loudest frame count as silence
+
+
+def default_commands_dir() -> Path:
+    return default_data_dir() / "commands"
+
+
+def _slug(phrase: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", phrase.lower()).strip("-") or "command"
+
+
+def command_features(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Trimmed, mean-normalized log-mel frames as unit vectors, shape ``(frames, N_MELS)``."""
+    samples = prepare_audio(audio)
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        samples = resample(samples, sample_rate, WHISPER_SAMPLE_RATE)
+    extractor = IncrementalLogMel(N_MELS)
+    extractor.feed(samples)
+    mel = extractor.emitted()[:, ::FRAME_STEP]
+    if mel.shape[1] == 0:
+        return np.zeros((0, N_MELS), dtype=np.float32)
+    energy = mel.mean(axis=0)
+    voiced = np.flatnonzero(energy > energy.max() - TRIM_BELOW)
+    mel = mel[:, voiced[0] : voiced[-1] + 1]
+    frames = (mel - mel.mean(axis=1, keepdims=True)).T
+    norms = np.linalg.norm(frames, axis=1, keepdims=True)
+    return np.ascontiguousarray(frames / np.maximum(norms, 1e-6), dtype=np.float32)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Length-normalized DTW cost between two feature sequences.
+
+    Steps are (1, 1), (1, 2) and (2, 1), so each row depends only on the two
+    before it and is computed in one vectorized operation; sequences more than
+    twice as long as each other never align and score ``inf``.
+    """
+    n, m = a.shape[0], b.shape[0]
+    if not n or not m or n > 2 * m or m > 2 * n:
+        return float("inf")
+    cost = 1.0 - a @ b.T
+    # acc[i + 2, j + 2] is the best path cost ending at cell (i, j).
+    acc = np.full((n + 2, m + 2), np.inf, dtype=np.float32)
+    for i in range(n):
+        best = np.minimum(np.minimum(acc[i + 1, 1 : m + 1], acc[i + 1, 0:m]), acc[i, 1 : m + 1])
+        if i == 0:
+            best[0] = 0.0
+        acc[i + 2, 2:] = cost[i] + best
+    return float(acc[-1, -1]) / ((n + m) / 2.0)
+
+
+@dataclass
+class CommandMatch:
+    phrase: str
+    action: str
+    distance: float
+
+
+class KeywordSpotter:
+    def __init__(
+        self,
+        commands: Dict[str, str],
+        directory: Optional[Path] = None,
+        threshold: float = 0.2,
+        max_secs: float = 1.5,
+    ):
+        self.commands = dict(commands)
+        self.directory = Path(directory) if directory else default_commands_dir()
+        self.threshold = threshold
+        self.max_secs = max_secs
+        self._templates: Dict[str, List[np.ndarray]] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        templates: Dict[str, List[np.ndarray]] = {}
+        for phrase, action in self.commands.items():
+            if action not in ACTIONS and not action.startswith(TEXT_PREFIX):
+                logger.warning("Unknown action %r for command %r; ignoring it.", action, phrase)
+                continue
+            takes = sorted((self.directory / _slug(phrase)).glob("*.npy"))
+            loaded = [command_features(np.load(path)) for path in takes]
+            loaded = [features for features in loaded if features.shape[0]]
+            if loaded:
+                templates[phrase] = loaded
+            else:
+                logger.info("Command %r has no enrolled takes yet.", phrase)
+        self._templates = templates
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._templates)
+
+    def distances(self, audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> Dict[str, float]:
+        """Best DTW distance per enrolled phrase."""
+        features = command_features(audio, sample_rate)
+        return {
+            phrase: min(dtw_distance(features, template) for template in templates)
+            for phrase, templates in self._templates.items()
+        }
+
+    def match(self, audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> Optional[CommandMatch]:
+        """Return the command spoken in ``audio``, or None to fall through to Whisper."""
+        if not self._templates or audio.shape[0] > self.max_secs * sample_rate:
+            return None
+        started = time.perf_counter()
+        distances = self.distances(audio, sample_rate)
+        phrase = min(distances, key=distances.get)
+        distance = distances[phrase]
+        logger.debug(
+            "Command spotting took %.1f ms (best %r at %.3f).",
+            (time.perf_counter() - started) * 1000,
+            phrase,
+            distance,
+        )
+        if distance > self.threshold:
+            return None
+        return CommandMatch(phrase, self.commands[phrase], distance)
+
+
+def _record(seconds: float, device=None) -> np.ndarray:
+    import sounddevice as sd
+
+    frames = int(seconds * WHISPER_SAMPLE_RATE)
+    audio = sd.rec(frames, samplerate=WHISPER_SAMPLE_RATE, channels=1, dtype="int16", device=device)
+    sd.wait()
+    return audio.reshape(-1)
+
+
+def enroll(phrase: str, takes: int, seconds: float, directory: Path) -> None:
+    target = directory / _slug(phrase)
+    target.mkdir(parents=True, exist_ok=True)
+    start = len(list(target.glob("*.npy")))
+    for take in range(takes):
+        input(f"Take {take + 1}/{takes}: press Enter, then say {phrase!r}...")
+        audio = _record(seconds)
+        np.save(target / f"{start + take:03d}.npy", audio)
+    print(f"Saved {takes} take(s) to {target}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .config import ConfigManager
+
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.commands", description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", type=Path, default=None, help="Template directory (default: <data dir>/commands).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enroll_parser = sub.add_parser("enroll", help="Record takes of a command phrase.")
+    enroll_parser.add_argument("phrase")
+    enroll_parser.add_argument("--takes", type=int, default=3)
+    enroll_parser.add_argument("--seconds", type=float, default=1.5)
+    sub.add_parser("list", help="Show configured commands and their enrolled takes.")
+    test_parser = sub.add_parser("test", help="Record once and print the distance to each command.")
+    test_parser.add_argument("--seconds", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    cfg = ConfigManager().config
+    directory = args.dir or default_commands_dir()
+    if args.command == "enroll":
+        enroll(args.phrase, args.takes, args.seconds, directory)
+        return
+    if args.command == "list":
+        for phrase, action in cfg.commands.items():
+            takes = len(list((directory / _slug(phrase)).glob("*.npy")))
+            print(f"{phrase!r:24} -> {action!r:16} {takes} take(s)")
+        return
+    spotter = KeywordSpotter(cfg.commands, directory, cfg.command_threshold, cfg.command_max_secs)
+    input("Press Enter, then speak...")
+    audio = _record(args.seconds)
+    started = time.perf_counter()
+    distances = spotter.distances(audio)
+    elapsed = (time.perf_counter() - started) * 1000
+    for phrase, distance in sorted(distances.items(), key=lambda item: item[1]):
+        marker = "  <- match" if distance <= cfg.command_threshold else ""
+        print(f"{phrase!r:24} {distance:.3f}{marker}")
+    print(f"threshold {cfg.command_threshold:.3f}, matched in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 import json
-from dataclasses import dataclass, asdict
+import logging
+import os
+from dataclasses import dataclass, asdict, fields
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
 
 # Configuration defaults keep the out-of-box experience simple.
 DEFAULT_CONFIG = {
@@ -10,21 +14,69 @@ DEFAULT_CONFIG = {
     "output_mode": "type",  # or "clipboard" or "paste"
     "mic_device": None,
     "model_size": "small",
-    "language": "en",
+    "model_cache_dir": None,  # Shared read-only int8 model folder for multi-user hosts.
+    "prewarm_model": True,  # Read the pinned model files into the page cache at startup.
+    "language": "en",  # Or "auto" to detect once and reuse the result.
     "spoken_punctuation": True,
     "auto_paste_clipboard": False,
+    "restore_clipboard": False,  # Put the previous clipboard back after pasting.
     "silence_timeout_secs": 60.0,  # Stop after long silence; hotkey release still stops immediately.
     "enable_ui": True,
     "log_transcripts": False,
     "prefer_gpu": True,
     "replay_hotkey": "ctrl+alt+r",
+    "watch_config": True,  # Apply edits to this file while running, without a restart.
+    "capture_memory_limit_mb": 64.0,  # Longer recordings spill to a temp file instead of RAM.
+    "capture_native_rate": True,  # Open the mic at its own rate and resample to 16 kHz in-process.
+    "capture_block_size": 2048,  # Frames per audio callback at 16 kHz; see `python -m flow_stt.calibrate`.
+    "capture_latency": None,  # "low", "high" or seconds; null keeps the driver default.
+    "device_refresh_secs": 30.0,  # Re-scan for plugged/unplugged mics while idle; 0 disables.
+    "speculative_transcription": False,  # Decode at pauses while the hotkey is still held.
+    "speculative_pause_ms": 400,
+    "inference_threads": 0,  # CTranslate2 CPU threads; 0 lets it decide.
+    "inference_cpus": [],  # Pin decoding to these cores, e.g. [2, 3, 4, 5]; empty = any.
+    "inference_nice": 0,  # >0 runs decoding at lower priority so capture isn't starved.
+    "precompute_features": False,  # Build Whisper's log-mel input while recording.
+    "max_temperature_fallbacks": 2,  # Re-decodes per window on low-confidence output; 5 = faster-whisper default.
+    "decode_deadline_secs": 0,  # Return the segments finished by then; 0 disables.
+    "vocabulary_file": None,  # One term per line; defaults to <data dir>/vocabulary.txt if present.
+    "vocabulary_fix_case": False,  # Also recase exact matches ("kubernetes" -> "Kubernetes").
+    "command_mode": False,  # Match enrolled short commands before running Whisper.
+    "commands": {
+        "scratch that": "delete_last",
+        "undo that": "undo",
+        "new paragraph": "text:\n\n",
+    },
+    "command_threshold": 0.2,  # Max DTW distance; see `python -m flow_stt.commands test`.
+    "command_max_secs": 1.5,
+    "archive_enabled": False,  # Keep each utterance's audio + transcript for offline benchmarks.
+    "archive_dir": None,  # Defaults to <data dir>/archive.
+    "archive_max_mb": 512.0,
+    "history_enabled": False,  # Keep a searchable local history of dictated text.
+    "history_file": None,  # Defaults to <data dir>/history.sqlite3.
+    "history_max_entries": 5000,
+    "history_hotkey": "ctrl+alt+h",  # Opens history search; Enter re-inserts the selection.
+    "profile_hotkey": "ctrl+alt+p",  # Samples stacks and allocations over the next few dictations.
+    "profile_utterances": 5,
+    "profile_dir": None,  # Defaults to <data dir>/profiles.
+    "metrics_port": 0,  # Serve Prometheus metrics on 127.0.0.1:<port>/metrics; 0 disables.
+    "metrics_textfile": None,  # Also write them to this file (node_exporter textfile collector).
+    "metrics_interval_secs": 15.0,
 }
 
 
-def _default_config_path() -> Path:
+def default_data_dir() -> Path:
     base = Path.home() / "AppData" / "Local" / "flow_stt"
     base.mkdir(parents=True, exist_ok=True)
-    return base / "config.json"
+    return base
+
+
+def default_vocabulary_path() -> Path:
+    return default_data_dir() / "vocabulary.txt"
+
+
+def _default_config_path() -> Path:
+    return default_data_dir() / "config.json"
 
 
 @dataclass
@@ -34,19 +86,57 @@ class Config:
     output_mode: str
     mic_device: Optional[str]
     model_size: str
+    model_cache_dir: Optional[str]
+    prewarm_model: bool
     language: str
     spoken_punctuation: bool
     auto_paste_clipboard: bool
+    restore_clipboard: bool
     silence_timeout_secs: Optional[float]
     enable_ui: bool
     log_transcripts: bool
     prefer_gpu: bool
     replay_hotkey: str
+    watch_config: bool
+    capture_memory_limit_mb: float
+    capture_native_rate: bool
+    capture_block_size: int
+    capture_latency: Union[str, float, None]
+    device_refresh_secs: float
+    speculative_transcription: bool
+    speculative_pause_ms: int
+    inference_threads: int
+    inference_cpus: List[int]
+    inference_nice: int
+    precompute_features: bool
+    max_temperature_fallbacks: int
+    decode_deadline_secs: float
+    vocabulary_file: Optional[str]
+    vocabulary_fix_case: bool
+    command_mode: bool
+    commands: Dict[str, str]
+    command_threshold: float
+    command_max_secs: float
+    archive_enabled: bool
+    archive_dir: Optional[str]
+    archive_max_mb: float
+    history_enabled: bool
+    history_file: Optional[str]
+    history_max_entries: int
+    history_hotkey: str
+    profile_hotkey: str
+    profile_utterances: int
+    profile_dir: Optional[str]
+    metrics_port: int
+    metrics_textfile: Optional[str]
+    metrics_interval_secs: float
     path: Path
 
     @classmethod
     def from_dict(cls, data: dict, path: Path) -> "Config":
         merged = DEFAULT_CONFIG.copy()
+        merged["commands"] = dict(DEFAULT_CONFIG["commands"])
+        merged["inference_cpus"] = list(DEFAULT_CONFIG["inference_cpus"])
         merged.update({k: v for k, v in data.items() if v is not None})
         return cls(path=path, **merged)
 
@@ -56,6 +146,11 @@ class Config:
         return data
 
 
+def changed_fields(old: Config, new: Config) -> Set[str]:
+    """Names of the settings that differ between two configs."""
+    return {f.name for f in fields(Config) if f.name != "path" and getattr(old, f.name) != getattr(new, f.name)}
+
+
 class ConfigManager:
     def __init__(self, path: Optional[Path] = None):
         self.path = path or _default_config_path()
@@ -71,16 +166,35 @@ class ConfigManager:
         else:
             data = DEFAULT_CONFIG.copy()
             self.save(Config.from_dict(data, self.path))
+        return self._from_file_data(data)
+
+    def _from_file_data(self, data: dict) -> Config:
+        """Build a Config from the file's JSON; shared by load() and reload() so both migrate alike."""
         # Migrate old default (1.8s) to the new longer timeout.
         if data.get("silence_timeout_secs") == 1.8:
             data["silence_timeout_secs"] = DEFAULT_CONFIG["silence_timeout_secs"]
         return Config.from_dict(data, self.path)
 
+    def reload(self) -> Optional[Config]:
+        """Re-read the file after an outside edit; None (keeping the current config) if it is invalid."""
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            config = self._from_file_data(data)
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable config %s: %s", self.path, exc)
+            return None
+        self.config = config
+        return config
+
     def save(self, config: Optional[Config] = None) -> None:
         cfg = config or self.config
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w", encoding="utf-8") as f:
+        # Write-then-rename, so watchers and other processes never read a half-written file.
+        staging = self.path.with_name(f"{self.path.name}.tmp")
+        with staging.open("w", encoding="utf-8") as f:
             json.dump(cfg.to_dict(), f, indent=2)
+        os.replace(staging, self.path)
         self.config = cfg
 
     def update(self, **kwargs) -> Config:
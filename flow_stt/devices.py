@@ -0,0 +1,211 @@
+"""Cached input-device registry with background refresh for hot-plugged mics."""
+
+import logging
+import os
+import platform
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InputDevice:
+    index: int
+    name: str
+    hostapi: str
+    default_samplerate: float
+    max_input_channels: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}: {self.name}"
+
+
+def _waveinput_names() -> Tuple[str, ...]:
+    """Names of the Windows waveIn devices; winmm sees arrivals without a PortAudio restart."""
+    import ctypes
+    from ctypes import wintypes
+
+    class WAVEINCAPSW(ctypes.Structure):
+        _fields_ = [
+            ("wMid", wintypes.WORD),
+            ("wPid", wintypes.WORD),
+            ("vDriverVersion", wintypes.UINT),
+            ("szPname", wintypes.WCHAR * 32),
+            ("dwFormats", wintypes.DWORD),
+            ("wChannels", wintypes.WORD),
+            ("wReserved1", wintypes.WORD),
+        ]
+
+    winmm = ctypes.windll.winmm
+    caps = WAVEINCAPSW()
+    names = []
+    for idx in range(winmm.waveInGetNumDevs()):
+        if winmm.waveInGetDevCapsW(idx, ctypes.byref(caps), ctypes.sizeof(caps)) == 0:
+            names.append(caps.szPname)
+    return tuple(names)
+
+
+def _hotplug_signature() -> Optional[Tuple[str, ...]]:
+    """Changes when sound devices come or go; None where there's no cheap signal.
+
+    Linux lists /dev/snd; Windows asks winmm for its waveIn devices.
+    """
+    system = platform.system().lower()
+    try:
+        if system == "linux":
+            return tuple(sorted(os.listdir("/dev/snd")))
+        if system == "windows":
+            return _waveinput_names()
+    except (OSError, AttributeError) as exc:
+        logger.debug("No hot-plug signal: %s", exc)
+    return None
+
+
+def _parse_configured(configured: str) -> Tuple[Optional[int], str]:
+    """Split a stored ``"<index>: <name>"`` choice; bare names are accepted too."""
+    if ":" in configured:
+        idx, name = configured.split(":", 1)
+        if idx.strip().isdigit():
+            return int(idx.strip()), name.strip()
+    return None, configured.strip()
+
+
+class DeviceRegistry:
+    """Caches PortAudio's device list and keeps it current without blocking callers.
+
+    PortAudio only sees newly attached devices after it is re-initialized, which
+    would kill any open stream. So it is re-initialized only when a device change
+    is suspected: a hot-plug signal, a failed or lost stream, or a configured mic
+    that has gone missing. Where there is no hot-plug signal, every timed refresh
+    re-initializes while no stream is open. It never happens while a stream
+    registered through ``stream_opened`` is open or being opened. Other
+    background refreshes just re-read the cached list.
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self._devices: Tuple[InputDevice, ...] = ()
+        self._loaded = False
+        self._lock = Lock()
+        self._active_streams = 0
+        # A device change is suspected but PortAudio hasn't been re-initialized yet.
+        self._suspect = False
+        self._stop = Event()
+        self._wake = Event()
+        self._thread: Optional[Thread] = None
+
+    def devices(self) -> Tuple[InputDevice, ...]:
+        if not self._loaded:
+            self.refresh()
+        return self._devices
+
+    def refresh(self, reinitialize: bool = False) -> None:
+        import sounddevice as sd
+
+        with self._lock:
+            if reinitialize and self._active_streams:
+                self._suspect = True  # retried by a later refresh, once the stream is closed
+            elif reinitialize:
+                self._suspect = False
+                try:
+                    sd._terminate()
+                    sd._initialize()
+                except Exception as exc:  # noqa: BLE001
+                    logger.debug("PortAudio re-initialization failed: %s", exc)
+            try:
+                hostapis = sd.query_hostapis()
+                found = tuple(
+                    InputDevice(
+                        index=idx,
+                        name=device["name"],
+                        hostapi=hostapis[device["hostapi"]]["name"],
+                        default_samplerate=float(device.get("default_samplerate", 0.0)),
+                        max_input_channels=int(device["max_input_channels"]),
+                    )
+                    for idx, device in enumerate(sd.query_devices())
+                    if device.get("max_input_channels", 0) > 0
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Could not enumerate audio devices: %s", exc)
+                return
+            previous = {device.name for device in self._devices}
+            changed = self._loaded and previous != {device.name for device in found}
+            self._devices = found
+            self._loaded = True
+        if changed:
+            logger.info("Input devices changed: %s", ", ".join(device.name for device in found) or "none")
+
+    def resolve(self, configured: Optional[str]) -> Optional[int]:
+        """Map a configured mic to a current PortAudio index, matching by name.
+
+        Indexes shift when devices come and go, so the name is authoritative; the
+        stored index only breaks ties between same-named entries (one per host API).
+        Returns ``None`` (the system default) when the device is gone.
+        """
+        if configured in (None, "", "Default"):
+            return None
+        idx, name = _parse_configured(str(configured))
+        matches = [device for device in self.devices() if device.name == name]
+        for device in matches:
+            if device.index == idx:
+                return device.index
+        if matches:
+            return matches[0].index
+        logger.warning("Microphone %r is not connected; using the default input.", name)
+        # It may just have been plugged in; PortAudio only finds it after a re-initialization.
+        self._suspect = True
+        return None
+
+    def stream_opened(self) -> None:
+        """Call before creating a stream, so no re-initialization can run under it."""
+        with self._lock:
+            self._active_streams += 1
+
+    def stream_closed(self) -> None:
+        with self._lock:
+            self._active_streams = max(0, self._active_streams - 1)
+
+    def start_background_refresh(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = Thread(target=self._refresh_loop, name="flow-stt-devices", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def set_refresh_interval(self, seconds: float) -> None:
+        """Change the period of the background refresh; 0 pauses it until set again."""
+        self.refresh_interval = seconds
+        self._wake.set()
+
+    def _refresh_loop(self) -> None:
+        self.refresh()
+        signature = _hotplug_signature()
+        while not self._stop.is_set():
+            # Woken early when the interval changes, to start over with the new one.
+            if self._wake.wait(self.refresh_interval or None):
+                self._wake.clear()
+                continue
+            current = _hotplug_signature()
+            # Without a hot-plug signal, re-initialize whenever no stream would be cut off.
+            unknown = current is None and not self._active_streams
+            self.refresh(reinitialize=self._suspect or current != signature or unknown)
+            signature = current
+
+
+_registry: Optional[DeviceRegistry] = None
+
+
+def get_registry() -> DeviceRegistry:
+    global _registry
+    if _registry is None:
+        _registry = DeviceRegistry()
+    return _registry
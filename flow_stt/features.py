@@ -0,0 +1,237 @@
+"""Whisper log-mel features computed incrementally while audio is being captured.
+
+``IncrementalLogMel`` reproduces faster-whisper's ``FeatureExtractor`` output
+(30 s zero padding, centred 400-sample frames, global max clamp) but emits
+frames as soon as their samples arrive, so at release only the padded tail and
+the final normalization are left to do.
+
+Run ``python -m flow_stt.features`` to compare against faster-whisper's own
+extractor on synthetic audio fed in random block sizes.
+"""
+
+import logging
+import sys
+from queue import Empty, Queue
+from threading import Thread
+from typing import List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+logger = logging.getLogger(__name__)
+
+LOG_FLOOR = 1e-10
+
+
+def mel_filters(sample_rate: int = 16000, n_fft: int = 400, n_mels: int = 80) -> np.ndarray:
+    """Slaney-style mel filterbank, matching faster-whisper/librosa."""
+    weights = np.zeros((n_mels, int(1 + n_fft // 2)), dtype=np.float32)
+    fftfreqs = np.fft.rfftfreq(n=n_fft, d=1.0 / sample_rate)
+    mels = np.linspace(0.0, 45.245640471924965, n_mels + 2)
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs[log_t] = min_log_hz * np.exp(logstep * (mels[log_t] - min_log_mel))
+    fdiff = np.diff(freqs)
+    ramps = np.subtract.outer(freqs, fftfreqs)
+    for i in range(n_mels):
+        lower = -ramps[i] / fdiff[i]
+        upper = ramps[i + 2] / fdiff[i + 1]
+        weights[i] = np.maximum(0, np.minimum(lower, upper))
+    enorm = 2.0 / (freqs[2 : n_mels + 2] - freqs[:n_mels])
+    weights *= enorm[:, np.newaxis]
+    return weights
+
+
+class IncrementalLogMel:
+    def __init__(
+        self,
+        n_mels: int = 80,
+        sample_rate: int = 16000,
+        n_fft: int = 400,
+        hop_length: int = 160,
+        chunk_length: int = 30,
+    ):
+        self.n_mels = n_mels
+        self.n_fft = n_fft
+        self.hop = hop_length
+        self.half = (n_fft - 1) // 2 + 1
+        self.pad_samples = chunk_length * sample_rate
+        self.filters = mel_filters(sample_rate, n_fft, n_mels)
+        self.window = np.hanning(n_fft + 1)[:-1]
+        self.samples = 0
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._tail_start = 0  # absolute index of _tail[0]
+        self._next = 0  # next frame to emit
+        self._chunks: List[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Append int16 or float32 mono samples and emit every frame they complete."""
+        samples = np.asarray(samples).reshape(-1)
+        if samples.dtype == np.int16:
+            # Same widening as stt_engine.prepare_audio so both paths see identical input.
+            block = samples.astype(np.float32)
+            block *= 1.0 / 32768.0
+        else:
+            block = samples.astype(np.float32, copy=False)
+        self._tail = np.concatenate((self._tail, block))
+        self.samples += block.shape[0]
+        # Frame j is centred on j * hop and needs samples up to j * hop + half.
+        last_ready = (self.samples - self.half) // self.hop
+        self._emit_until(last_ready + 1)
+
+    def finalize(self) -> np.ndarray:
+        """Return the full ``(n_mels, frames)`` feature matrix including the 30 s padding."""
+        total_frames = (self.samples + self.pad_samples) // self.hop
+        # Frames whose window still touches real audio are computed against zeros;
+        # the rest are pure padding and all land on the log floor.
+        last_real = min(total_frames, (self.samples + self.half - 1) // self.hop + 1)
+        needed = (last_real - 1) * self.hop + self.half - (self._tail_start + self._tail.shape[0])
+        if needed > 0:
+            self._tail = np.concatenate((self._tail, np.zeros(needed, dtype=np.float32)))
+        self._emit_until(last_real)
+        remaining = total_frames - self._next
+        chunks = list(self._chunks)
+        if remaining > 0:
+            chunks.append(np.full((self.n_mels, remaining), np.log10(np.float32(LOG_FLOOR)), dtype=np.float32))
+        log_spec = np.concatenate(chunks, axis=1) if chunks else np.zeros((self.n_mels, 0), dtype=np.float32)
+        log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+        return (log_spec + 4.0) / 4.0
+
+    def emitted(self) -> np.ndarray:
+        """Raw log10 mel frames emitted so far, without padding or normalization."""
+        if not self._chunks:
+            return np.zeros((self.n_mels, 0), dtype=np.float32)
+        return np.concatenate(self._chunks, axis=1)
+
+    def _emit_until(self, end: int) -> None:
+        # The first frames reach before sample 0 and are reflect-padded exactly the
+        # way faster-whisper does it (np.pad on the truncated frame).
+        while self._next < end and self._next * self.hop <= self.half:
+            centre = self._next * self.hop
+            frame = np.pad(self._tail[: centre + self.half], (self.half - centre, 0), mode="reflect")
+            self._chunks.append(self._log_mel(frame[None, :]))
+            self._next += 1
+        if self._next >= end:
+            return
+        first = self._next * self.hop - self.half - self._tail_start
+        count = end - self._next
+        span = self._tail[first : first + (count - 1) * self.hop + self.n_fft]
+        frames = sliding_window_view(span, self.n_fft)[:: self.hop]
+        self._chunks.append(self._log_mel(frames))
+        self._next = end
+        # Keep only what the next frame can still reach.
+        keep_from = self._next * self.hop - self.half
+        if keep_from > self.half and keep_from > self._tail_start:
+            self._tail = self._tail[keep_from - self._tail_start :].copy()
+            self._tail_start = keep_from
+
+    def _log_mel(self, frames: np.ndarray) -> np.ndarray:
+        spectrum = np.fft.rfft(frames * self.window, axis=1).astype(np.complex64)
+        magnitudes = np.abs(spectrum) ** 2
+        mel = self.filters @ magnitudes.T
+        return np.log10(np.clip(mel, LOG_FLOOR, None))
+
+
+class FeatureStream:
+    """Background worker that feeds capture blocks into an ``IncrementalLogMel``."""
+
+    def __init__(self, n_mels: int = 80):
+        self.n_mels = n_mels
+        self._queue: "Queue[Optional[tuple]]" = Queue()
+        self._thread = Thread(target=self._run, name="flow-stt-features", daemon=True)
+        self._thread.start()
+
+    def begin(self) -> None:
+        self._queue.put(("begin", None))
+
+    def push(self, samples: np.ndarray) -> None:
+        """Queue a block; safe to call from the audio callback."""
+        self._queue.put_nowait(("push", samples))
+
+    def request(self, frames: int) -> "Queue[Optional[np.ndarray]]":
+        """Queue the end of the current utterance; the result arrives on the returned queue.
+
+        Call this when capture stops, before the next ``begin``; collect it later with ``wait``.
+        """
+        done: "Queue[Optional[np.ndarray]]" = Queue(maxsize=1)
+        self._queue.put(("finish", (frames, done)))
+        return done
+
+    @staticmethod
+    def wait(done: "Queue[Optional[np.ndarray]]", timeout: float = 5.0) -> Optional[np.ndarray]:
+        try:
+            return done.get(timeout=timeout)
+        except Empty:
+            logger.warning("Feature extraction did not finish in %.1fs; falling back.", timeout)
+            return None
+
+    def finish(self, frames: int, timeout: float = 5.0) -> Optional[np.ndarray]:
+        """Wait for queued blocks and return features, or None if they don't cover ``frames``."""
+        return self.wait(self.request(frames), timeout)
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+    def _run(self) -> None:
+        extractor: Optional[IncrementalLogMel] = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            kind, payload = item
+            try:
+                if kind == "begin":
+                    extractor = IncrementalLogMel(self.n_mels)
+                elif kind == "push" and extractor is not None:
+                    extractor.feed(payload)
+                elif kind == "finish":
+                    frames, done = payload
+                    result = None
+                    if extractor is not None and extractor.samples == frames:
+                        result = extractor.finalize()
+                    extractor = None
+                    done.put(result)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Feature extraction failed: %s", exc)
+                extractor = None
+                if kind == "finish":
+                    payload[1].put(None)
+
+
+def check_parity(seconds: float = 7.3, n_mels: int = 80, seed: int = 0) -> float:
+    """Max absolute difference against faster-whisper's extractor on synthetic audio."""
+    from faster_whisper.feature_extractor import FeatureExtractor
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000.0
+    audio = 0.3 * np.sin(2 * np.pi * 220.0 * t) * (1 + np.sin(2 * np.pi * 0.5 * t)) + 0.05 * rng.standard_normal(t.shape)
+    samples = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+    reference_input = samples.astype(np.float32)
+    reference_input *= 1.0 / 32768.0
+    reference = FeatureExtractor(feature_size=n_mels)(reference_input)
+
+    extractor = IncrementalLogMel(n_mels)
+    position = 0
+    while position < samples.shape[0]:
+        size = int(rng.integers(1, 4000))
+        extractor.feed(samples[position : position + size])
+        position += size
+    features = extractor.finalize()
+    if features.shape != reference.shape:
+        raise AssertionError(f"shape mismatch: {features.shape} vs {reference.shape}")
+    return float(np.abs(features - reference).max())
+
+
+def main() -> None:
+    worst = max(check_parity(seconds, n_mels) for seconds in (0.01, 1.0, 7.3, 31.0) for n_mels in (80, 128))
+    print(f"max abs difference vs faster-whisper: {worst:.2e}")
+    sys.exit(0 if worst < 1e-4 else 1)
+
+
+if __name__ == "__main__":
+    main()
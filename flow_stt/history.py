@@ -0,0 +1,256 @@
+"""Searchable local history of dictated text.
+
+Each output is stored in SQLite with its timestamp, per-stage timings and model
+settings. An FTS5 index over the text powers search from the overlay. Inserts
+are queued to a writer thread that commits them in batches, so dictation never
+waits on disk. Only the newest ``max_entries`` rows are kept.
+
+    python -m flow_stt.history "quarterly report"
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from queue import Empty, Full, Queue
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from .config import default_data_dir
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    text TEXT NOT NULL,
+    model_size TEXT,
+    language TEXT,
+    timings TEXT,
+    meta TEXT
+);
+"""
+# External-content index: the text lives once, in ``history``; triggers keep the index in step.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    text, content='history', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+COLUMNS = "h.id, h.created, h.text, h.model_size, h.language, h.timings"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def default_history_path() -> Path:
+    return default_data_dir() / "history.sqlite3"
+
+
+@dataclass
+class HistoryEntry:
+    id: int
+    created: float
+    text: str
+    model_size: Optional[str] = None
+    language: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "HistoryEntry":
+        entry_id, created, text, model_size, language, timings = row
+        return cls(entry_id, created, text, model_size, language, json.loads(timings or "{}"))
+
+
+def fts_query(text: str) -> str:
+    """Every word as a quoted prefix term, so partial words match while typing."""
+    return " ".join(f'"{token}"*' for token in TOKEN_PATTERN.findall(text))
+
+
+class TranscriptHistory:
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 5000,
+        batch_size: int = 32,
+        batch_secs: float = 1.0,
+        queue_size: int = 256,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.batch_secs = batch_secs
+        self.fts = True
+        self._queue: "Queue[Optional[tuple]]" = Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._readers: List["sqlite3.Connection"] = []
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="flow-stt-history", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, timings: Dict[str, float], meta: Optional[dict] = None) -> bool:
+        """Queue a dictation for the writer; never blocks the caller."""
+        if not text.strip():
+            return False
+        try:
+            self._queue.put_nowait((time.time(), text, dict(timings), dict(meta or {})))
+        except Full:
+            logger.warning("Transcript history is behind; dropping this entry.")
+            return False
+        return True
+
+    def search(self, query: str = "", limit: int = 50) -> List[HistoryEntry]:
+        """Newest entries matching every word of ``query`` (all entries if it is empty)."""
+        import sqlite3
+
+        if not self._ready.is_set():
+            return []
+        conn = self._reader()
+        match = fts_query(query)
+        try:
+            if not match:
+                rows = conn.execute(f"SELECT {COLUMNS} FROM history h ORDER BY h.id DESC LIMIT ?", (limit,))
+            elif self.fts:
+                rows = conn.execute(
+                    f"SELECT {COLUMNS} FROM history_fts JOIN history h ON h.id = history_fts.rowid "
+                    "WHERE history_fts MATCH ? ORDER BY h.id DESC LIMIT ?",
+                    (match, limit),
+                )
+            else:
+                words = TOKEN_PATTERN.findall(query)
+                where = " AND ".join("h.text LIKE ?" for _ in words)
+                rows = conn.execute(
+                    f"SELECT {COLUMNS} FROM history h WHERE {where} ORDER BY h.id DESC LIMIT ?",
+                    (*(f"%{word}%" for word in words), limit),
+                )
+            return [HistoryEntry.from_row(row) for row in rows]
+        except sqlite3.Error as exc:
+            logger.warning("History search failed: %s", exc)
+            return []
+
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            return
+        self._thread.join(timeout)
+        for conn in self._readers:
+            conn.close()
+        self._readers = []
+
+    def _connect(self) -> "sqlite3.Connection":
+        # sqlite3 is only loaded once history is enabled.
+        import sqlite3
+
+        # WAL lets the overlay search while the writer commits.
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> "sqlite3.Connection":
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            self._readers.append(conn)
+        return conn
+
+    def _setup(self, conn: "sqlite3.Connection") -> None:
+        import sqlite3
+
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as exc:
+            # Some SQLite builds ship without FTS5; search then falls back to LIKE.
+            logger.info("SQLite FTS5 unavailable (%s); history search will scan.", exc)
+            self.fts = False
+        conn.commit()
+
+    def _run(self) -> None:
+        import sqlite3
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            self._setup(conn)
+        except (OSError, sqlite3.Error) as exc:
+            logger.error("Could not open transcript history %s: %s", self.path, exc)
+            return
+        self._ready.set()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_secs
+            # Gather whatever else arrives shortly after, to commit it all at once.
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+            stop = batch[-1] is None
+            rows = [item for item in batch if item is not None]
+            if rows:
+                try:
+                    self._write(conn, rows)
+                except sqlite3.Error as exc:
+                    logger.warning("Failed to write %d history entries: %s", len(rows), exc)
+        conn.close()
+
+    def _write(self, conn: "sqlite3.Connection", rows: List[tuple]) -> None:
+        with conn:
+            conn.executemany(
+                "INSERT INTO history (created, text, model_size, language, timings, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        created,
+                        text,
+                        meta.get("model_size"),
+                        meta.get("language"),
+                        json.dumps(timings),
+                        json.dumps(meta),
+                    )
+                    for created, text, timings, meta in rows
+                ],
+            )
+            newest = conn.execute("SELECT MAX(id) FROM history").fetchone()[0] or 0
+            conn.execute("DELETE FROM history WHERE id <= ?", (newest - self.max_entries,))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .config import ConfigManager
+
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.history", description=__doc__.splitlines()[0])
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    cfg = ConfigManager().config
+    history = TranscriptHistory(Path(cfg.history_file) if cfg.history_file else default_history_path())
+    history._ready.wait(5.0)
+    started = time.perf_counter()
+    entries = history.search(args.query, args.limit)
+    elapsed = time.perf_counter() - started
+    for entry in entries:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created))
+        print(f"{stamp}  {entry.text}")
+    print(f"{len(entries)} result(s) in {elapsed * 1000:.1f} ms")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import platform
 
-from .windows_integration import WindowsIntegration
-from .pynput_integration import PynputIntegration
 
-
-def get_integration(output_mode: str, auto_paste_clipboard: bool):
+def get_integration(output_mode: str, auto_paste_clipboard: bool, restore_clipboard: bool = False):
+    # Import only the backend for this platform; each one pulls in its own hook library.
     system = platform.system().lower()
     if system == "windows":
-        return WindowsIntegration(output_mode, auto_paste_clipboard)
-    return PynputIntegration(output_mode, auto_paste_clipboard)
+        from .windows_integration import WindowsIntegration
+
+        return WindowsIntegration(output_mode, auto_paste_clipboard, restore_clipboard)
+    from .pynput_integration import PynputIntegration
+
+    return PynputIntegration(output_mode, auto_paste_clipboard, restore_clipboard)
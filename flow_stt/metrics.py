@@ -0,0 +1,291 @@
+"""Prometheus-format metrics for the dictation pipeline and the process.
+
+Capture, the engine, the integrations and the app update the module-level
+counters and histograms below as they work. Some metrics have several writers
+(the engine decodes on both the transcribe stage and the speculative worker), so
+each update takes the metric's own lock. The lock is almost never contended and
+costs well under a microsecond. Process figures (memory, CPU time, open handles)
+are read only when the metrics are rendered.
+
+They can be exposed two ways, both off by default:
+
+- ``metrics_port``: an HTTP endpoint on 127.0.0.1 serving ``/metrics``,
+- ``metrics_textfile``: a file rewritten every ``metrics_interval_secs``, for
+  node_exporter's textfile collector.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Union
+
+from .procinfo import open_handles, rss_bytes
+
+if TYPE_CHECKING:
+    from http.server import HTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+Metric = Union["Counter", "Gauge", "Histogram"]
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {_number(self.value)}"]
+
+
+class Gauge:
+    """A value read from ``source`` at render time; skipped when it returns None.
+
+    ``kind="counter"`` types it as a counter, for totals kept elsewhere (e.g. CPU time).
+    """
+
+    def __init__(self, name: str, help_text: str, source: Callable[[], Optional[float]], kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.source = source
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        value = self.source()
+        return [] if value is None else [f"{self.name} {_number(value)}"]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = sorted(buckets)
+        # Per-bucket counts (not cumulative) plus one overflow slot for +Inf.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.sum += value
+
+    def render(self) -> List[str]:
+        # Counts and sum from the same moment, so _count always matches the buckets.
+        with self._lock:
+            counts = list(self.counts)
+            total_sum = self.sum
+        lines = []
+        total = 0
+        for bound, count in zip([*self.buckets, float("inf")], counts):
+            total += count
+            lines.append(f'{self.name}_bucket{{le="{_number(bound)}"}} {total}')
+        lines.append(f"{self.name}_sum {_number(total_sum)}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics.setdefault(metric.name, metric)
+        return self.metrics[metric.name]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(name, help_text))  # type: ignore[return-value]
+
+    def gauge(
+        self, name: str, help_text: str, source: Callable[[], Optional[float]], kind: str = "gauge"
+    ) -> Gauge:
+        return self._add(Gauge(name, help_text, source, kind))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]) -> Histogram:
+        return self._add(Histogram(name, help_text, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+_STARTED = time.time()
+
+UTTERANCES = METRICS.counter("flow_stt_utterances_total", "Dictations transcribed and output.")
+COMMANDS = METRICS.counter("flow_stt_commands_total", "Voice commands matched and run.")
+LATENCY = METRICS.histogram(
+    "flow_stt_latency_seconds",
+    "Time from the end of a recording until its text was output.",
+    (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0),
+)
+AUDIO_CAPTURED = METRICS.counter("flow_stt_audio_captured_seconds_total", "Seconds of audio captured.")
+INPUT_OVERFLOWS = METRICS.counter(
+    "flow_stt_input_overflows_total", "Capture blocks the driver flagged as input overflow (samples lost)."
+)
+AUDIO_DECODED = METRICS.counter(
+    "flow_stt_audio_decoded_seconds_total", "Seconds of audio decoded, including speculative decodes."
+)
+INFERENCE = METRICS.counter("flow_stt_inference_seconds_total", "Wall time spent decoding.")
+INFERENCE_RTF = METRICS.histogram(
+    "flow_stt_inference_rtf",
+    "Decode time divided by audio duration, per decode.",
+    (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0),
+)
+MODEL_LOADS = METRICS.counter("flow_stt_model_loads_total", "Whisper models loaded.")
+MODEL_LOAD_SECONDS = METRICS.counter("flow_stt_model_load_seconds_total", "Wall time spent loading models.")
+INJECTED_CHARS = METRICS.counter("flow_stt_injected_chars_total", "Characters typed or pasted into other apps.")
+INJECTION = METRICS.counter("flow_stt_injection_seconds_total", "Wall time spent typing or pasting text.")
+INJECTION_RATE = METRICS.histogram(
+    "flow_stt_injection_chars_per_second",
+    "Characters per second, per output.",
+    (50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000),
+)
+METRICS.gauge("flow_stt_resident_memory_bytes", "Resident set size of the process.", rss_bytes)
+METRICS.gauge("flow_stt_cpu_seconds_total", "User and system CPU time of the process.", time.process_time, "counter")
+METRICS.gauge("flow_stt_open_handles", "Open file descriptors (POSIX) or kernel handles (Windows).", open_handles)
+METRICS.gauge("flow_stt_start_time_seconds", "Unix time the process started.", lambda: _STARTED)
+
+
+def record_injection(chars: int, seconds: float) -> None:
+    """Called by the integrations after each output."""
+    INJECTED_CHARS.inc(chars)
+    INJECTION.inc(seconds)
+    if seconds > 0:
+        INJECTION_RATE.observe(chars / seconds)
+
+
+def _handler_class(registry: MetricsRegistry):
+    # http.server is only imported once an endpoint is actually configured.
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        timeout = 5.0
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler
+            logger.debug("Metrics request: " + format, *args)
+
+    return Handler
+
+
+class MetricsServer:
+    """Serves the registry over HTTP on localhost; handles one scrape at a time."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = METRICS):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional["HTTPServer"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        from http.server import HTTPServer
+
+        try:
+            self._server = HTTPServer((self.host, self.port), _handler_class(self.registry))
+        except OSError as exc:
+            logger.error("Could not serve metrics on %s:%d: %s", self.host, self.port, exc)
+            return
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._run, name="flow-stt-metrics-http", daemon=True)
+        self._thread.start()
+        logger.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+    def _run(self) -> None:
+        server = self._server
+        # Blocks in accept() between scrapes instead of polling like serve_forever().
+        while not self._stop.is_set():
+            server.handle_request()
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        import socket
+
+        self._stop.set()
+        try:
+            # Wake the blocked accept() so the thread sees the stop flag.
+            socket.create_connection((self.host, self.port), timeout=1.0).close()
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(2.0)
+        self._server.server_close()
+        self._server = None
+
+
+class TextfileWriter:
+    """Rewrites ``path`` with the current metrics every ``interval`` seconds, and once more on close."""
+
+    def __init__(self, path: Path, interval: float = 15.0, registry: MetricsRegistry = METRICS):
+        self.path = Path(path)
+        self.interval = max(1.0, interval)
+        self.registry = registry
+        self.wakeups = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="flow-stt-metrics-file", daemon=True)
+        self._thread.start()
+
+    def write(self) -> None:
+        # The collector may read at any moment; only ever show it a complete file.
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(self.registry.render(), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.warning("Could not write metrics to %s: %s", self.path, exc)
+
+    def _run(self) -> None:
+        self.write()
+        while not self._stop.wait(self.interval):
+            self.wakeups += 1
+            self.write()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self.write()
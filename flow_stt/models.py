@@ -0,0 +1,361 @@
+"""Local model files: pinned and verified, prewarmed, optionally shared between users.
+
+By default every process resolves its model through the per-user Hugging Face
+cache. It then quantizes the float16 weights to int8 while loading. With
+``model_cache_dir`` set, the model is converted once into
+``<dir>/<model>-<quantization>/`` as CTranslate2 int8 weights and made
+read-only. Every seat then loads those same files. The disk holds one copy, the
+OS page cache holds the files once for all sessions, and after the first seat a
+cold start reads from memory instead of disk.
+
+CTranslate2 copies weights into its own buffers while loading, so each process
+still keeps a private copy of the model in RAM. The load time and the memory the
+load added are logged for every seat so that cost stays visible.
+
+Models are looked up through a local registry (``models.json`` in the data
+folder). The registry pins each model to a directory and records the size and
+SHA-256 of every file. A model is hashed once, when it is pinned; later starts
+only compare sizes and mtimes, and rehash just the files whose stats changed.
+Once a model is pinned, loading it never touches the network. ``prewarm`` reads
+the pinned files sequentially in the background so the page cache is hot before
+CTranslate2 asks for them.
+
+    python -m flow_stt.models pin small
+    python -m flow_stt.models verify small
+    python -m flow_stt.models prewarm small        # e.g. from a login script
+    python -m flow_stt.models prepare --dir /srv/flow_stt/models small
+    python -m flow_stt.models load --dir /srv/flow_stt/models small
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .config import default_data_dir
+from .procinfo import rss_bytes
+from .scheduling import set_thread_nice
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "flow_stt.json"
+# Files faster-whisper needs next to model.bin; the converter copies them over.
+TOKENIZER_FILES = ["tokenizer.json", "preprocessor_config.json"]
+READ_CHUNK = 4 * 1024 * 1024
+
+
+def shared_model_dir(cache_dir: Path, model_size: str, quantization: str = "int8") -> Path:
+    return Path(cache_dir) / f"{model_size.replace('/', '--')}-{quantization}"
+
+
+def _convert(model_size: str, target: Path, quantization: str) -> str:
+    """Write CTranslate2 weights for ``model_size`` into ``target``; returns how they were produced."""
+    try:
+        from ctranslate2.converters import TransformersConverter
+
+        source = model_size if "/" in model_size else f"openai/whisper-{model_size}"
+        # Needs transformers (and torch) next to ctranslate2; seats only ever read the result.
+        TransformersConverter(source, copy_files=TOKENIZER_FILES).convert(
+            str(target), quantization=quantization, force=True
+        )
+        return f"converted:{quantization}"
+    except Exception as exc:  # noqa: BLE001
+        logger.info(
+            "Could not convert %s to %s (%s); storing faster-whisper's weights instead.", model_size, quantization, exc
+        )
+    from faster_whisper.utils import download_model
+
+    # CTranslate2 then quantizes at load time, as without a shared cache.
+    download_model(model_size, output_dir=str(target))
+    return "downloaded"
+
+
+def _make_read_only(directory: Path) -> None:
+    for path in directory.rglob("*"):
+        if path.is_file():
+            path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    directory.chmod(stat.S_IRUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+
+
+def ensure_shared_model(model_size: str, cache_dir: Path, quantization: str = "int8") -> Path:
+    """Return the shared directory for ``model_size``, converting it on first use.
+
+    Conversion happens in a private temp directory that is renamed into place, so
+    seats starting at the same time never see a half-written model. If two of them
+    convert at once, the second rename fails and that copy is thrown away.
+    """
+    if Path(model_size).is_dir():
+        return Path(model_size)
+    target = shared_model_dir(cache_dir, model_size, quantization)
+    if (target / MANIFEST).exists():
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    started = time.perf_counter()
+    logger.info("Preparing shared model %s in %s...", model_size, target)
+    source = _convert(model_size, staging, quantization)
+    manifest = {"model": model_size, "quantization": quantization, "source": source, "created": time.time()}
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    _make_read_only(staging)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        if not (target / MANIFEST).exists():
+            raise
+        logger.info("Another process prepared %s first; using its copy.", target)
+        staging.chmod(stat.S_IRWXU)
+        for path in staging.rglob("*"):
+            path.chmod(stat.S_IRWXU)
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        logger.info("Shared model ready in %.1fs (%s).", time.perf_counter() - started, source)
+    return target
+
+
+def default_registry_path() -> Path:
+    return default_data_dir() / "models.json"
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    buffer = bytearray(READ_CHUNK)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def _model_files(directory: Path) -> List[Path]:
+    return sorted(path for path in directory.rglob("*") if path.is_file() and not path.name.startswith("."))
+
+
+class ModelRegistry:
+    """Pins model names to verified local directories.
+
+    Entries are keyed by model name, plus the shared cache directory when one is
+    used. Each entry records the directory and, per file, its size, mtime and
+    SHA-256. The registry file is replaced atomically, so sessions that share a
+    data folder can update it concurrently.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or default_registry_path()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_size: str, cache_dir: Optional[str] = None) -> str:
+        return f"{model_size}@{Path(cache_dir).resolve()}" if cache_dir else model_size
+
+    def entries(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, key: str, entry: dict) -> None:
+        with self._lock:
+            entries = self.entries()
+            entries[key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            staging = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+            staging.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+            os.replace(staging, self.path)
+
+    def pinned_files(self, model_size: str, cache_dir: Optional[str] = None) -> List[Path]:
+        """Files of a pinned model, unverified; cheap enough to call before anything else loads."""
+        entry = self.entries().get(self.key(model_size, cache_dir))
+        if not entry:
+            return []
+        return [Path(entry["path"]) / name for name in entry["files"]]
+
+    def pin(self, model_size: str, cache_dir: Optional[str] = None) -> Path:
+        """Fetch (or convert) the model once, then hash and record every file."""
+        try:
+            if cache_dir:
+                directory = ensure_shared_model(model_size, Path(cache_dir))
+            elif Path(model_size).is_dir():
+                directory = Path(model_size)
+            else:
+                from faster_whisper.utils import download_model
+
+                try:
+                    directory = Path(download_model(model_size))
+                except Exception:  # noqa: BLE001
+                    # Offline: a copy already in the Hugging Face cache is still good to pin.
+                    directory = Path(download_model(model_size, local_files_only=True))
+        except Exception as exc:  # noqa: BLE001
+            raise RuntimeError(
+                f"Model {model_size!r} is not available locally and could not be downloaded ({exc}). "
+                f"Connect once and run `python -m flow_stt.models pin {model_size}`."
+            ) from exc
+        started = time.perf_counter()
+        files = {}
+        for path in _model_files(directory):
+            info = path.stat()
+            files[path.relative_to(directory).as_posix()] = {
+                "size": info.st_size,
+                "mtime_ns": info.st_mtime_ns,
+                "sha256": file_digest(path),
+            }
+        self._store(self.key(model_size, cache_dir), {"path": str(directory), "files": files, "pinned": time.time()})
+        logger.info("Pinned model %s (%d files) in %.1fs.", model_size, len(files), time.perf_counter() - started)
+        return directory
+
+    def verify(self, model_size: str, cache_dir: Optional[str] = None, full: bool = False) -> Optional[Path]:
+        """The pinned directory if its files are intact, None if the model was never pinned.
+
+        Files whose size and mtime still match the registry are trusted unless
+        ``full`` is set; anything else is rehashed. Missing or altered files raise
+        RuntimeError instead of letting CTranslate2 fail on them later.
+        """
+        key = self.key(model_size, cache_dir)
+        entry = self.entries().get(key)
+        if not entry:
+            return None
+        directory = Path(entry["path"])
+        refreshed = False
+        for name, expected in entry["files"].items():
+            path = directory / name
+            try:
+                info = path.stat()
+            except OSError:
+                raise RuntimeError(
+                    f"Model {model_size!r} is missing {path}; "
+                    f"re-pin it with `python -m flow_stt.models pin {model_size}`."
+                ) from None
+            if not full and info.st_size == expected["size"] and info.st_mtime_ns == expected["mtime_ns"]:
+                continue
+            if info.st_size != expected["size"] or file_digest(path) != expected["sha256"]:
+                raise RuntimeError(
+                    f"Model {model_size!r} file {path} does not match its pinned checksum; "
+                    f"re-pin it with `python -m flow_stt.models pin {model_size}`."
+                )
+            expected["mtime_ns"] = info.st_mtime_ns
+            refreshed = True
+        if refreshed:
+            self._store(key, entry)
+        return directory
+
+    def resolve(self, model_size: str, cache_dir: Optional[str] = None) -> Path:
+        """Verified local directory for the model, pinning it on first use."""
+        return self.verify(model_size, cache_dir) or self.pin(model_size, cache_dir)
+
+
+def prewarm(files: Sequence[Path]) -> int:
+    """Read ``files`` front to back so they sit in the page cache; returns bytes read."""
+    total = 0
+    buffer = bytearray(READ_CHUNK)
+    for path in files:
+        try:
+            with path.open("rb", buffering=0) as f:
+                if hasattr(os, "posix_fadvise"):
+                    # Ask for aggressive readahead; the reads below then mostly hit cache.
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                while True:
+                    read = f.readinto(buffer)
+                    if not read:
+                        break
+                    total += read
+        except OSError as exc:
+            logger.debug("Could not prewarm %s: %s", path, exc)
+    return total
+
+
+def prewarm_in_background(files: Sequence[Path]) -> Optional[threading.Thread]:
+    """Prewarm on a low-priority thread; returns None when there is nothing to read."""
+    if not files:
+        return None
+
+    def run():
+        set_thread_nice(10)
+        started = time.perf_counter()
+        total = prewarm(files)
+        elapsed = time.perf_counter() - started
+        logger.info("Prewarmed %.0f MiB of model files in %.2fs.", total / (1024 * 1024), elapsed)
+
+    thread = threading.Thread(target=run, name="flow-stt-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+class LoadReport:
+    """Wall time and resident-memory growth of one model load."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.rss_delta: Optional[int] = None
+        self._started = 0.0
+        self._rss: Optional[int] = None
+
+    def __enter__(self) -> "LoadReport":
+        self._rss = rss_bytes()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self._started
+        after = rss_bytes()
+        if self._rss is not None and after is not None:
+            self.rss_delta = after - self._rss
+
+    def __str__(self) -> str:
+        memory = f"+{self.rss_delta / (1024 * 1024):.0f} MiB" if self.rss_delta is not None else "unknown"
+        return f"{self.seconds:.2f}s, process memory {memory}"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .config import ConfigManager
+
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.models", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["pin", "verify", "prewarm", "prepare", "load"])
+    parser.add_argument("model", nargs="?", help="Model name (default: the configured model_size).")
+    parser.add_argument("--dir", help="Shared cache directory (default: the configured model_cache_dir).")
+    parser.add_argument("--quantization", default="int8")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cfg = ConfigManager().config
+    model = args.model or cfg.model_size
+    cache_dir = args.dir or cfg.model_cache_dir
+    registry = ModelRegistry()
+    if args.command == "pin":
+        print(f"Pinned {model} at {registry.pin(model, cache_dir)}")
+    elif args.command == "verify":
+        path = registry.verify(model, cache_dir, full=True)
+        print(f"{model}: {'OK, ' + str(path) if path else 'not pinned'}")
+        if path is None:
+            raise SystemExit(1)
+    elif args.command == "prewarm":
+        started = time.perf_counter()
+        total = prewarm(registry.pinned_files(model, cache_dir))
+        print(f"Read {total / (1024 * 1024):.0f} MiB in {time.perf_counter() - started:.2f}s")
+    else:
+        if not cache_dir:
+            parser.error(f"{args.command} needs --dir or model_cache_dir")
+        path = ensure_shared_model(model, Path(cache_dir), args.quantization)
+        print(f"Model directory: {path}")
+        if args.command == "load":
+            from faster_whisper import WhisperModel
+
+            with LoadReport() as report:
+                WhisperModel(str(path), device="cpu", compute_type=args.quantization)
+            # Run it twice (or from a second session) to see the warm page-cache figure.
+            print(f"Load: {report}")
+
+
+if __name__ == "__main__":
+    main()
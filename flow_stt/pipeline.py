@@ -0,0 +1,85 @@
+"""Ordered single-thread stages for the transcribe -> output pipeline.
+
+Each stage runs its jobs one at a time in submission order from a bounded queue,
+so typing utterance N can overlap decoding utterance N+1 while text still
+comes out in the order it was spoken. A full queue blocks the submitter, which
+applies back-pressure instead of piling up audio. A stage fed from a thread that
+must not block, such as a low-level keyboard hook, is created with
+``maxsize=0`` (unbounded) instead.
+"""
+
+import logging
+import time
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# A job receives how long it sat in the queue before the stage picked it up.
+Job = Callable[[float], None]
+
+
+class StageWorker:
+    def __init__(self, name: str, maxsize: int = 4, on_idle: Optional[Callable[[], None]] = None):
+        self.name = name
+        # Runs on the stage thread each time the last pending job has finished.
+        self.on_idle = on_idle
+        self._queue: "Queue[Optional[tuple]]" = Queue(maxsize=maxsize)
+        self._lock = Lock()
+        self._pending = 0  # queued plus running
+        self.jobs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._thread = Thread(target=self._run, name=f"flow-stt-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def idle(self) -> bool:
+        """True when nothing is queued or running."""
+        return self._pending == 0
+
+    def submit(self, job: Job) -> None:
+        with self._lock:
+            self._pending += 1
+        self._queue.put((job, time.perf_counter()))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Finish the queued jobs, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.jobs:
+            logger.info(
+                "Stage %s: %d job(s), queue wait mean %.0f ms, max %.0f ms",
+                self.name,
+                self.jobs,
+                1000 * self.total_wait / self.jobs,
+                1000 * self.max_wait,
+            )
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, queued_at = item
+            waited = time.perf_counter() - queued_at
+            self.jobs += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > 0.05:
+                logger.debug("Stage %s: job waited %.0f ms in queue.", self.name, waited * 1000)
+            try:
+                job(waited)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Stage %s job failed: %s", self.name, exc)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    idle = self._pending == 0
+            if idle and self.on_idle is not None:
+                try:
+                    self.on_idle()
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("Stage %s idle hook failed: %s", self.name, exc)
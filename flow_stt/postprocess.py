@@ -23,8 +23,10 @@ class TextResult:
 
 
 class TextPostProcessor:
-    def __init__(self, enable_spoken_punctuation: bool = True):
+    def __init__(self, enable_spoken_punctuation: bool = True, vocabulary=None):
         self.enable_spoken_punctuation = enable_spoken_punctuation
+        # Optional vocabulary.VocabularyIndex; swapped in once it has loaded.
+        self.vocabulary = vocabulary
 
     def process(self, text: str) -> TextResult:
         if not text:
@@ -32,6 +34,9 @@ class TextPostProcessor:
         cleaned = text.strip()
         if self.enable_spoken_punctuation:
             cleaned = self._apply_spoken_punctuation(cleaned)
+        vocabulary = self.vocabulary
+        if vocabulary is not None:
+            cleaned = vocabulary.correct(cleaned)
         cleaned = self._clean_spaces(cleaned)
         cleaned = self._capitalize(cleaned)
         return TextResult(final_text=cleaned)
@@ -0,0 +1,64 @@
+"""Cheap process statistics (resident memory, open handles) without psutil."""
+
+import os
+import platform
+from typing import Optional
+
+
+_SYSTEM = platform.system().lower()
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, or None where it can't be read."""
+    try:
+        if _SYSTEM == "linux":
+            with open("/proc/self/statm", "r", encoding="ascii") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if _SYSTEM == "windows":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return int(counters.WorkingSetSize)
+            return None
+        import resource
+
+        # macOS only exposes the peak, in bytes; still useful for spotting growth.
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except (OSError, ValueError, AttributeError, ImportError):
+        return None
+
+
+def open_handles() -> Optional[int]:
+    """Open file descriptors (POSIX) or kernel handles (Windows), or None if unknown."""
+    try:
+        if _SYSTEM == "windows":
+            import ctypes
+            from ctypes import wintypes
+
+            count = wintypes.DWORD()
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.kernel32.GetProcessHandleCount(process, ctypes.byref(count)):
+                return int(count.value)
+            return None
+        fd_dir = "/proc/self/fd" if _SYSTEM == "linux" else "/dev/fd"
+        return len(os.listdir(fd_dir))
+    except (OSError, AttributeError, ImportError):
+        return None
@@ -0,0 +1,191 @@
+"""On-demand profiling of a live session: stack sampling plus an allocation diff.
+
+A ``ProfileSession`` samples the stacks of every Python thread at a fixed
+interval, covering capture callbacks, decoding, post-processing and typing, and
+traces allocations with ``tracemalloc`` until it has seen a given number of
+utterances. It then writes into a timestamped directory:
+
+- ``stacks.folded``: collapsed stacks (``thread;outer;...;inner count``) for
+  flamegraph.pl, speedscope or inferno,
+- ``allocations.txt``: the allocation sites that grew most during the session,
+- ``profile.json``: per-utterance timings and sampling statistics.
+
+Nothing runs unless a session is started, so a disabled profiler costs nothing.
+
+    python -m flow_stt.profiling <dir>     # top functions from a collected profile
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import default_data_dir
+
+
+logger = logging.getLogger(__name__)
+
+TRACE_FRAMES = 10
+
+
+def default_profile_dir() -> Path:
+    return default_data_dir() / "profiles"
+
+
+def _frame_label(code) -> str:
+    # Keyed by the function's first line so samples from anywhere in it aggregate.
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """Collects collapsed stacks of all threads but its own every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="flow-stt-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate() if thread.ident}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+class ProfileSession:
+    def __init__(self, utterances: int, directory: Optional[Path] = None, interval: float = 0.005):
+        self.utterances = max(1, utterances)
+        self.directory = (directory or default_profile_dir()) / time.strftime("%Y%m%d-%H%M%S")
+        self.sampler = StackSampler(interval)
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._owns_tracemalloc = False
+        self._writer: Optional[threading.Thread] = None
+        self.done = threading.Event()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._owns_tracemalloc = True
+        self._baseline = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self.sampler.start()
+        logger.info("Profiling the next %d utterance(s) into %s", self.utterances, self.directory)
+
+    def record(self, timings: Dict[str, float], **extra) -> bool:
+        """Count one finished utterance; returns True once the session has enough and stops."""
+        with self._lock:
+            if self.done.is_set():
+                return True
+            self.records.append({"timings": dict(timings), **extra})
+            if len(self.records) < self.utterances:
+                return False
+            self.done.set()
+            # Writing the report takes a moment; keep it off the pipeline thread.
+            self._writer = threading.Thread(target=self._finish, name="flow-stt-profile-write", daemon=True)
+            self._writer.start()
+        return True
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Write whatever was collected so far, or wait for a pending write, e.g. at exit."""
+        with self._lock:
+            finish = not self.done.is_set()
+            self.done.set()
+        if finish:
+            self._finish()
+        elif self._writer is not None:
+            self._writer.join(timeout)
+
+    def _finish(self) -> Path:
+        elapsed = time.perf_counter() - self._started
+        self.sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / "stacks.folded").open("w", encoding="utf-8") as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        if self._baseline is not None:
+            diff = snapshot.compare_to(self._baseline, "traceback")
+            with (self.directory / "allocations.txt").open("w", encoding="utf-8") as f:
+                for stat in diff[:50]:
+                    f.write(f"{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} block(s)\n")
+                    for line in stat.traceback.format(limit=TRACE_FRAMES):
+                        f.write(f"    {line}\n")
+        summary = {
+            "utterances": self.records,
+            "duration_secs": elapsed,
+            "interval_secs": self.sampler.interval,
+            "samples": self.sampler.samples,
+            "achieved_hz": self.sampler.samples / elapsed if elapsed > 0 else 0.0,
+        }
+        (self.directory / "profile.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        logger.info("Profile written to %s (%d samples over %.1fs)", self.directory, self.sampler.samples, elapsed)
+        return self.directory
+
+
+def top_functions(folded: Path, limit: int = 25) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]], int]:
+    """(self, inclusive) sample counts per function from a collapsed-stack file, plus the total."""
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    total = 0
+    for line in folded.read_text(encoding="utf-8").splitlines():
+        stack, _, count = line.rpartition(" ")
+        frames = stack.split(";")[1:]  # drop the thread name
+        samples = int(count)
+        total += samples
+        if frames:
+            own[frames[-1]] += samples
+        for frame in set(frames):
+            inclusive[frame] += samples
+    return own.most_common(limit), inclusive.most_common(limit), total
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.profiling", description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="A profile directory (containing stacks.folded).")
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    own, inclusive, total = top_functions(args.directory / "stacks.folded", args.limit)
+    for title, rows in (("Self", own), ("Inclusive", inclusive)):
+        print(f"{title} samples (of {total}):")
+        for frame, count in rows:
+            print(f"  {100 * count / max(total, 1):5.1f}%  {frame}")
+
+
+if __name__ == "__main__":
+    main()
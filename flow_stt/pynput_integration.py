@@ -3,9 +3,10 @@ import platform
 import time
 from typing import Callable, Dict, Iterable, Set
 
-import pyperclip
 from pynput import keyboard
 
+from . import metrics
+
 
 logger = logging.getLogger(__name__)
 
@@ -29,15 +30,25 @@ def _canonical_token(token: str) -> str:
 class PynputIntegration:
     """Cross-platform hotkeys and typing using pynput (macOS/Linux/Windows)."""
 
-    def __init__(self, output_mode: str = "type", auto_paste_clipboard: bool = False):
+    def __init__(
+        self,
+        output_mode: str = "type",
+        auto_paste_clipboard: bool = False,
+        restore_clipboard: bool = False,
+        controller=None,
+        chunk_delay: float = 0.02,
+    ):
         self.output_mode = output_mode
         self.auto_paste_clipboard = auto_paste_clipboard
+        self.restore_clipboard = restore_clipboard
+        # Pause between typed chunks so slow targets keep up; 0 in benchmarks.
+        self.chunk_delay = chunk_delay
         self._listeners: list[keyboard.Listener] = []
         self._hotkeys: list[keyboard.GlobalHotKeys] = []
         self._pressed: Set[str] = set()
         self._active_ptt = False
         self._system = platform.system().lower()
-        self._controller = keyboard.Controller()
+        self._controller = controller or keyboard.Controller()
 
     def type_text(self, text: str, chunk_size: int = 120) -> None:
         if not text:
@@ -45,30 +56,51 @@ class PynputIntegration:
         for idx in range(0, len(text), chunk_size):
             chunk = text[idx : idx + chunk_size]
             self._controller.type(chunk)
-            time.sleep(0.02)
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
 
     def copy_to_clipboard(self, text: str, paste: bool | None = None) -> None:
         if not text:
             return
-        pyperclip.copy(text)
+        from .clipboard import get_clipboard
+
+        # The backend's copy returns once the text is ready to be pasted.
+        clipboard = get_clipboard()
         do_paste = self.auto_paste_clipboard if paste is None else paste
+        previous = clipboard.read() if do_paste and self.restore_clipboard else None
+        clipboard.copy(text)
         if do_paste:
-            time.sleep(0.05)
+            clipboard.expect_paste()
             self._send_paste()
+            if previous is not None:
+                clipboard.restore(previous)
 
     def _send_paste(self):
+        self._send_shortcut("v")
+
+    def _send_shortcut(self, char: str):
         key_cmd = keyboard.Key.cmd if self._system == "darwin" else keyboard.Key.ctrl
         with self._controller.pressed(key_cmd):
-            self._controller.press("v")
-            self._controller.release("v")
+            self._controller.press(char)
+            self._controller.release(char)
+
+    def delete_text(self, count: int) -> None:
+        for _ in range(count):
+            self._controller.press(keyboard.Key.backspace)
+            self._controller.release(keyboard.Key.backspace)
+
+    def send_undo(self) -> None:
+        self._send_shortcut("z")
 
     def output_text(self, text: str) -> None:
+        started = time.perf_counter()
         if self.output_mode == "clipboard":
             self.copy_to_clipboard(text)
         elif self.output_mode == "paste":
             self.copy_to_clipboard(text, paste=True)
         else:
             self.type_text(text)
+        metrics.record_injection(len(text), time.perf_counter() - started)
 
     # Hotkeys
     def register_hotkey_toggle(self, hotkey: str, on_toggle: Callable[[], None]) -> None:
@@ -0,0 +1,132 @@
+"""Vectorized polyphase resampling for capture blocks and one-shot buffers."""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _design_filter(up: int, down: int, taps_per_phase: int, beta: float) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass at the tighter of the two Nyquist limits.
+
+    Returns the prototype split into ``up`` phases of ``taps_per_phase`` taps, with
+    each phase reversed so a dot product with input history yields one output.
+    """
+    length = up * taps_per_phase
+    # Slightly below Nyquist so the transition band stays out of the alias region.
+    cutoff = 0.45 / max(up, down)  # cycles per upsampled sample
+    n = np.arange(length) - (length - 1) / 2.0
+    prototype = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(length, beta)
+    prototype *= up / prototype.sum()
+    # phases[p, k] = prototype[p + k * up]; output n uses phase (n * down) % up.
+    phases = prototype.reshape(taps_per_phase, up).T
+    return np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+
+
+class StreamingResampler:
+    """Resample a mono stream block by block from ``src_rate`` to ``dst_rate``.
+
+    State carries over between calls, so feeding blocks one at a time produces the
+    same output as resampling the whole signal at once. ``process`` runs in the
+    capture callback, so its working arrays are kept and reused between blocks:
+    integer decimation (e.g. 48 kHz to 16 kHz) is one strided matrix-vector
+    product over a window view of the input; other ratios gather each output's
+    window into a reused array, using index and coefficient tables built once
+    per phase offset, for a row-wise dot product.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int, zero_crossings: int = 12, beta: float = 8.0):
+        if src_rate <= 0 or dst_rate <= 0:
+            raise ValueError(f"Sample rates must be positive, got {src_rate} -> {dst_rate}")
+        factor = gcd(int(src_rate), int(dst_rate))
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        self.up = self.dst_rate // factor
+        self.down = self.src_rate // factor
+        # Filter span is fixed in zero crossings of the sinc, so downsampling by more
+        # gets proportionally more taps per output and the same transition width.
+        self.taps = -(-2 * zero_crossings * max(self.up, self.down) // self.up)
+        self._phases = _design_filter(self.up, self.down, self.taps, beta)
+        self.reset()
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+
+    def reset(self) -> None:
+        # Input history (the first taps - 1 samples) followed by the current block.
+        self._buf = np.zeros(self.taps - 1, dtype=np.float32)
+        self._index = np.empty((0, self.taps), dtype=np.intp)
+        self._consumed = 0  # absolute index of the first sample after the history
+        self._fed = 0  # real (non-flush) input samples seen
+        self._next_out = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self.passthrough:
+            return block
+        self._fed += block.shape[0]
+        return self._filter(block)
+
+    def flush(self) -> np.ndarray:
+        """Push out the outputs still owed for the input so far; call once at the end."""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        expected = -(-self._fed * self.up // self.down)
+        owed = max(0, expected - self._next_out)
+        tail = self._filter(np.zeros(self.taps, dtype=np.float32))
+        return tail[:owed]
+
+    def _grow(self, count: int) -> None:
+        """Size the per-block tables for ``count`` outputs, starting at any phase."""
+        m = np.arange(self.up + count, dtype=np.intp)
+        # Row m: input offsets of output m's taps, and its filter phase, for m < up + count.
+        self._grid = ((m * self.down) // self.up)[:, None] + np.arange(self.taps, dtype=np.intp)
+        self._coeffs = self._phases[(m * self.down) % self.up]
+        self._index = np.empty((count, self.taps), dtype=np.intp)
+        self._windows = np.empty((count, self.taps), dtype=np.float32)
+
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        history = self.taps - 1
+        size = history + block.shape[0]
+        if self._buf.shape[0] < size:
+            grown = np.empty(size, dtype=np.float32)
+            grown[:history] = self._buf[:history]
+            self._buf = grown
+        buf = self._buf[:size]
+        buf[history:] = block
+        start = self._consumed - history  # absolute index of buf[0]
+        end = self._consumed + block.shape[0]
+        # Output n reads input up to floor(n * down / up); emit every n already covered.
+        last = (end * self.up - 1) // self.down
+        count = max(0, last - self._next_out + 1)
+        out = np.empty(count, dtype=np.float32)
+        if count:
+            if self.up == 1:
+                # windows[i] holds the taps ending at buf[i + history]; a strided view, no copy.
+                windows = sliding_window_view(buf, self.taps)
+                first = self._next_out * self.down - start - history
+                np.matmul(windows[first : first + (count - 1) * self.down + 1 : self.down], self._phases[0], out=out)
+            else:
+                if self._index.shape[0] < count:
+                    self._grow(count)
+                # Output n = q * up + r uses table row r, shifted by the q * down inputs before it.
+                q, r = divmod(self._next_out, self.up)
+                index = self._index[:count]
+                windows = self._windows[:count]
+                np.add(self._grid[r : r + count], q * self.down - start - history, out=index)
+                # mode="clip" writes straight into ``windows``; "raise" would buffer a copy.
+                np.take(buf, index, out=windows, mode="clip")
+                np.einsum("ij,ij->i", windows, self._coeffs[r : r + count], out=out)
+            self._next_out += count
+        buf[:history] = buf[size - history :]
+        self._consumed = end
+        return out
+
+
+def resample(audio: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Resample a whole mono buffer in one call."""
+    resampler = StreamingResampler(src_rate, dst_rate)
+    if resampler.passthrough:
+        return np.asarray(audio, dtype=np.float32).reshape(-1)
+    return np.concatenate((resampler.process(audio), resampler.flush()))
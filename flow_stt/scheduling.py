@@ -0,0 +1,135 @@
+"""Per-thread CPU placement and priority for the inference and capture threads.
+
+Linux applies ``os.sched_setaffinity`` and ``os.setpriority`` to the calling
+thread's id; Windows uses ``SetThreadAffinityMask``/``SetThreadPriority``. Other
+platforms ignore the settings. New threads inherit both, so a model loaded from
+a scheduled thread puts CTranslate2's worker pool on the same cores.
+"""
+
+import logging
+import os
+import platform
+import threading
+from typing import Callable, Sequence, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_WINDOWS = platform.system().lower() == "windows"
+THREAD_PRIORITY_LOWEST = -2
+THREAD_PRIORITY_BELOW_NORMAL = -1
+THREAD_PRIORITY_HIGHEST = 2
+
+
+def _kernel32():
+    import ctypes
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentThread.restype = ctypes.c_void_p
+    kernel32.SetThreadAffinityMask.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+    kernel32.SetThreadPriority.argtypes = (ctypes.c_void_p, ctypes.c_int)
+    return kernel32
+
+
+def set_thread_affinity(cpus: Sequence[int]) -> bool:
+    """Pin the calling thread to ``cpus``; returns False where unsupported or refused."""
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, set(cpus))  # 0 is the calling thread on Linux.
+            return True
+        if _WINDOWS:
+            mask = sum(1 << cpu for cpu in cpus)
+            kernel32 = _kernel32()
+            return bool(kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask))
+    except (OSError, ValueError, AttributeError) as exc:
+        logger.warning("Could not pin thread to CPUs %s: %s", list(cpus), exc)
+    return False
+
+
+def set_thread_nice(nice: int) -> bool:
+    """Lower (positive) or raise (negative) the calling thread's scheduling priority."""
+    try:
+        if _WINDOWS:
+            if nice > 0:
+                priority = THREAD_PRIORITY_LOWEST if nice >= 10 else THREAD_PRIORITY_BELOW_NORMAL
+            else:
+                priority = THREAD_PRIORITY_HIGHEST if nice < 0 else 0
+            kernel32 = _kernel32()
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), priority))
+        if platform.system().lower() == "linux":
+            # Linux keeps a nice value per thread, addressed by its native id.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+            return True
+    except (OSError, AttributeError) as exc:
+        logger.debug("Could not set thread priority to %d: %s", nice, exc)
+    return False
+
+
+def raise_thread_priority() -> bool:
+    """Best-effort boost for latency-critical threads such as the audio callback.
+
+    Works on Windows; on Linux it needs CAP_SYS_NICE (or an rlimit allowing it)
+    and is otherwise a no-op, which is why inference is de-prioritized instead.
+    """
+    return set_thread_nice(-5)
+
+
+def all_cpus() -> Tuple[int, ...]:
+    return tuple(range(os.cpu_count() or 1))
+
+
+# (cpus, nice) last applied to each thread, whichever ThreadPolicy applied it.
+_applied = threading.local()
+
+
+class ThreadPolicy:
+    """CPU set and nice value applied to each thread that runs inference."""
+
+    def __init__(self, cpus: Sequence[int] = (), nice: int = 0):
+        self.cpus = tuple(cpus)
+        self.nice = nice
+
+    @property
+    def active(self) -> bool:
+        return bool(self.cpus) or self.nice != 0
+
+    def apply(self) -> None:
+        """Apply the policy to the calling thread, if it isn't already in place.
+
+        A thread that ran under a different policy before (e.g. after a config
+        reload) is moved back to all CPUs and nice 0 where this one sets nothing.
+        """
+        previous = getattr(_applied, "policy", None)
+        current = (self.cpus, self.nice)
+        if previous == current or (previous is None and not self.active):
+            return
+        _applied.policy = current
+        if previous is None or self.cpus != previous[0]:
+            set_thread_affinity(self.cpus or all_cpus())
+        if previous is None or self.nice != previous[1]:
+            # Linux only lets unprivileged threads lower their priority, not raise it back.
+            if not set_thread_nice(self.nice) and previous is not None:
+                logger.info("Could not restore thread priority to %d; restart to apply it.", self.nice)
+
+    def run(self, fn: Callable[[], T]) -> T:
+        """Call ``fn`` on a fresh thread that has the policy applied, and return its result."""
+        if not self.active:
+            return fn()
+        outcome = {}
+
+        def target():
+            self.apply()
+            try:
+                outcome["value"] = fn()
+            except BaseException as exc:  # noqa: BLE001
+                outcome["error"] = exc
+
+        thread = threading.Thread(target=target, name="flow-stt-scheduled", daemon=True)
+        thread.start()
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
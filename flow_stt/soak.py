@@ -0,0 +1,285 @@
+"""Soak test: drive ``DictationApp`` through thousands of utterances with fakes.
+
+Audio, the Whisper model and the keyboard/clipboard integration are replaced by
+in-process fakes, so a soak runs headless and fast while still exercising
+capture buffers, the transcribe/output pipeline, post-processing and config
+reloads. RSS, thread count, open handles, registered hotkeys and tracemalloc
+usage are sampled as it goes. A metric that is still climbing across the run
+is reported as a leak, with the allocation sites that grew the most.
+
+    python -m flow_stt.soak --cycles 5000 --reload-every 100
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .app import DictationApp
+from .audio_capture import AudioCapture
+from .config import ConfigManager
+from .devices import DeviceRegistry
+from .procinfo import open_handles, rss_bytes
+from .stt_engine import SpeechToTextEngine
+
+
+logger = logging.getLogger(__name__)
+
+BLOCK_FRAMES = 2048
+SEED = 7
+
+# Growth across the run that counts as a leak, per metric.
+THRESHOLDS = {
+    "rss_mb": 8.0,
+    "traced_mb": 2.0,
+    "threads": 0.5,
+    "handles": 0.5,
+    "hotkeys": 0.5,
+}
+
+
+class FakeCapture(AudioCapture):
+    """Feeds synthetic speech-and-pause blocks through the real callback and buffer."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["registry"] = DeviceRegistry(refresh_interval=0)
+        super().__init__(*args, **kwargs)
+        self._rng = np.random.default_rng(SEED)
+
+    def start(self) -> None:
+        if self._listening:
+            return
+        self._buffer = self._new_buffer()
+        self._last_voiced_frame = 0
+        self._pause_reported = True
+        self.overflows = 0
+        self._listening = True
+        for block in self._blocks(float(self._rng.uniform(0.5, 3.0))):
+            self._callback(block, BLOCK_FRAMES, None, None)
+
+    def stop(self) -> None:
+        self._listening = False
+        self._levels = (0.0, 0.0)
+
+    def _blocks(self, seconds: float) -> Iterator[np.ndarray]:
+        count = max(1, int(seconds * self.sample_rate) // BLOCK_FRAMES)
+        for idx in range(count):
+            loud = (idx // 4) % 2 == 0  # alternate ~0.5 s of "speech" and pause
+            scale = 0.2 if loud else 0.001
+            yield (scale * self._rng.standard_normal((BLOCK_FRAMES, 1))).astype(np.float32)
+
+
+class _FakeFeatureExtractor:
+    def __init__(self, n_mels: int = 80):
+        self.mel_filters = np.zeros((n_mels, 201), dtype=np.float32)
+        self.n_samples = 480000
+        self.hop_length = 160
+
+    def __call__(self, waveform, *args, **kwargs):
+        return np.zeros((self.mel_filters.shape[0], 1), dtype=np.float32)
+
+
+@dataclass
+class _FakeSegment:
+    text: str
+    temperature: float = 0.0
+    avg_logprob: float = -0.2
+
+
+@dataclass
+class _FakeInfo:
+    language: str = "en"
+    language_probability: float = 0.99
+
+
+class _FakeWhisperModel:
+    WORDS = "scratch that new line the quick brown fox comma period flow stt".split()
+
+    def __init__(self):
+        self.feature_extractor = _FakeFeatureExtractor()
+        self._rng = np.random.default_rng(SEED)
+
+    def transcribe(self, audio, **kwargs):
+        self.feature_extractor(audio)
+        words = max(1, audio.shape[0] // 8000)
+        text = " ".join(self.WORDS[int(i)] for i in self._rng.integers(len(self.WORDS), size=words))
+        return iter([_FakeSegment(" " + text)]), _FakeInfo()
+
+
+class FakeEngine(SpeechToTextEngine):
+    """The real engine wrapper around a model that answers instantly."""
+
+    def _load_model(self):
+        return _FakeWhisperModel()
+
+
+class FakeIntegration:
+    """Records output and hotkey registrations instead of touching the OS."""
+
+    def __init__(self, output_mode: str = "type", auto_paste_clipboard: bool = False, restore_clipboard: bool = False):
+        self.output_mode = output_mode
+        self.auto_paste_clipboard = auto_paste_clipboard
+        self.restore_clipboard = restore_clipboard
+        self.hotkeys: List[tuple] = []
+        self.typed = 0
+
+    def output_text(self, text: str) -> None:
+        self.typed += len(text)
+
+    def delete_text(self, count: int) -> None:
+        self.typed -= count
+
+    def send_undo(self) -> None:
+        pass
+
+    def register_hotkey_toggle(self, hotkey, on_toggle) -> None:
+        self.hotkeys.append((hotkey, on_toggle))
+
+    def register_hotkey_push_to_talk(self, hotkey, on_press, on_release) -> None:
+        self.hotkeys.append((hotkey, on_press, on_release))
+
+    def register_hotkey_action(self, hotkey, action) -> None:
+        self.hotkeys.append((hotkey, action))
+
+    def clear_hotkeys(self) -> None:
+        self.hotkeys = []
+
+
+class SoakApp(DictationApp):
+    def _build_integration(self):
+        return FakeIntegration(self.cfg.output_mode, self.cfg.auto_paste_clipboard, self.cfg.restore_clipboard)
+
+    def _build_audio(self) -> AudioCapture:
+        return FakeCapture(
+            sample_rate=16000,
+            silence_timeout=None,
+            max_memory_mb=self.cfg.capture_memory_limit_mb,
+            native_rate=False,
+        )
+
+    def _build_engine(self) -> SpeechToTextEngine:
+        return FakeEngine(
+            model_size=self.cfg.model_size,
+            language=self.cfg.language,
+            prefer_gpu=self.cfg.prefer_gpu,
+            max_fallbacks=self.cfg.max_temperature_fallbacks,
+        )
+
+    def wait_idle(self, timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not (self._transcriber.idle and self._output.idle) and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+
+@dataclass
+class SoakReport:
+    cycles: int
+    samples: Dict[str, List[float]] = field(default_factory=dict)
+    leaks: List[str] = field(default_factory=list)
+    top_growth: List[str] = field(default_factory=list)
+
+
+def growing(values: Sequence[float], threshold: float) -> bool:
+    """True when the last third of the run sits entirely above the first third, by ``threshold``."""
+    if len(values) < 6:
+        return False
+    third = len(values) // 3
+    return min(values[-third:]) > max(values[:third]) + threshold
+
+
+def _sample(app: SoakApp) -> Dict[str, float]:
+    rss = rss_bytes()
+    handles = open_handles()
+    traced, _peak = tracemalloc.get_traced_memory()
+    return {
+        "rss_mb": rss / (1024 * 1024) if rss is not None else float("nan"),
+        "traced_mb": traced / (1024 * 1024),
+        "threads": float(threading.active_count()),
+        "handles": float(handles) if handles is not None else float("nan"),
+        "hotkeys": float(len(app.integration.hotkeys)),
+    }
+
+
+def run_soak(cycles: int = 2000, reload_every: int = 100, sample_every: int = 50, workdir: Optional[Path] = None) -> SoakReport:
+    workdir = workdir or Path(tempfile.mkdtemp(prefix="flow-stt-soak-"))
+    cfg_manager = ConfigManager(path=workdir / "config.json")
+    cfg_manager.update(
+        enable_ui=False,
+        log_transcripts=False,
+        watch_config=False,  # reloads are requested explicitly below
+        archive_dir=str(workdir / "archive"),
+        history_file=str(workdir / "history.sqlite3"),
+    )
+    app = SoakApp(cfg_manager=cfg_manager)
+    app._register_hotkeys()
+
+    tracemalloc.start(10)
+    warmup = max(1, cycles // 10)
+    baseline_snapshot = None
+    report = SoakReport(cycles)
+    started = time.perf_counter()
+    try:
+        for cycle in range(1, cycles + 1):
+            app.start_listening()
+            app.stop_listening()
+            if reload_every and cycle % reload_every == 0:
+                # Flip features on and off so their workers get created and torn down.
+                flip = (cycle // reload_every) % 2 == 1
+                cfg_manager.update(
+                    speculative_transcription=flip,
+                    precompute_features=flip,
+                    archive_enabled=flip,
+                    history_enabled=flip,
+                )
+                app.request_reload()
+            if cycle % sample_every == 0 or cycle == cycles:
+                app.wait_idle()
+                if cycle >= warmup:
+                    if baseline_snapshot is None:
+                        baseline_snapshot = tracemalloc.take_snapshot()
+                    for name, value in _sample(app).items():
+                        report.samples.setdefault(name, []).append(value)
+        app.wait_idle()
+        if baseline_snapshot is not None:
+            diff = tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")
+            report.top_growth = [str(stat) for stat in diff[:10] if stat.size_diff > 0]
+    finally:
+        tracemalloc.stop()
+        app.close()
+    for name, values in report.samples.items():
+        if growing(values, THRESHOLDS[name]):
+            report.leaks.append(name)
+    logger.info("Soak: %d cycles in %.1fs", cycles, time.perf_counter() - started)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.soak", description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--reload-every", type=int, default=100)
+    parser.add_argument("--sample-every", type=int, default=50)
+    args = parser.parse_args(argv)
+    # The app logs every status change at INFO; keep the soak output to its report.
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = run_soak(args.cycles, args.reload_every, args.sample_every)
+    for name, values in report.samples.items():
+        flag = "  <- growing" if name in report.leaks else ""
+        print(f"{name:10} start {values[0]:10.2f}  end {values[-1]:10.2f}  max {max(values):10.2f}{flag}")
+    if report.top_growth:
+        print("Top allocation growth since warm-up:")
+        for line in report.top_growth:
+            print(f"  {line}")
+    sys.exit(1 if report.leaks else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Speculative transcription of the audio so far while the hotkey is still held.
+
+When capture reports a pause, a background worker decodes everything recorded up
+to that point. At release the result is used as-is if no speech followed the
+pause (a hit), stitched with a decode of just the new audio if the prefix is long
+enough to be worth keeping (a reuse), or thrown away (a miss).
+
+``seal`` closes an utterance when capture stops and returns a ticket, so its
+speculative work can still be collected with ``finish`` after the next
+utterance has started.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from threading import Condition, Thread
+from typing import Callable, Dict, Optional, Set
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeculativeResult:
+    covered: int  # frames decoded, including the trailing pause
+    voiced: int  # last voiced frame when the pause was detected
+    text: str
+    elapsed: float
+
+
+class SpeculativeTranscriber:
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], str],
+        sample_rate: int = 16000,
+        min_reuse_secs: float = 1.0,
+        on_result: Optional[Callable[[str], None]] = None,
+    ):
+        self._transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.min_reuse_secs = min_reuse_secs
+        self.on_result = on_result
+        self._cond = Condition()
+        self._generation = 0
+        self._request: Optional[tuple] = None
+        self._inflight: Optional[tuple] = None
+        self._results: Dict[int, SpeculativeResult] = {}
+        self._sealed: Set[int] = set()
+        self._closed = False
+        self.hits = 0
+        self.reuses = 0
+        self.misses = 0
+        self.saved_secs = 0.0
+        self._thread = Thread(target=self._run, name="flow-stt-speculative", daemon=True)
+        self._thread.start()
+
+    def reset(self) -> None:
+        """Start a new utterance, forgetting unsealed results from earlier ones."""
+        with self._cond:
+            self._generation += 1
+            self._request = None
+            self._results = {gen: result for gen, result in self._results.items() if gen in self._sealed}
+
+    def seal(self) -> int:
+        """End the current utterance; pass the ticket to ``finish`` or ``discard``."""
+        with self._cond:
+            ticket = self._generation
+            self._sealed.add(ticket)
+            self._generation += 1
+            self._request = None
+            return ticket
+
+    def discard(self, ticket: int) -> None:
+        with self._cond:
+            self._sealed.discard(ticket)
+            self._results.pop(ticket, None)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def on_pause(self, covered: int, voiced: int, peek: Callable[[int], np.ndarray]) -> None:
+        """Request a decode of the first ``covered`` frames; cheap enough for the audio callback.
+
+        ``peek`` reads from the buffer being recorded right now, so the decode sees
+        this utterance's audio even if the worker only gets to it after release.
+        """
+        with self._cond:
+            self._request = (self._generation, covered, voiced, peek)
+            self._cond.notify_all()
+
+    def finish(self, audio: np.ndarray, last_voiced: int, ticket: Optional[int] = None) -> Optional[str]:
+        """Return the transcript for ``audio`` from speculative work, or None on a miss."""
+        if ticket is None:
+            ticket = self.seal()
+        started = time.perf_counter()
+        with self._cond:
+            # A decode still running for a boundary nothing was said after is worth waiting for.
+            while (
+                self._inflight is not None
+                and self._inflight[0] == ticket
+                and self._inflight[2] >= last_voiced
+            ):
+                self._cond.wait()
+            result = self._results.pop(ticket, None)
+            self._sealed.discard(ticket)
+        text = None
+        if result is not None and result.voiced >= last_voiced:
+            outcome = "hit"
+            self.hits += 1
+            self.saved_secs += max(0.0, result.elapsed - (time.perf_counter() - started))
+            text = result.text
+        elif result is not None and result.covered >= self.min_reuse_secs * self.sample_rate:
+            outcome = "reuse"
+            self.reuses += 1
+            self.saved_secs += result.elapsed
+            tail = self._transcribe(audio[result.covered :])
+            text = " ".join(part for part in (result.text, tail) if part)
+        else:
+            outcome = "miss"
+            self.misses += 1
+        total = self.hits + self.reuses + self.misses
+        logger.info(
+            "Speculative decode: %s (hit rate %.0f%%, reuse rate %.0f%%, ~%.2fs saved so far)",
+            outcome,
+            100.0 * self.hits / total,
+            100.0 * self.reuses / total,
+            self.saved_secs,
+        )
+        return text
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._request is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                request, self._request = self._request, None
+                self._inflight = request
+            generation, covered, voiced, peek = request
+            started = time.perf_counter()
+            try:
+                text = self._transcribe(peek(covered))
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Speculative transcription failed: %s", exc)
+                text = None
+            elapsed = time.perf_counter() - started
+            with self._cond:
+                self._inflight = None
+                if text is not None and (generation == self._generation or generation in self._sealed):
+                    self._results[generation] = SpeculativeResult(covered, voiced, text, elapsed)
+                self._cond.notify_all()
+            if text and generation == self._generation and self.on_result:
+                self.on_result(text)
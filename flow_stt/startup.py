@@ -0,0 +1,85 @@
+"""Startup-time profiler behind ``--profile-startup``.
+
+Times every first-time import (attributed to the outermost import that pulled it
+in) and each named init phase, then logs a report once the app is ready.
+"""
+
+import builtins
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = True, budget_secs: Optional[float] = None):
+        self.enabled = enabled
+        self.budget_secs = budget_secs
+        self.imports: Dict[str, float] = {}
+        self.phases: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+        self._original_import = None
+        self._local = threading.local()
+
+    def install_import_hook(self) -> None:
+        if not self.enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def remove_import_hook(self) -> None:
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def ready(self) -> None:
+        """Mark the app as ready: stop timing imports and log the report."""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._started
+        self.remove_import_hook()
+        logger.info("Startup profile: ready after %.3fs", total)
+        for name, secs in self.phases:
+            logger.info("  phase  %-12s %8.1f ms", name, secs * 1000)
+        for name, secs in sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:15]:
+            logger.info("  import %-28s %8.1f ms", name, secs * 1000)
+        if self.budget_secs is not None and total > self.budget_secs:
+            logger.warning("Startup took %.3fs, over the %.3fs budget.", total, self.budget_secs)
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import or builtins.__import__
+        depth = getattr(self._local, "depth", 0)
+        resolved = name
+        if level:
+            package = (globals or {}).get("__package__")
+            try:
+                resolved = importlib.util.resolve_name("." * level + name, package)
+            except (ImportError, ValueError):
+                resolved = name
+        if depth or resolved in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            self.imports[resolved] = self.imports.get(resolved, 0.0) + time.perf_counter() - started
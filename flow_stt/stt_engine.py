@@ -1,50 +1,331 @@
 import logging
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
-from faster_whisper import WhisperModel
+
+from . import metrics
+from .models import LoadReport, ModelRegistry
+from .resample import resample
+from .scheduling import ThreadPolicy
 
 logger = logging.getLogger(__name__)
 
+# Whisper models are trained on 16 kHz mono audio.
+WHISPER_SAMPLE_RATE = 16000
+
+# faster-whisper's default fallback schedule: each window is re-decoded at the next
+# temperature when the output looks degenerate (too repetitive or too unlikely).
+TEMPERATURE_SCHEDULE = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+AUTO_LANGUAGE = "auto"
+# Whisper's own threshold for "this decode is probably wrong".
+LOW_CONFIDENCE_LOGPROB = -1.0
+
+
+class StickyLanguage:
+    """Remembers the detected language so later utterances skip detection.
+
+    The cached detection confidence decays with every reuse; once it drops below
+    ``min_confidence`` (or a decode in the cached language scores poorly) the next
+    utterance detects again. Thread-safe, as capture and speculative decodes share it.
+    """
+
+    def __init__(self, decay: float = 0.95, min_confidence: float = 0.5):
+        self.decay = decay
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._language: Optional[str] = None
+        self._confidence = 0.0
+
+    def current(self) -> Optional[str]:
+        """Language to force for the next decode, or None to detect."""
+        with self._lock:
+            if self._language is None or self._confidence < self.min_confidence:
+                return None
+            self._confidence *= self.decay
+            return self._language
+
+    def update(self, language: Optional[str], probability: float) -> None:
+        with self._lock:
+            if language and probability >= self.min_confidence:
+                if language != self._language:
+                    logger.info("Detected language: %s (p=%.2f)", language, probability)
+                self._language = language
+                self._confidence = probability
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._confidence = 0.0
+
+
+def prepare_audio(audio: np.ndarray) -> np.ndarray:
+    """Convert captured samples to the mono float32 [-1, 1] layout Whisper expects.
+
+    Capture hands over int16 (possibly memory-mapped) data; this is the single
+    place it is widened to float32, with at most one full-size allocation.
+    """
+    scale = 1.0 / 32768.0 if audio.dtype == np.int16 else None
+    if audio.ndim > 1 and audio.shape[1] > 1:
+        samples = audio.mean(axis=1, dtype=np.float32)
+    else:
+        samples = audio.reshape(-1).astype(np.float32, copy=False)
+    if scale is not None:
+        samples *= scale
+    return samples
+
+
+class _PrecomputedFeatures:
+    """Stands in for faster-whisper's FeatureExtractor on the loaded model.
+
+    ``transcribe`` hands it features computed during capture for the current
+    thread; the model's own extraction is skipped for that one call and runs as
+    usual otherwise. Everything else is delegated to the real extractor.
+    """
+
+    def __init__(self, extractor):
+        self._extractor = extractor
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self._extractor, name)
+
+    def provide(self, features: Optional[np.ndarray]) -> None:
+        self._local.features = features
+
+    def __call__(self, waveform, *args, **kwargs):
+        features = getattr(self._local, "features", None)
+        self._local.features = None
+        if features is not None:
+            return features
+        return self._extractor(waveform, *args, **kwargs)
+
 
 @dataclass
 class TranscriptionResult:
     final_text: str
     partial_text: Optional[str] = None
+    fallbacks: int = 0  # extra decodes at higher temperatures, summed over windows
+    deadline_hit: bool = False  # text holds only the segments finished before the deadline
+    language: Optional[str] = None  # language the text was decoded in
 
 
 class SpeechToTextEngine:
-    def __init__(self, model_size: str = "small", language: str = "en", prefer_gpu: bool = True):
+    def __init__(
+        self,
+        model_size: str = "small",
+        language: str = "en",
+        prefer_gpu: bool = True,
+        max_fallbacks: Optional[int] = None,
+        deadline_secs: Optional[float] = None,
+        cpu_threads: int = 0,
+        policy: Optional[ThreadPolicy] = None,
+        model_cache_dir: Optional[str] = None,
+        registry: Optional[ModelRegistry] = None,
+    ):
         self.model_size = model_size
         self.language = language
         self.prefer_gpu = prefer_gpu
-        self.model = self._load_model()
+        # Both can be changed on a live engine; they apply from the next call.
+        self.max_fallbacks = max_fallbacks
+        self.deadline_secs = deadline_secs
+        # CTranslate2 intra-op threads; 0 lets it pick. Fixed once the model is loaded.
+        self.cpu_threads = cpu_threads
+        # Affinity/priority for every thread that decodes. The model is loaded from
+        # such a thread too, so CTranslate2's pool inherits the same placement.
+        self.policy = policy or ThreadPolicy()
+        # Shared read-only directory of pre-converted weights (see models.py).
+        self.model_cache_dir = model_cache_dir
+        self.registry = registry or ModelRegistry()
+        with LoadReport() as report:
+            self.model = self.policy.run(self._load_model)
+        logger.info("Model %s loaded in %s.", self.model_size, report)
+        metrics.MODEL_LOADS.inc()
+        metrics.MODEL_LOAD_SECONDS.inc(report.seconds)
+        self._features = _PrecomputedFeatures(self.model.feature_extractor)
+        self.model.feature_extractor = self._features
+
+    @property
+    def n_mels(self) -> int:
+        return int(self._features.mel_filters.shape[0])
+
+    @property
+    def language(self) -> str:
+        return self._language
+
+    @language.setter
+    def language(self, value: Optional[str]) -> None:
+        # Language is a per-call decode option, so switching it never needs a model reload.
+        self._language = value or AUTO_LANGUAGE
+        self.sticky_language = StickyLanguage()
+
+    @property
+    def temperatures(self) -> List[float]:
+        if self.max_fallbacks is None:
+            return list(TEMPERATURE_SCHEDULE)
+        return list(TEMPERATURE_SCHEDULE[: max(0, self.max_fallbacks) + 1])
 
     def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        # A verified local directory, so loading never goes through the Hugging Face hub.
+        model = str(self.registry.resolve(self.model_size, self.model_cache_dir))
         if self.prefer_gpu:
             try:
                 logger.info("Loading Whisper model on GPU (cuda)...")
-                return WhisperModel(self.model_size, device="cuda", compute_type="float16")
+                return WhisperModel(
+                    model, device="cuda", compute_type="float16", cpu_threads=self.cpu_threads
+                )
             except Exception as exc:  # noqa: BLE001
                 logger.warning("GPU init failed, falling back to CPU: %s", exc)
-        logger.info("Loading Whisper model on CPU.")
-        return WhisperModel(self.model_size, device="cpu", compute_type="int8")
+        logger.info("Loading Whisper model on CPU (%s threads).", self.cpu_threads or "auto")
+        return WhisperModel(model, device="cpu", compute_type="int8", cpu_threads=self.cpu_threads)
 
-    def transcribe(self, audio: np.ndarray, sample_rate: int = 16000) -> TranscriptionResult:
+    def transcribe(
+        self, audio: np.ndarray, sample_rate: int = 16000, features: Optional[np.ndarray] = None
+    ) -> TranscriptionResult:
         """Run a blocking transcription on the provided audio data.
 
+        ``features`` may carry log-mel frames already computed during capture
+        (see ``features.FeatureStream``); they are used only if their shape matches
+        what the model would have produced for ``audio``.
+
+        Each window is decoded at most ``max_fallbacks + 1`` times. With
+        ``deadline_secs`` set, segments are collected on a worker thread and
+        whatever finished by the deadline is returned with ``deadline_hit`` set;
+        the worker stops after the window it is decoding.
+
+        With ``language`` set to ``"auto"`` the language is detected once and then
+        passed explicitly (see ``StickyLanguage``); a decode that scores below
+        ``LOW_CONFIDENCE_LOGPROB`` in the cached language is redone with detection.
+
         TODO: Add streaming partial results so UI can display live text.
         """
-        if audio.ndim > 1:
-            audio = np.mean(audio, axis=1)
+        if sample_rate <= 0:
+            raise ValueError(f"sample_rate must be positive, got {sample_rate}")
         # faster-whisper expects float32 values in range [-1, 1]
-        audio = audio.astype(np.float32)
-        segments, _info = self.model.transcribe(
-            audio,
-            language=self.language,
-            beam_size=1,
-            vad_filter=False,
+        audio = prepare_audio(audio)
+        if sample_rate != WHISPER_SAMPLE_RATE:
+            logger.debug("Resampling %d Hz input to %d Hz.", sample_rate, WHISPER_SAMPLE_RATE)
+            audio = resample(audio, sample_rate, WHISPER_SAMPLE_RATE)
+            features = None
+        if features is not None:
+            expected = (self.n_mels, (audio.shape[0] + self._features.n_samples) // self._features.hop_length)
+            if features.shape != expected:
+                logger.debug("Ignoring precomputed features %s; expected %s.", features.shape, expected)
+                features = None
+        self.policy.apply()
+        started = time.perf_counter()
+        deadline = started + self.deadline_secs if self.deadline_secs else None
+        temperatures = self.temperatures
+        auto = self.language == AUTO_LANGUAGE
+        language = self.sticky_language.current() if auto else self.language
+        cached = auto and language is not None
+        collected, language, deadline_hit = self._decode(audio, language, temperatures, deadline, features)
+        if cached and not deadline_hit and self._confidence(collected) < LOW_CONFIDENCE_LOGPROB:
+            # Possibly a switch to another language: detect on this same utterance.
+            logger.debug("Low-confidence decode in %s; re-detecting language.", language)
+            self.sticky_language.invalidate()
+            retry, retry_language, retry_hit = self._decode(audio, None, temperatures, deadline, None)
+            if not retry_hit and self._confidence(retry) > self._confidence(collected):
+                collected, language = retry, retry_language
+        elapsed = time.perf_counter() - started
+        duration = audio.shape[0] / WHISPER_SAMPLE_RATE
+        metrics.AUDIO_DECODED.inc(duration)
+        metrics.INFERENCE.inc(elapsed)
+        if duration > 0:
+            metrics.INFERENCE_RTF.observe(elapsed / duration)
+        fallbacks = self._count_fallbacks(collected, temperatures)
+        text = "".join(segment.text for segment in collected).strip()
+        if deadline_hit:
+            logger.warning(
+                "Decode deadline of %.1fs hit; returning %d finished segment(s).",
+                self.deadline_secs,
+                len(collected),
+            )
+        if fallbacks:
+            logger.info("Decode needed %d temperature fallback(s).", fallbacks)
+        return TranscriptionResult(
+            final_text=text, fallbacks=fallbacks, deadline_hit=deadline_hit, language=language
         )
-        text = "".join(segment.text for segment in segments).strip()
-        return TranscriptionResult(final_text=text)
+
+    def _decode(self, audio, language, temperatures, deadline, features):
+        """One pass over ``audio``; a ``None`` language asks the model to detect it."""
+        self._features.provide(features)
+        try:
+            segments, info = self.model.transcribe(
+                audio,
+                language=language,
+                beam_size=1,
+                vad_filter=False,
+                temperature=temperatures,
+            )
+        finally:
+            self._features.provide(None)
+        if language is None:
+            language = info.language
+            self.sticky_language.update(info.language, info.language_probability)
+        if deadline is not None:
+            collected, deadline_hit = self._collect_until(segments, deadline)
+        else:
+            collected, deadline_hit = list(segments), False
+        return collected, language, deadline_hit
+
+    @staticmethod
+    def _confidence(segments) -> float:
+        scores = [getattr(segment, "avg_logprob", 0.0) for segment in segments]
+        return sum(scores) / len(scores) if scores else 0.0
+
+    def _collect_until(self, segments, deadline: float):
+        """Drain the lazy segment generator on a worker until ``deadline``."""
+        collected = []
+        cond = threading.Condition()
+        state = {"done": False, "cancelled": False}
+
+        policy = self.policy
+
+        def drain():
+            policy.apply()
+            try:
+                for segment in segments:
+                    with cond:
+                        if state["cancelled"]:
+                            break
+                        collected.append(segment)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Decoding stopped early: %s", exc)
+            finally:
+                with cond:
+                    state["done"] = True
+                    cond.notify_all()
+
+        threading.Thread(target=drain, name="flow-stt-decode", daemon=True).start()
+        with cond:
+            while not state["done"]:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    state["cancelled"] = True
+                    return list(collected), True
+                cond.wait(remaining)
+            return list(collected), False
+
+    @classmethod
+    def _count_fallbacks(cls, segments, temperatures: List[float]) -> int:
+        # Fallback happens per 30 s window, and every segment of a window carries
+        # the window's temperature; count each window (``seek``) once.
+        windows = {}
+        for segment in segments:
+            windows[getattr(segment, "seek", id(segment))] = cls._fallback_index(segment, temperatures)
+        return sum(windows.values())
+
+    @staticmethod
+    def _fallback_index(segment, temperatures: List[float]) -> int:
+        temperature = getattr(segment, "temperature", None)
+        if temperature is None:
+            return 0
+        for index, value in enumerate(temperatures):
+            if abs(value - temperature) < 1e-6:
+                return index
+        return 0
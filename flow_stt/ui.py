@@ -1,13 +1,16 @@
+import math
+import time
 import tkinter as tk
-from queue import Queue
+from queue import Empty, Queue
 from threading import Thread
 from tkinter import ttk
-from typing import Callable, Optional, Sequence
+from typing import Callable, Optional, Sequence, Tuple
 import ctypes
 
 # --- USER IMPORTS ---
 from .audio_capture import list_input_devices
 from .config import ConfigManager
+from .history import HistoryEntry, TranscriptHistory
 
 # Enable High DPI on Windows
 try:
@@ -30,8 +33,13 @@ PALETTE = {
     "badge_idle": "#334155",
     "badge_listen": "#0ea5e9",
     "badge_transcribe": "#8b5cf6",
+    "meter_bg": "#0f172a",
+    "meter_hot": "#f59e0b",
 }
 
+# Level meter range in dBFS; anything quieter than the floor draws an empty bar.
+METER_FLOOR_DB = -60.0
+
 
 def minimize_window(win: tk.Tk):
     """Safely minimize an overrideredirect window."""
@@ -66,6 +74,23 @@ def minimize_window(win: tk.Tk):
             pass
 
 
+def foreground_window() -> Optional[int]:
+    """Handle of the window that has keyboard focus (Windows), so a popup can hand it back."""
+    try:
+        return ctypes.windll.user32.GetForegroundWindow() or None
+    except Exception:
+        return None
+
+
+def activate_window(handle: Optional[int]) -> None:
+    if not handle:
+        return
+    try:
+        ctypes.windll.user32.SetForegroundWindow(handle)
+    except Exception:
+        pass
+
+
 def apply_rounded_corners(window_handle, width, height, radius=20):
     """Uses Windows API to clip the window into a rounded rectangle."""
     try:
@@ -230,18 +255,46 @@ def _apply_theme(root: tk.Misc):
 
 
 class StatusUI:
-    def __init__(self, title: str = "Open STT", on_settings_saved: Optional[Callable[[], None]] = None):
+    def __init__(
+        self,
+        title: str = "Open STT",
+        on_settings_saved: Optional[Callable[[], None]] = None,
+        on_close: Optional[Callable[[], None]] = None,
+        level_source: Optional[Callable[[], Tuple[float, float]]] = None,
+        history_source: Optional[Callable[[], Optional[TranscriptHistory]]] = None,
+        on_reinsert: Optional[Callable[[str], None]] = None,
+    ):
         self.title = title
         self._thread: Optional[Thread] = None
         self._root: Optional[tk.Tk] = None
         self._status_label: Optional[tk.Label] = None
         self._status_queue: "Queue[str]" = Queue()
         self._on_settings_saved = on_settings_saved
+        self._on_close = on_close
         self._drag_start = (0, 0)
         self._canvas: Optional[tk.Canvas] = None
         self._dots: list[int] = []
         self._dot_step = 0
         self._current_status = "Idle"
+        self._animation_id: Optional[str] = None
+        self._level_source = level_source
+        self._meter: Optional[tk.Canvas] = None
+        self._meter_bar: Optional[int] = None
+        self._meter_peak: Optional[int] = None
+        self._meter_level = 0.0
+        self._meter_hold = 0.0
+        self._partial_label: Optional[tk.Label] = None
+        # Latest partial transcript; written from any thread, read on the Tk thread.
+        self._partial_text = ""
+        self._history_source = history_source
+        self._on_reinsert = on_reinsert
+        # Set from the hotkey thread; the Tk thread opens the window on its next wake-up.
+        self._history_target: Optional[int] = None
+        self._history_requested = False
+        self._history_window: Optional["HistoryWindow"] = None
+        self._event_ready = False
+        # Timer and event callbacks run on the Tk thread; exposed for idle-wakeup reporting.
+        self.wakeups = 0
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
@@ -252,12 +305,32 @@ class StatusUI:
     def set_status(self, text: str) -> None:
         if self._status_queue is not None:
             self._status_queue.put(text)
+        self._wake()
+
+    def set_partial_text(self, text: str) -> None:
+        """Show live text under the status; pass an empty string to clear it."""
+        self._partial_text = text
+        self._wake()
+
+    def open_history(self) -> None:
+        """Open history search over whatever window is focused now; safe from any thread."""
+        self._history_target = foreground_window()
+        self._history_requested = True
+        self._wake()
+
+    def _wake(self) -> None:
+        # Wake the Tk thread only when something changed instead of polling.
+        if self._event_ready and self._root is not None:
+            try:
+                self._root.event_generate("<<StatusChanged>>", when="tail")
+            except (RuntimeError, tk.TclError):
+                pass
 
     def _run(self) -> None:
         self._root = tk.Tk()
         self._root.title(self.title)
         # Compact size
-        w, h = 180, 100
+        w, h = 200, 132
         self._root.geometry(f"{w}x{h}")
         self._root.configure(bg=PALETTE["bg"])
         self._root.overrideredirect(True)
@@ -274,7 +347,7 @@ class StatusUI:
         self._root.update_idletasks()
         apply_rounded_corners(self._root.winfo_id(), w, h, radius=18)
 
-        CompactTitleBar(self._root, self._root.quit, self._open_settings, lambda: minimize_window(self._root))
+        CompactTitleBar(self._root, self._close, self._open_settings, lambda: minimize_window(self._root))
 
         content = tk.Frame(self._root, bg=PALETTE["bg"])
         content.pack(fill="both", expand=True, padx=8, pady=4)
@@ -308,26 +381,69 @@ class StatusUI:
         )
         self._state_label.pack(pady=(2, 0))
 
-        self._poll_status()
-        self._animate_dots()
-        self._root.mainloop()
+        self._meter = tk.Canvas(center, width=canvas_width, height=4, bg=PALETTE["meter_bg"], bd=0, highlightthickness=0)
+        self._meter.pack(pady=(4, 0))
+        self._meter_bar = self._meter.create_rectangle(0, 0, 0, 4, fill=PALETTE["badge_listen"], outline="")
+        self._meter_peak = self._meter.create_line(0, 0, 0, 4, fill=PALETTE["text"])
 
-    def _poll_status(self):
-        if self._root is None:
-            return
-        while not self._status_queue.empty():
-            status = self._status_queue.get()
+        self._partial_label = tk.Label(
+            center,
+            text="",
+            font=("Segoe UI", 8),
+            bg=PALETTE["bg"],
+            fg=PALETTE["muted"],
+            wraplength=w - 24,
+            justify="center",
+        )
+        self._partial_label.pack(pady=(2, 0))
+
+        self._root.bind("<<StatusChanged>>", self._drain_status)
+        self._event_ready = True
+        self._drain_status()
+        self._root.mainloop()
+        self._event_ready = False
+        self._root = None
+
+    def _close(self):
+        if self._root is not None:
+            self._root.quit()
+        if self._on_close:
+            self._on_close()
+
+    def _drain_status(self, event=None):
+        self.wakeups += 1
+        while True:
+            try:
+                status = self._status_queue.get_nowait()
+            except Empty:
+                break
             self._update_status(status)
-        self._root.after(150, self._poll_status)
+        partial = _tail_text(self._partial_text)
+        if self._partial_label is not None and self._partial_label.cget("text") != partial:
+            self._partial_label.config(text=partial)
+        if self._history_requested:
+            self._history_requested = False
+            self._open_history()
 
     def _update_status(self, status: str) -> None:
         self._current_status = status
         colors = self._badge_colors(status)
         if self._dots and self._canvas:
             for dot in self._dots:
-                self._canvas.itemconfig(dot, fill=colors["bg"])
+                fill = _mix_hex(colors["bg"], PALETTE["bg"], 0.5) if status == "Idle" else colors["bg"]
+                self._canvas.itemconfig(dot, fill=fill)
         if hasattr(self, "_state_label") and self._state_label is not None:
             self._state_label.config(text=self._status_text(status), fg=colors["fg"])
+        if "listen" not in status.lower():
+            self._meter_level = self._meter_hold = 0.0
+            self._draw_meter(0.0, 0.0)
+        # Animate only while busy; Idle leaves no timers scheduled at all.
+        if status == "Idle":
+            if self._animation_id is not None and self._root is not None:
+                self._root.after_cancel(self._animation_id)
+            self._animation_id = None
+        elif self._animation_id is None:
+            self._animate_dots()
 
     def _badge_colors(self, status: str):
         lowered = status.lower()
@@ -346,26 +462,174 @@ class StatusUI:
         return "Open STT"
 
     def _animate_dots(self):
+        self._animation_id = None
         if not self._dots or self._canvas is None or self._root is None:
             return
+        if self._current_status == "Idle":
+            return
+        self.wakeups += 1
         colors = self._badge_colors(self._current_status)
         base_color = colors["bg"]
         for idx, dot in enumerate(self._dots):
             phase = (self._dot_step + idx * 4) % 30
             intensity = 0.4 + 0.6 * (1 - abs(15 - phase) / 15)
-            if self._current_status == "Idle":
-                fill = _mix_hex(base_color, PALETTE["bg"], 0.5)
-            else:
-                fill = _mix_hex(base_color, PALETTE["text"], intensity * 0.5)
-            self._canvas.itemconfig(dot, fill=fill)
+            self._canvas.itemconfig(dot, fill=_mix_hex(base_color, PALETTE["text"], intensity * 0.5))
         self._dot_step = (self._dot_step + 1) % 30
-        self._root.after(50, self._animate_dots)
+        if self._level_source is not None and "listen" in self._current_status.lower():
+            # Sample the capture's latest levels once per frame, however fast blocks arrive.
+            rms, peak = self._level_source()
+            self._draw_meter(rms, peak)
+        self._animation_id = self._root.after(50, self._animate_dots)
+
+    def _draw_meter(self, rms: float, peak: float) -> None:
+        if self._meter is None:
+            return
+        # Fast attack, slow release so the bar is readable at 20 fps.
+        level = _level_fraction(rms)
+        self._meter_level = level if level > self._meter_level else self._meter_level * 0.8 + level * 0.2
+        self._meter_hold = max(_level_fraction(peak), self._meter_hold - 0.02)
+        width = int(self._meter.cget("width"))
+        hot = peak >= 0.99
+        self._meter.coords(self._meter_bar, 0, 0, width * self._meter_level, 4)
+        self._meter.itemconfig(self._meter_bar, fill=PALETTE["meter_hot"] if hot else PALETTE["badge_listen"])
+        hold_x = width * self._meter_hold
+        self._meter.coords(self._meter_peak, hold_x, 0, hold_x, 4)
 
     def _open_settings(self):
         if self._root is None:
             return
         SettingsWindow(self._root, on_saved=self._on_settings_saved).open()
 
+    def _open_history(self):
+        history = self._history_source() if self._history_source else None
+        if self._root is None or history is None:
+            return
+        if self._history_window is None or not self._history_window.is_open():
+            self._history_window = HistoryWindow(self._root, history, self._reinsert)
+        self._history_window.open(self._history_target)
+
+    def _reinsert(self, text: str) -> None:
+        if self._on_reinsert:
+            self._on_reinsert(text)
+
+
+class HistoryWindow:
+    """Type to search past dictations; Enter or double-click re-inserts the selected one."""
+
+    SEARCH_DELAY_MS = 60
+
+    def __init__(self, root: tk.Tk, history: TranscriptHistory, on_pick: Callable[[str], None]):
+        self.root = root
+        self.history = history
+        self.on_pick = on_pick
+        self.window: Optional[tk.Toplevel] = None
+        self._query: Optional[tk.StringVar] = None
+        self._list: Optional[tk.Listbox] = None
+        self._entries: list[HistoryEntry] = []
+        self._search_id: Optional[str] = None
+        self._target: Optional[int] = None
+
+    def is_open(self) -> bool:
+        return self.window is not None
+
+    def open(self, target: Optional[int] = None):
+        self._target = target
+        if self.window:
+            self.window.lift()
+            self.window.focus_force()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("History")
+        w, h = 460, 360
+        self.window.geometry(f"{w}x{h}")
+        self.window.configure(bg=PALETTE["bg"])
+        self.window.overrideredirect(True)
+        self.window.wm_attributes("-topmost", True)
+        self.window.config(
+            bd=0,
+            relief="flat",
+            highlightthickness=1,
+            highlightbackground=PALETTE["border"],
+            highlightcolor=PALETTE["border"]
+        )
+        _apply_theme(self.window)
+        self.window.update_idletasks()
+        apply_rounded_corners(self.window.winfo_id(), w, h, radius=20)
+
+        TitleBar(self.window, "History", self.close)
+
+        container = tk.Frame(self.window, bg=PALETTE["bg"])
+        container.pack(fill="both", expand=True, padx=14, pady=10)
+
+        self._query = tk.StringVar()
+        wrapper = tk.Frame(container, bg=PALETTE["card"], pady=1, padx=1)
+        wrapper.pack(fill="x", pady=(0, 8))
+        entry = tk.Entry(wrapper, textvariable=self._query, font=("Segoe UI", 10),
+                         bg=PALETTE["card"], fg=PALETTE["text"],
+                         insertbackground=PALETTE["text"],
+                         bd=0, highlightthickness=4, highlightbackground=PALETTE["card"], highlightcolor=PALETTE["card"])
+        entry.pack(fill="x", ipady=2)
+
+        self._list = tk.Listbox(container, font=("Segoe UI", 9), activestyle="none",
+                                bg=PALETTE["card"], fg=PALETTE["text"],
+                                selectbackground=PALETTE["accent"], selectforeground=PALETTE["header"],
+                                bd=0, highlightthickness=0)
+        self._list.pack(fill="both", expand=True)
+
+        self._query.trace_add("write", lambda *_: self._schedule_search())
+        entry.bind("<Return>", lambda e: self._pick())
+        entry.bind("<Escape>", lambda e: self.close())
+        entry.bind("<Down>", lambda e: self._move(1))
+        entry.bind("<Up>", lambda e: self._move(-1))
+        self._list.bind("<Double-Button-1>", lambda e: self._pick())
+        self.window.focus_force()
+        entry.focus_set()
+        self._search()
+
+    def close(self):
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+
+    def _schedule_search(self):
+        # Coalesce keystrokes; each query is a few milliseconds against the FTS index.
+        if self._search_id is not None:
+            self.root.after_cancel(self._search_id)
+        self._search_id = self.root.after(self.SEARCH_DELAY_MS, self._search)
+
+    def _search(self):
+        self._search_id = None
+        if self._list is None or self._query is None:
+            return
+        self._entries = self.history.search(self._query.get())
+        self._list.delete(0, "end")
+        today = time.strftime("%Y-%m-%d")
+        for entry in self._entries:
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created))
+            stamp = stamp[11:] if stamp.startswith(today) else stamp
+            self._list.insert("end", f"{stamp}  {' '.join(entry.text.split())[:120]}")
+        if self._entries:
+            self._list.selection_set(0)
+
+    def _move(self, step: int):
+        if self._list is None or not self._entries:
+            return
+        selected = self._list.curselection()
+        index = min(max((selected[0] if selected else -1) + step, 0), len(self._entries) - 1)
+        self._list.selection_clear(0, "end")
+        self._list.selection_set(index)
+        self._list.see(index)
+
+    def _pick(self):
+        selected = self._list.curselection() if self._list is not None else ()
+        if not selected:
+            return
+        text = self._entries[selected[0]].text
+        self.close()
+        # Hand focus back to where the hotkey was pressed before typing into it.
+        activate_window(self._target)
+        self.on_pick(text)
+
 
 class SettingsWindow:
     def __init__(self, root: tk.Tk, on_saved: Optional[Callable[[], None]] = None):
@@ -483,6 +747,18 @@ class SettingsWindow:
         self.window.destroy()
 
 
+def _level_fraction(amplitude: float) -> float:
+    if amplitude <= 0.0:
+        return 0.0
+    db = 20.0 * math.log10(amplitude)
+    return min(1.0, max(0.0, (db - METER_FLOOR_DB) / -METER_FLOOR_DB))
+
+
+def _tail_text(text: str, limit: int = 90) -> str:
+    """Keep the end of long partial transcripts, which is the part being spoken."""
+    return text if len(text) <= limit else "…" + text[-limit:]
+
+
 def _mix_hex(base: str, target: str, t: float) -> str:
     def hex_to_rgb(h):
         h = h.lstrip("#")
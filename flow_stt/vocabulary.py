@@ -0,0 +1,290 @@
+"""Fuzzy correction of transcripts against a user vocabulary (SymSpell-style).
+
+Every vocabulary term is indexed under the hashes of its lowercase spelling and
+of all spellings with one or two characters deleted. A transcribed word is looked
+up by hashing its own deletes; any shared hash is a candidate within two edits,
+and the candidates are then checked with a real edit distance. Lookups are one
+vectorized ``searchsorted`` over sorted uint64 hashes, so the cost doesn't depend
+on how large the vocabulary is.
+
+Ordinary words are left alone. A word from the bundled common-word list (or an
+inflection of one) is never rewritten, and a term only replaces a word it is
+strictly closer to than any common word. A word that already matches a term
+apart from case keeps its casing unless ``fix_case`` is set.
+
+The index is built once per vocabulary file and saved next to it as ``.npy``
+arrays, which later runs memory-map instead of rebuilding.
+
+    python -m flow_stt.vocabulary build vocabulary.txt
+    python -m flow_stt.vocabulary correct "deploy to cubernetes with flowstt"
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import AbstractSet, Callable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+MIN_WORD_LENGTH = 4  # shorter words are too ambiguous to correct
+WORD_PATTERN = re.compile(r"[\w'-]+")
+COMMON_WORDS_FILE = Path(__file__).with_name("common_words.txt")
+# Suffixes stripped (with the replacement tried for the stem) when checking for a known word.
+INFLECTIONS = (("'s", ""), ("ies", "y"), ("ing", ""), ("ing", "e"), ("ed", ""), ("ed", "e"), ("es", ""), ("s", ""), ("ly", ""))
+
+
+def max_distance(length: int) -> int:
+    """Edits allowed for a word of ``length`` characters."""
+    if length < MIN_WORD_LENGTH:
+        return 0
+    return 1 if length < 8 else 2
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {variant[:i] + variant[i + 1 :] for variant in frontier for i in range(len(variant))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance, or ``limit + 1`` once it is certainly larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def read_terms(path: Path) -> List[str]:
+    """One term per line; blank lines and ``#`` comments are skipped, words are split out."""
+    terms: List[str] = []
+    seen: Set[str] = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0]
+        for word in WORD_PATTERN.findall(line):
+            if word.lower() not in seen:
+                seen.add(word.lower())
+                terms.append(word)
+    return terms
+
+
+@lru_cache(maxsize=1)
+def common_words() -> AbstractSet[str]:
+    try:
+        return frozenset(word.lower() for word in read_terms(COMMON_WORDS_FILE))
+    except OSError as exc:
+        logger.warning("Could not read %s: %s", COMMON_WORDS_FILE, exc)
+        return frozenset()
+
+
+@lru_cache(maxsize=1)
+def common_index() -> "VocabularyIndex":
+    """A delete index over the common words, to tell how close the nearest ordinary word is."""
+    return VocabularyIndex.build(sorted(common_words()), known_words=frozenset())
+
+
+class VocabularyIndex:
+    def __init__(
+        self,
+        terms: Sequence[str],
+        keys: np.ndarray,
+        term_ids: np.ndarray,
+        known_words: Optional[AbstractSet[str]] = None,
+    ):
+        self.terms = list(terms)
+        self._lower = [term.lower() for term in self.terms]
+        self._keys = keys
+        self._term_ids = term_ids
+        # Words that are never corrected; defaults to the bundled common-word list.
+        self.known_words = common_words() if known_words is None else known_words
+        # Rewrite "kubernetes" to "Kubernetes" too, not only misspellings.
+        self.fix_case = False
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def build(cls, terms: Iterable[str], known_words: Optional[AbstractSet[str]] = None) -> "VocabularyIndex":
+        terms = list(terms)
+        keys: List[int] = []
+        ids: List[int] = []
+        for idx, term in enumerate(terms):
+            lower = term.lower()
+            # Store deletes to the largest distance any matching input could be allowed.
+            for variant in _deletes(lower, max_distance(len(lower) + 2)):
+                keys.append(_hash(variant))
+                ids.append(idx)
+        key_array = np.asarray(keys, dtype=np.uint64)
+        id_array = np.asarray(ids, dtype=np.uint32)
+        order = np.argsort(key_array, kind="stable")
+        return cls(terms, key_array[order], id_array[order], known_words)
+
+    def save(self, directory: Path, source_stamp: dict) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "keys.npy", self._keys)
+        np.save(directory / "term_ids.npy", self._term_ids)
+        (directory / "terms.txt").write_text("\n".join(self.terms), encoding="utf-8")
+        manifest = {"version": INDEX_VERSION, "source": source_stamp, "terms": len(self.terms)}
+        (directory / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path) -> "VocabularyIndex":
+        terms = (directory / "terms.txt").read_text(encoding="utf-8").split("\n")
+        keys = np.load(directory / "keys.npy", mmap_mode="r")
+        term_ids = np.load(directory / "term_ids.npy", mmap_mode="r")
+        return cls(terms, keys, term_ids)
+
+    def lookup(self, word: str) -> Optional[str]:
+        """The closest vocabulary term within the allowed edits, or None."""
+        idx, _distance = self.nearest(word.lower())
+        return None if idx is None else self.terms[idx]
+
+    def nearest(self, lower: str, limit: Optional[int] = None) -> Tuple[Optional[int], int]:
+        """Index and distance of the closest term within ``limit`` edits (default: by length)."""
+        limit = max_distance(len(lower)) if limit is None else min(limit, max_distance(len(lower)))
+        if not limit or not len(self._keys):
+            return None, limit + 1
+        probes = np.fromiter((_hash(variant) for variant in _deletes(lower, limit)), dtype=np.uint64)
+        left = np.searchsorted(self._keys, probes, side="left")
+        right = np.searchsorted(self._keys, probes, side="right")
+        candidates = {int(idx) for lo, hi in zip(left, right) if hi > lo for idx in self._term_ids[lo:hi]}
+        best: Optional[int] = None
+        best_distance = limit + 1
+        for idx in sorted(candidates):
+            distance = edit_distance(lower, self._lower[idx], limit)
+            if distance < best_distance:
+                best, best_distance = idx, distance
+                if distance == 0:
+                    break
+        return best, best_distance
+
+    def is_known(self, lower: str) -> bool:
+        known = self.known_words
+        if lower in known:
+            return True
+        for suffix, replacement in INFLECTIONS:
+            if lower.endswith(suffix) and lower[: -len(suffix)] + replacement in known:
+                return True
+        return False
+
+    def correction(self, word: str) -> Optional[str]:
+        """The term to write instead of ``word``, or None to leave it as it is."""
+        lower = word.lower()
+        if self.is_known(lower):
+            return None
+        idx, distance = self.nearest(lower)
+        if idx is None:
+            return None
+        if distance == 0:
+            return self.terms[idx] if self.fix_case else None
+        # A common word at the same distance or closer is the likelier intent.
+        if self.known_words and common_index().nearest(lower, distance)[0] is not None:
+            return None
+        return self.terms[idx]
+
+    def correct(self, text: str) -> str:
+        def replace(match: "re.Match[str]") -> str:
+            word = match.group(0)
+            term = self.correction(word)
+            return term if term is not None else word
+
+        return WORD_PATTERN.sub(replace, text)
+
+
+def _stamp(path: Path) -> dict:
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def default_index_dir(source: Path) -> Path:
+    return source.with_name(source.stem + ".index")
+
+
+def load_or_build(source: Path, index_dir: Optional[Path] = None) -> VocabularyIndex:
+    """Memory-map the saved index for ``source``, rebuilding it first if the file changed."""
+    index_dir = index_dir or default_index_dir(source)
+    stamp = _stamp(source)
+    try:
+        manifest = json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("version") == INDEX_VERSION and manifest.get("source") == stamp:
+            return VocabularyIndex.load(index_dir)
+    except (OSError, ValueError):
+        pass
+    started = time.perf_counter()
+    index = VocabularyIndex.build(read_terms(source))
+    index.save(index_dir, stamp)
+    logger.info("Built vocabulary index for %d terms in %.2fs.", len(index), time.perf_counter() - started)
+    return index
+
+
+def load_in_background(source: Path, on_ready: Callable[[VocabularyIndex], None]) -> threading.Thread:
+    """Load (or build) the index off the startup path and hand it to ``on_ready``."""
+
+    def run():
+        try:
+            index = load_or_build(source)
+            common_index()  # built here so the first correction doesn't pay for it
+            on_ready(index)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not load vocabulary %s: %s", source, exc)
+
+    thread = threading.Thread(target=run, name="flow-stt-vocabulary", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .config import ConfigManager, default_vocabulary_path
+
+    parser = argparse.ArgumentParser(prog="python -m flow_stt.vocabulary", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="(Re)build the index for a vocabulary file.")
+    build_parser.add_argument("file", type=Path, nargs="?")
+    correct_parser = sub.add_parser("correct", help="Correct a sample text and report per-word timing.")
+    correct_parser.add_argument("text")
+    correct_parser.add_argument("--file", type=Path)
+    args = parser.parse_args(argv)
+
+    cfg = ConfigManager().config
+    source = args.file or (Path(cfg.vocabulary_file) if cfg.vocabulary_file else default_vocabulary_path())
+    started = time.perf_counter()
+    index = load_or_build(source)
+    print(f"{len(index)} terms ready in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.command == "correct":
+        words = WORD_PATTERN.findall(args.text)
+        started = time.perf_counter()
+        corrected = index.correct(args.text)
+        elapsed = time.perf_counter() - started
+        print(corrected)
+        print(f"{elapsed / max(len(words), 1) * 1e6:.1f} us/word")
+
+
+if __name__ == "__main__":
+    main()
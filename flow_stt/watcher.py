@@ -0,0 +1,184 @@
+"""Watch the config file and report settled changes.
+
+On Linux the file's directory is watched with inotify (through ctypes). Watching
+the directory rather than the file means editors and tools that save by writing
+a temp file and renaming it over the original are still seen. Elsewhere, or if
+inotify can't be set up, the file's size, mtime and inode are polled instead.
+Bursts of events are debounced, and ``on_change`` only runs when the file's
+stamp actually differs from the last one reported.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import platform
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+
+Stamp = Optional[Tuple[int, int, int]]
+
+
+class Inotify:
+    """Minimal inotify binding: one directory watch, reporting the names that changed."""
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read(self) -> List[str]:
+        names: List[str] = []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ConfigWatcher:
+    def __init__(
+        self,
+        path: Path,
+        on_change: Callable[[], None],
+        debounce_secs: float = 0.3,
+        poll_secs: float = 2.0,
+    ):
+        self.path = Path(path)
+        self.on_change = on_change
+        self.debounce_secs = debounce_secs
+        self.poll_secs = poll_secs
+        self.backend = "none"
+        self.wakeups = 0
+        self._stop = threading.Event()
+        self._poke = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp: Stamp = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._stamp = self._read_stamp()
+        self._thread = threading.Thread(target=self._run, name="flow-stt-config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.check_now()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def check_now(self) -> None:
+        """Look at the file without waiting for the next event or poll, e.g. after an in-app save."""
+        self._poke.set()
+        wake = self._wake_w
+        if wake is not None:
+            try:
+                os.write(wake, b"x")
+            except OSError:
+                pass
+
+    def _read_stamp(self) -> Stamp:
+        try:
+            info = self.path.stat()
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+    def _run(self) -> None:
+        inotify: Optional[Inotify] = None
+        if platform.system().lower() == "linux":
+            try:
+                # Self-pipe so stop() and check_now() can interrupt select() without a timeout.
+                self._wake_r, self._wake_w = os.pipe()
+                os.set_blocking(self._wake_w, False)
+                inotify = Inotify(self.path.parent)
+            except (OSError, AttributeError) as exc:
+                logger.info("inotify unavailable (%s); polling %s instead.", exc, self.path.name)
+                self._close_pipe()
+        self.backend = "inotify" if inotify else "poll"
+        try:
+            while not self._stop.is_set():
+                self._wait(inotify, None)
+                if self._stop.is_set() or self._read_stamp() == self._stamp:
+                    continue
+                # Let a burst of writes (or a write-then-rename save) finish first.
+                while self._wait(inotify, self.debounce_secs) and not self._stop.is_set():
+                    pass
+                self._report_if_changed()
+        finally:
+            if inotify is not None:
+                inotify.close()
+            self._close_pipe()
+
+    def _close_pipe(self) -> None:
+        fds = (self._wake_r, self._wake_w)
+        self._wake_r = self._wake_w = None
+        for fd in fds:
+            if fd is not None:
+                os.close(fd)
+
+    def _wait(self, inotify: Optional[Inotify], timeout: Optional[float]) -> bool:
+        """Block until the file may have changed; False if ``timeout`` or a poll interval passed quietly."""
+        self.wakeups += 1
+        if inotify is None:
+            poked = self._poke.wait(self.poll_secs if timeout is None else timeout)
+            self._poke.clear()
+            return poked
+        readable, _, _ = select.select([inotify, self._wake_r], [], [], timeout)
+        seen = False
+        if inotify in readable:
+            seen = self.path.name in inotify.read()
+        if self._wake_r in readable:
+            os.read(self._wake_r, 64)
+            self._poke.clear()
+            seen = True
+        return seen
+
+    def _report_if_changed(self) -> None:
+        stamp = self._read_stamp()
+        if stamp is None or stamp == self._stamp:
+            return
+        self._stamp = stamp
+        try:
+            self.on_change()
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Config change handler failed: %s", exc)
@@ -3,16 +3,28 @@ import time
 from typing import Callable, List
 
 import keyboard
-import pyperclip
+
+from . import metrics
 
 
 logger = logging.getLogger(__name__)
 
 
 class WindowsIntegration:
-    def __init__(self, output_mode: str = "type", auto_paste_clipboard: bool = False):
+    def __init__(
+        self,
+        output_mode: str = "type",
+        auto_paste_clipboard: bool = False,
+        restore_clipboard: bool = False,
+        controller=None,
+        chunk_delay: float = 0.02,
+    ):
         self.output_mode = output_mode
         self.auto_paste_clipboard = auto_paste_clipboard
+        self.restore_clipboard = restore_clipboard
+        # Anything with keyboard's write()/send(); benchmarks pass a recorder.
+        self._keyboard = controller or keyboard
+        self.chunk_delay = chunk_delay
         self._hotkeys: List[Callable[[], None]] = []
 
     def type_text(self, text: str, chunk_size: int = 120) -> None:
@@ -21,25 +33,42 @@ class WindowsIntegration:
             return
         for idx in range(0, len(text), chunk_size):
             chunk = text[idx : idx + chunk_size]
-            keyboard.write(chunk, delay=0.01)
-            time.sleep(0.02)
+            self._keyboard.write(chunk, delay=0.01)
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
 
     def copy_to_clipboard(self, text: str, paste: bool | None = None) -> None:
         if not text:
             return
-        pyperclip.copy(text)
+        from .clipboard import get_clipboard
+
+        clipboard = get_clipboard()
         do_paste = self.auto_paste_clipboard if paste is None else paste
+        previous = clipboard.read() if do_paste and self.restore_clipboard else None
+        clipboard.copy(text)
         if do_paste:
-            time.sleep(0.05)  # Give the clipboard a moment to update before pasting.
-            keyboard.send("ctrl+v")
+            clipboard.expect_paste()
+            self._keyboard.send("ctrl+v")
+            if previous is not None:
+                clipboard.restore(previous)
 
     def output_text(self, text: str) -> None:
+        started = time.perf_counter()
         if self.output_mode == "clipboard":
             self.copy_to_clipboard(text)
         elif self.output_mode == "paste":
             self.copy_to_clipboard(text, paste=True)
         else:
             self.type_text(text)
+        metrics.record_injection(len(text), time.perf_counter() - started)
+
+    def delete_text(self, count: int) -> None:
+        """Backspace over the last ``count`` characters typed into the focused window."""
+        for _ in range(count):
+            self._keyboard.send("backspace")
+
+    def send_undo(self) -> None:
+        self._keyboard.send("ctrl+z")
 
     def register_hotkey_push_to_talk(
         self, hotkey: str, on_press: Callable[[], None], on_release: Callable[[], None]
@@ -20,6 +20,7 @@ def main():
         model_size=cfg.model_size,
         language=cfg.language,
         prefer_gpu=cfg.prefer_gpu,
+        model_cache_dir=cfg.model_cache_dir,
     )
     result = engine.transcribe(data, sample_rate=capturer.sample_rate)
     processed = TextPostProcessor(enable_spoken_punctuation=cfg.spoken_punctuation).process(result.final_text)
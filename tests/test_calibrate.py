@@ -0,0 +1,24 @@
+from flow_stt.calibrate import FakeSoundDevice, calibrate, measure
+from flow_stt.devices import DeviceRegistry
+
+
+def registry():
+    return DeviceRegistry(refresh_interval=0)
+
+
+def test_picks_the_smallest_stable_setting():
+    trials, best = calibrate(FakeSoundDevice(jitter_secs=0.001), block_sizes=(256, 512), seconds=0.3, registry=registry())
+    assert best is not None and best.stable
+    assert (best.block_size, best.latency) == (256, "low")
+    assert best.overflows == 0
+    assert trials == [best]
+
+
+def test_high_jitter_overflows_and_is_rejected():
+    trial = measure(FakeSoundDevice(jitter_secs=0.02), 256, "low", seconds=0.3, registry=registry())
+    assert trial.overflows > 0
+    assert not trial.stable
+    _trials, best = calibrate(
+        FakeSoundDevice(jitter_secs=0.02), block_sizes=(256,), latencies=("low",), seconds=0.3, registry=registry()
+    )
+    assert best is None
@@ -0,0 +1,75 @@
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from flow_stt.clipboard import PasteTarget, TkClipboard
+
+
+@pytest.fixture(scope="module")
+def display():
+    if os.environ.get("DISPLAY"):
+        yield os.environ["DISPLAY"]
+        return
+    if shutil.which("Xvfb") is None:
+        pytest.skip("needs an X display or Xvfb")
+    server = subprocess.Popen(["Xvfb", "-displayfd", "1", "-nolisten", "tcp"], stdout=subprocess.PIPE, text=True)
+    number = server.stdout.readline().strip()
+    if not number:
+        server.kill()
+        pytest.skip("Xvfb did not start")
+    os.environ["DISPLAY"] = f":{number}"
+    try:
+        yield os.environ["DISPLAY"]
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait(5.0)
+
+
+@pytest.fixture
+def clipboard(display):
+    pytest.importorskip("tkinter")
+    backend = TkClipboard()
+    target = PasteTarget()
+    yield backend, target
+    target.close()
+    backend.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_paste_target_gets_the_copied_text_and_the_previous_one_comes_back(clipboard):
+    backend, target = clipboard
+    backend.copy("before dictation")
+    previous = backend.read()
+    started = time.perf_counter()
+    backend.copy("dictated text")
+    backend.expect_paste()
+    assert target.fetch() == "dictated text"
+    latency = time.perf_counter() - started
+    backend.restore(previous)
+    assert wait_for(lambda: backend.read() == "before dictation")
+    assert target.fetch() == "before dictation"
+    assert latency < 0.5, f"copy-to-paste took {latency * 1000:.1f} ms"
+
+
+def test_restore_leaves_a_newer_copy_alone(clipboard):
+    backend, target = clipboard
+    backend.copy("before dictation")
+    backend.copy("dictated text")
+    backend.expect_paste()
+    assert target.fetch() == "dictated text"
+    backend.restore("before dictation")
+    backend.copy("copied by hand")
+    time.sleep(TkClipboard.served_timeout_secs / 2)
+    assert target.fetch() == "copied by hand"
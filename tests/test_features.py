@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from flow_stt.features import IncrementalLogMel, check_parity
+from flow_stt.stt_engine import SpeechToTextEngine
+
+
+@pytest.mark.parametrize("n_mels", [80, 128])
+@pytest.mark.parametrize("seconds", [0.01, 1.0, 7.3, 31.0])
+def test_matches_faster_whisper_extractor(n_mels, seconds):
+    pytest.importorskip("faster_whisper")
+    assert check_parity(seconds, n_mels) < 1e-4
+
+
+class FakeExtractor:
+    n_samples = 30 * 16000
+    hop_length = 160
+
+    def __init__(self, n_mels=80):
+        self.mel_filters = np.zeros((n_mels, 201), dtype=np.float32)
+        self.calls = 0
+
+    def __call__(self, waveform, *args, **kwargs):
+        self.calls += 1
+        return np.zeros((self.mel_filters.shape[0], (waveform.shape[0] + self.n_samples) // self.hop_length))
+
+
+class FakeModel:
+    def __init__(self):
+        self.feature_extractor = FakeExtractor()
+        self.seen = []
+
+    def transcribe(self, audio, **kwargs):
+        self.seen.append(self.feature_extractor(audio))
+        return [], None
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(SpeechToTextEngine, "_load_model", lambda self: FakeModel())
+    return SpeechToTextEngine(language="en", prefer_gpu=False)
+
+
+def precomputed(samples):
+    extractor = IncrementalLogMel(80)
+    extractor.feed(samples)
+    return extractor.finalize()
+
+
+def test_precomputed_features_reach_the_model(engine):
+    samples = np.zeros(16000, dtype=np.int16)
+    features = precomputed(samples)
+    engine.transcribe(samples, features=features)
+    assert engine.model.seen[-1] is features
+    assert engine.model.feature_extractor._extractor.calls == 0
+
+
+def test_mismatched_features_fall_back_to_extraction(engine):
+    samples = np.zeros(16000, dtype=np.int16)
+    engine.transcribe(samples, features=precomputed(samples[:8000]))
+    assert engine.model.feature_extractor._extractor.calls == 1
+    # The next call without features extracts as usual too.
+    engine.transcribe(samples)
+    assert engine.model.feature_extractor._extractor.calls == 2
@@ -0,0 +1,33 @@
+from flow_stt.vocabulary import VocabularyIndex
+
+
+TERMS = ["Will", "Dana", "Mark", "Kubernetes", "Tess", "FlowSTT"]
+
+
+def test_common_words_are_not_rewritten():
+    index = VocabularyIndex.build(TERMS)
+    text = "we will mark the data in kubernates and test it"
+    assert index.correct(text) == "we will mark the data in Kubernetes and test it"
+
+
+def test_inflections_of_common_words_are_not_rewritten():
+    index = VocabularyIndex.build(TERMS)
+    assert index.correct("marks tested datas") == "marks tested datas"
+
+
+def test_misspelled_terms_are_corrected():
+    index = VocabularyIndex.build(TERMS)
+    assert index.correct("deploy to cubernetes with flowst") == "deploy to Kubernetes with FlowSTT"
+
+
+def test_term_must_be_strictly_closer_than_a_common_word():
+    index = VocabularyIndex.build(["Tessa"])
+    # "tesst" is one edit from both "Tessa" and the common word "test".
+    assert index.correct("tesst") == "tesst"
+
+
+def test_exact_matches_keep_their_case_unless_asked():
+    index = VocabularyIndex.build(TERMS)
+    assert index.correct("kubernetes") == "kubernetes"
+    index.fix_case = True
+    assert index.correct("kubernetes and will") == "Kubernetes and will"